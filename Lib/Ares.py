@@ -13,6 +13,8 @@ import inspect
 import logging
 import types
 import re
+import asyncio
+import concurrent.futures
 
 try:
   basestring
@@ -25,7 +27,10 @@ from ares.Lib import html
 from ares.Lib import js
 from ares.Lib import graph
 from ares.Lib import AresMarkDown
+from ares.Lib.js import AresJsDownSampling
+from ares.Lib.js import AresJsOhlc
 from ares.Lib.connectors import AresConn
+from ares.Lib.connectors import AresConnCache
 from ares.Lib.connectors.files import AresFile
 from ares.Lib.connectors.dbs import AresDbBase
 from ares.Lib.AresImports import requires
@@ -125,6 +130,12 @@ class Report(object):
   """
   # This list should not be changed
   showNavMenu, withContainer = False, False
+  # File format used to cache the data sources with an htmlCode (.csv or .arrow for the memory mapped Arrow IPC files)
+  cacheFileFormat = '.csv'
+  # Only write to the page the columns of the data sources used by the components (all the columns if set to False)
+  pruneColumns = True
+  # Line and area charts with more points are downsampled to samplingPoints per series (see AresJsDownSampling)
+  samplingThreshold, samplingPoints, samplingMethod = 5000, 1000, 'lttb'
 
   def __init__(self, runDetails, appCache=None, sideBar=True, urlsApp=None):
     """ Instantiate the Ares object """
@@ -421,7 +432,7 @@ class Report(object):
     """
     return AresConn.AresConn.getSource(source, self.run)(**kwargs)
 
-  def getData(self, source, params=None, env='LIVE', htmlCode=None, toPandas=True, **kwargs):
+  def getData(self, source, params=None, env='LIVE', htmlCode=None, toPandas=True, cacheTTL=None, **kwargs):
     """
     :category: Connector
     :rubric: PY
@@ -430,18 +441,123 @@ class Report(object):
       Retrieve data from a source system. The first parameter is the system code then the rest are parameters related to the
       request. Optional parameters like htmlCode and toPandas will store the results to a flat file in order to avoid
       having to get it from the source again. The temporary cached file will be store with the csv extention and the tab delimiter
+      (or as an Arrow IPC file if the report variable cacheFileFormat is .arrow)
+      The cacheTTL parameter (in seconds) will store the result in the connectors cache (see AresConnCache). The cache
+      statistics of the source are available in the dataSourceMonitor
     :return: A python object corresponding to the connector definition or a standard AReS Dataframe
     """
+    isReady, res = self._getDataRequest(source, params, env, htmlCode, **kwargs)
+    if isReady:
+      return res
+
+    startTime = time.time()
+    connCls, kwargs = res
+    data = connCls.getData(params, env=env, cacheTTL=cacheTTL, **kwargs)
+    return self._getDataResult(source, connCls, data, startTime, htmlCode, toPandas)
+
+  def getDataMany(self, requests, maxWorkers=8, useAsync=False):
+    """
+    :category: Connector
+    :rubric: PY
+    :rubric: Data retrieval
+    :dsc:
+      Retrieve data from several source systems at the same time. Each request is either a tuple (source, params) or a
+      dictionary with the getData parameters. The connectors are called on a pool of maxWorkers threads and the number of
+      concurrent calls per source is limited by the connector MAX_CONCURRENCY (or max_concurrency in the source definition).
+      With useAsync the connectors coroutines (agetData) are run on one event loop instead, the connectors without a
+      coroutine are run on the loop executor. When an event loop is already running in this thread (notebooks, async
+      servers) a new one cannot be run, so the thread pool is used.
+      The results, the dataSourceMonitor and the notifications are the same as with successive getData calls.
+    :example: dfJira, dfSql = aresObj.getDataMany([('JIRA', {'jql': 'project=ARES'}), {'source': 'SQL', 'params': {}, 'htmlCode': 'sql'}])
+    :return: A list with the results in the same order as the requests
+    """
+    # The report is only updated in this thread, the connectors are called on the pool (or the event loop)
+    results, pending = [], []
+    for request in requests:
+      request = dict(request) if isinstance(request, dict) else dict(zip(['source', 'params', 'env', 'htmlCode', 'toPandas', 'cacheTTL'], request))
+      source, params, env = request.pop('source'), request.pop('params', None), request.pop('env', 'LIVE')
+      htmlCode, toPandas, cacheTTL = request.pop('htmlCode', None), request.pop('toPandas', True), request.pop('cacheTTL', None)
+      isReady, res = self._getDataRequest(source, params, env, htmlCode, **request)
+      if not isReady:
+        connCls, kwargs = res
+        pending.append((len(results), connCls, params, env, cacheTTL, kwargs))
+      results.append((isReady, res, source, htmlCode, toPandas))
+
+    if useAsync:
+      try:
+        asyncio.get_running_loop()
+        useAsync = False
+      except RuntimeError:
+        pass # No event loop running in this thread
+
+    if useAsync:
+      fetched = self._getDataAsync(pending, maxWorkers)
+    else:
+      def fetch(connCls, params, env, cacheTTL, kwargs):
+        with connCls.semaphore(kwargs['sourceDef']):
+          startTime = time.time()
+          data = connCls.getData(params, env=env, cacheTTL=cacheTTL, **kwargs)
+          return data, time.time() - startTime
+
+      with concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = [executor.submit(fetch, *request[1:]) for request in pending]
+        fetched = [future.result() for future in futures]
+
+    for (i, connCls, _, _, _, _), (data, runTime) in zip(pending, fetched):
+      _, _, source, htmlCode, toPandas = results[i]
+      # The time spent waiting for the other sources is not added to the monitor
+      results[i] = (True, self._getDataResult(source, connCls, data, time.time() - runTime, htmlCode, toPandas), source, htmlCode, toPandas)
+    return [res for _, res, _, _, _ in results]
+
+  def _getDataAsync(self, pending, maxWorkers):
+    """
+    :category: Connector
+    :rubric: PY
+    :rubric: Data retrieval
+    :dsc:
+      Run the connectors coroutines on a new event loop. The number of concurrent calls per source is limited by an
+      asyncio semaphore.
+    :return: A list of tuples with the connector result and the run time
+    """
+    async def fetch(semaphore, connCls, params, env, cacheTTL, kwargs):
+      async with semaphore:
+        startTime = time.time()
+        data = await connCls.agetData(params, env=env, cacheTTL=cacheTTL, **kwargs)
+        return data, time.time() - startTime
+
+    async def fetchAll():
+      semaphores = {}
+      for _, connCls, _, _, _, kwargs in pending:
+        if not connCls in semaphores:
+          semaphores[connCls] = asyncio.Semaphore(kwargs['sourceDef'].get('max_concurrency', connCls.MAX_CONCURRENCY))
+      return await asyncio.gather(*[fetch(semaphores[request[1]], *request[1:]) for request in pending])
+
+    loop = asyncio.new_event_loop()
+    try:
+      loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers))
+      return loop.run_until_complete(fetchAll())
+
+    finally:
+      loop.close()
+
+  def _getDataRequest(self, source, params, env, htmlCode, **kwargs):
+    """
+    :category: Connector
+    :rubric: PY
+    :rubric: Data retrieval
+    :dsc:
+      First step of a getData call. Return the cached file if available or the connector class and its parameters.
+    :return: A tuple with a boolean (True if the result is already available) and the result or the connector details
+    """
     if htmlCode is not None:
-      df = self.file(filename="%s.csv" % htmlCode)
+      df = self.file(filename="%s%s" % (htmlCode, self.cacheFileFormat))
       if df.exists:
         try:
           self.localFiles[htmlCode] = {"subFolder": df.path.replace("\\", "/"), "filename": df.filename, 'timestamp': df.timestamp}
-          return df.read(header=0, htmlCode=htmlCode, na_filter=False)
+          return True, df.read(header=0, htmlCode=htmlCode, na_filter=False)
 
         except: pass
 
-    startTime = time.time()
     # Normal way to retrieve a secured connector or some parameters
     sourceDef = self.sourceDef.get(source, {}).get(env, {})
     self.dataSourceMonitor.setdefault(source, {"count": 0, 'Total Run Time': 0, 'Read Time': 0, 'Write Time': 0})['count'] += 1
@@ -454,25 +570,38 @@ class Report(object):
     except AttributeError:
       logging.exception('Source Not Defined: %s' % source)
       self.notification('DANGER', 'Source Call Failed', 'Source Not Defined: %s' % source)
-      return self.df([])
-
-    if connCheck[0]:
-      data = AresConn.AresConn.getSource(source, self.run).getData(params, **kwargs)
-      if data[0]:
-        res = data[1]
-        if toPandas:
-          res = self.df(list(res), htmlCode=htmlCode)
-          # Write only the data in a cached file if there is an htmlCode
-          # No point to do this otherwise as the id generated will always be different
-          if htmlCode is not None:
-            res.save()
-        self.dataSourceMonitor[source]['Total Run Time'] += (time.time() - startTime)
-        self.dataSourceMonitor[source]['Read Time'] += (time.time() - startTime)
-        return res
-
-      # This return an empty list in case of issue and display the notification
-      self.notification('DANGER', 'Source Call Failed', data[1])
-    self.notification('DANGER', 'Source Call Failed', connCheck[1])
+      return True, self.df([])
+
+    if not connCheck[0]:
+      self.notification('DANGER', 'Source Call Failed', connCheck[1])
+      return True, self.df([])
+
+    return False, (AresConn.AresConn.getSource(source, self.run), kwargs)
+
+  def _getDataResult(self, source, connCls, data, startTime, htmlCode, toPandas):
+    """
+    :category: Connector
+    :rubric: PY
+    :rubric: Data retrieval
+    :dsc:
+      Last step of a getData call. Update the dataSourceMonitor and convert the connector result.
+    :return: A python object corresponding to the connector definition or a standard AReS Dataframe
+    """
+    self.dataSourceMonitor[source].update(AresConnCache.CACHE.monitor(getattr(connCls, 'ALIAS', connCls.__name__)))
+    if data[0]:
+      res = data[1]
+      if toPandas:
+        res = self.df(list(res), htmlCode=htmlCode)
+        # Write only the data in a cached file if there is an htmlCode
+        # No point to do this otherwise as the id generated will always be different
+        if htmlCode is not None:
+          res.save()
+      self.dataSourceMonitor[source]['Total Run Time'] += (time.time() - startTime)
+      self.dataSourceMonitor[source]['Read Time'] += (time.time() - startTime)
+      return res
+
+    # This return an empty list in case of issue and display the notification
+    self.notification('DANGER', 'Source Call Failed', data[1])
     return self.df([])
 
   def setData(self, source, table, records, updateRules=None, env='LIVE', **kwargs):
@@ -1205,7 +1334,7 @@ class Report(object):
 
   def table(self, recordSet=None, header=None, dataFncs=None, aggFnc='sum', cols=None, rows=None, title='',
             width=100, widthUnit='%', height=None, heightUnit='px', tableOptions=None, toolsbar=None, htmlCode=None,
-            debug=False, tableTypes='base'):
+            debug=False, tableTypes='base', pushdown=None):
     """
     :category: Tables
     :rubric: JS
@@ -1213,6 +1342,7 @@ class Report(object):
     :dsc:
       Create a AReS HTML Table which is basically a javascript Datatable managed by the Python interface.
       The python layer will try as much as possible to structure the data in order to save time in the javascript layer.
+      The pushdown flag will run the aggregation in Python and only write the result to the page (see AresJs.Js.setPushDown)
     :link Datatable Documentation:
     :return: The AReS HTML Table
     :wrap class: ares.Lib.tables.AresHtmlDataTable.DataTable
@@ -1283,7 +1413,7 @@ class Report(object):
       self.jsOnLoadFnc.add(self.jsConsole("", isPyData=True))
       self.jsOnLoadFnc.add(self.jsConsole("************************", isPyData=True))
       self.jsOnLoadFnc.add(self.jsConsole("Debug mode for table", isPyData=True))
-    return self.add(ares.Lib.html.AresHtmlDataTable.DataTable(self, tableTypes, js.AresJs.Js(self, recordSet, debug=debug).fncs(jsFncs, systemCols), header,
+    return self.add(ares.Lib.html.AresHtmlDataTable.DataTable(self, tableTypes, js.AresJs.Js(self, recordSet, debug=debug, pushdown=pushdown).fncs(jsFncs, systemCols), header,
                                                               title, width, widthUnit, height, heightUnit, tableOptions, toolsbar, htmlCode), sys._getframe().f_code.co_name)
 
   def excel(self, recordSet=None, cols=None, rows=None, width=100, widthUnit='%', height=None, heightUnit='px', cellwidth=None, title='', delimiter='TAB', htmlCode=None):
@@ -1322,15 +1452,23 @@ class Report(object):
                                                                        toolsbar, htmlCode, globalFilter), sys._getframe().f_code.co_name)
 
   def chart(self, chartType=None, aresDf=None, seriesNames=None, xAxis=None, otherDims=None, dataFncs=None, title='',
-            chartFamily=None, globalFilter=None, debug=False, **kwargs):
+            chartFamily=None, globalFilter=None, debug=False, pushdown=None, sampling=None, bars=None, **kwargs):
     """
     :category:
     :type:
     :rubric:
     :example: aresObj.chart(chartType, sourceFile, seriesNames=seriesNames, xAxis='direction', chartFamily=chartFam, sort_values={'by': ['Date'], 'ascending': False})
     :example: aresObj.chart(chartType, sourceFile, seriesNames=seriesNames, xAxis='direction', chartFamily=chartFam, dataFncs=[('sum', ['direction'], seriesNames), ('top', 2, 'AAPL.Open', 'ascending')])
+    :example: aresObj.chart('line', df, seriesNames=['price'], xAxis='date', sampling={'points': 2000, 'method': 'minmax'})
+    :example: aresObj.chart('candlestick', ticks, seriesNames=['price', 'volume'], xAxis='time', bars={'interval': '5min', 'cache': 'ticks_AAPL'})
     :dsc:
-
+      The line and area charts with a numeric or date x axis (unique and sorted) are downsampled when they have more
+      points than samplingThreshold. The parameter sampling can be False to write all the points, a number of points
+      or a dictionary with the points and the method (lttb or minmax).
+      The full data is kept on the server to be used when the user zooms in a Plotly chart (see AresChartServer).
+      The parameter bars resamples tick data to open, high, low, close and volume bars (see AresJsOhlc). It can be the
+      interval or a dictionary with the interval and the cache key used to reuse the closed bars on a refresh (the bars are
+      not cached without this key). The first series is the price and the second one the volume.
     """
     if not hasattr(aresDf, 'htmlCode'):
       if len(aresDf) > 0 and isinstance(aresDf[0], list):
@@ -1344,6 +1482,10 @@ class Report(object):
       if seriesNames is None:
         seriesNames = list(aresDf.columns)
       aresDf['_index'] = aresDf.index
+    if bars is not None:
+      barsDef = dict(bars) if isinstance(bars, dict) else {'interval': bars}
+      ohlc = AresJsOhlc.resample(aresDf, xAxis, seriesNames[0], seriesNames[1] if len(seriesNames) > 1 else None, barsDef['interval'], barsDef.get('cache'))
+      aresDf, xAxis, seriesNames = self.df(AresJsOhlc.records(ohlc)), 'date', list(AresJsOhlc.COLUMNS)
     if not 'sort_values' in kwargs:
       if xAxis is not None and not aresDf.empty:
         aresDf.sort_values(by=[xAxis], inplace=True)
@@ -1352,6 +1494,12 @@ class Report(object):
       aresDf.sort_values(**kwargs['sort_values'])
       del kwargs['sort_values']
 
+    fullDf, samplingDef = None, None
+    if dataFncs is None and otherDims is None and globalFilter is None:
+      samplingDef = self._samplingDef(chartType, aresDf, seriesNames, xAxis, sampling)
+    if samplingDef is not None:
+      fullDf = aresDf
+      aresDf = self.df(fullDf.iloc[AresJsDownSampling.sample(fullDf, xAxis, seriesNames, samplingDef['points'], samplingDef['method'])])
     if dataFncs is None:
       if otherDims is not None:
         dataFncs = [('sum', [xAxis], seriesNames + list(otherDims))]
@@ -1363,8 +1511,44 @@ class Report(object):
       self.jsOnLoadFnc.add(self.jsConsole("", isPyData=True))
       self.jsOnLoadFnc.add(self.jsConsole("************************", isPyData=True))
       self.jsOnLoadFnc.add(self.jsConsole("Debug mode for %s" % chartType, isPyData=True))
-    return self.plot(chartType, js.AresJs.Js(self, aresDf, debug=debug).fncs(dataFncs).output(chartFam, chartType, params),
-                     title=title, chartFamily=chartFam, globalFilter=globalFilter, **kwargs)
+    chartObj = self.plot(chartType, js.AresJs.Js(self, aresDf, debug=debug, pushdown=pushdown).fncs(dataFncs).output(chartFam, chartType, params),
+                         title=title, chartFamily=chartFam, globalFilter=globalFilter, **kwargs)
+    if fullDf is not None and hasattr(chartObj, 'serverZoom'):
+      try:
+        from ares.Lib import AresChartServer
+      except ImportError:
+        # No server available (for example for the offline reports), the chart only has the downsampled points
+        return chartObj
+
+      sourceId = AresChartServer.register(chartObj.htmlId, fullDf, xAxis, seriesNames, samplingDef['points'], samplingDef['method'])
+      chartObj.serverZoom("%s/data/%s" % (self._urlsApp.get('ares-charts', '/charts'), sourceId), samplingDef['points'])
+    return chartObj
+
+  def _samplingDef(self, chartType, aresDf, seriesNames, xAxis, sampling):
+    """
+    :category: Charts
+    :rubric: PY
+    :type: Data Transformation
+    :dsc:
+      Return the downsampling definition of a chart or None if all the points should be written to the page.
+    :return: A Python dictionary with the points and the method
+    """
+    if sampling is False or not chartType in AresJsDownSampling.SAMPLING_CHARTS or not seriesNames:
+      return None
+
+    samplingDef = {'points': self.samplingPoints, 'method': self.samplingMethod}
+    if isinstance(sampling, dict):
+      samplingDef.update(sampling)
+    elif sampling is not None and sampling is not True:
+      samplingDef['points'] = int(sampling)
+    if len(aresDf) <= max(samplingDef['points'], self.samplingThreshold if sampling is None else 0):
+      return None
+
+    xSeries = aresDf[xAxis]
+    if not xSeries.dtype.kind in 'iufM' or not xSeries.is_monotonic_increasing or not xSeries.is_unique:
+      return None
+
+    return samplingDef
 
   # Special charts
   #def wordcloud(self, chartType=None, data=None, width=500, widthUnit="%", height=500, heightUnit='px', title='', chartDesc=None, margin=None): return self.add(graph.AresHtmlGraphWordCloud.Chart(self, chartType, data, width, widthUnit, height, heightUnit, title, chartDesc, margin), sys._getframe().f_code.co_name)
@@ -1404,10 +1588,14 @@ class Report(object):
     :link Pandas Documentation: http://pandas.pydata.org/pandas-docs/stable/
     :wrap class: ares.Lib.js.AresJsData.JsDataFrame
     """
+    if callable(getattr(type(recordset), 'toDf', None)):
+      # Lazy frames (for example the SqlConn select) are run only once
+      return recordset.toDf(htmlCode=htmlCode, aresObj=self)
+
     filePath = None
     if htmlCode is not None:
       splitCode = htmlCode.split("/")
-      splitCode[-1] = "%s.csv" % splitCode[-1]  # csv file by default
+      splitCode[-1] = "%s%s" % (splitCode[-1], self.cacheFileFormat)  # csv file by default
       filePath = os.path.join(self.run.local_path, 'outputs', *splitCode)
     else:
       htmlCode = 'recordset_%s' % id(recordset)
@@ -1882,7 +2070,7 @@ class Report(object):
     docName = self.to_word()
     return docName
 
-  def html(self, online=False):
+  def html(self, online=False, compressData=False):
     """
     :category: HTML
     :type: outputs
@@ -1891,6 +2079,7 @@ class Report(object):
     :dsc:
       Special output function used by the framework to export the report to a isoldated HTML document
       This function cannot be used directly as it will write the report on the server but some buttons are available on the top to trigger it
+      With compressData the data sources are compressed in the page and the Javascript using them is run once they are inflated
     :return: The full HTML page (HTML tags and javascript definition)
     """
     if getattr(self, 'DEBUG', False):
@@ -1925,9 +2114,26 @@ class Report(object):
       self.notification('DANGER', 'Database errors', "".join(errors))
 
     onloadParts, windowLoadParts, htmlParts, jsGraphs, aresResult = [], [], [], [], {}
+    sharedSources, savedBytes = {}, 0
     for src in self.jsSources.values():
-      if len(src['containers']) > 0:
-        htmlParts.append(src['data'].html())
+      if len(src['containers']) > 0 and not js.AresJs.isPushedDown(src):
+        usedCols = js.AresJs.usedColumns(src) if self.pruneColumns else None
+        # Data sources with the same content (copies, same data loaded twice) are only written once to the page
+        fingerprint = src['data'].fingerprint(usedCols) if hasattr(src['data'], 'fingerprint') else None
+        if fingerprint in sharedSources:
+          sharedCode = sharedSources[fingerprint]
+          # No varDeps, the alias is appended to jsVarOrder thus it is declared after the variable of the shared source
+          self.jsGlobal.addData(src['data'].htmlCode, sharedCode, isJson=False)
+          savedBytes += len(self.jsGlobal.jsGlobals[sharedCode])
+          if getattr(self, 'DEBUG', False):
+            self.jsOnLoadFnc.add(self.jsConsole("Data source %s shares the variable %s (%s bytes saved)" % (src['data'].htmlCode, sharedCode, len(self.jsGlobal.jsGlobals[sharedCode])), isPyData=True))
+          continue
+
+        htmlParts.append(src['data'].html() if usedCols is None else src['data'].html(columns=usedCols))
+        if fingerprint is not None:
+          sharedSources[fingerprint] = src['data'].htmlCode
+    if savedBytes and getattr(self, 'DEBUG', False):
+      self.jsOnLoadFnc.add(self.jsConsole("%s bytes saved by sharing the identical data sources" % savedBytes, isPyData=True))
 
     for objId in self.content:
       if self.htmlItems[objId].inReport:
@@ -1966,6 +2172,10 @@ class Report(object):
     aresResult['jsWindowLoad'] = "\n".join(windowLoadParts)
     aresResult['htmlParts'] = "\n".join(htmlParts)
     aresResult['jsGraphs'] = "\n".join(jsGraphs)
+    if compressData and self.jsGlobal.compressData():
+      # The components can only be built once the data variables are defined
+      for jsPart in ['jsDocumentReady', 'jsWindowLoad', 'jsGraphs']:
+        aresResult[jsPart] = "%s.then(function(){ %s }).catch(function(err){ console.error(err) });" % (self.jsGlobal.dataPromise, aresResult[jsPart])
     aresResult['jsGlobal'] = str(self.jsGlobal)
     aresResult['exportData'] = self.exportCsv
     aresResult['cssStyle'] = str(self.cssObj)
@@ -2366,7 +2576,7 @@ class ReportAPI(Report):
           objAttrs[k] = v['attrs']
     return objAttrs
 
-  def toHtml(self, fileName=None, filePath=None, title=None, serverUrl=None, template='base', withDoc=False):
+  def toHtml(self, fileName=None, filePath=None, title=None, serverUrl=None, template='base', withDoc=False, compressData=False):
     """
     :category: HTML
     :rubric: PY
@@ -2374,7 +2584,10 @@ class ReportAPI(Report):
     :dsc:
       Produce an HTML file with the report. This HTML page will use external Javascript and external libraries either
       from a local server (if the URL is defined) or online otherwise
+      With compressData the data sources are written compressed (gzip and base64) and they are inflated by the browser.
+      This reduces a lot the size of the files sent by email
     :example: aresObj.toHtml(fileFullPath=r'C:\...\table.html', serverUrl='http://127.0.0.1:5000', title="Test table")
+    :example: aresObj.toHtml(fileName='report.html', compressData=True)
     """
     def render_template_string(val):
       """ Wrap the function to convert the URL """
@@ -2403,7 +2616,7 @@ class ReportAPI(Report):
         os.remove(fileFullPath)
 
     AresImports.render_template_string = render_template_string
-    data = self.html(online=serverUrl is None)
+    data = self.html(online=serverUrl is None, compressData=compressData)
     data['title'] = 'Local Report' if title is None else title
     if not os.path.isfile(template):
       tmpFile = html.templates.AresHtmlTmplBase.DATA.replace("|safe", "").replace("%", "%%").replace("{{ ", "%(").replace(" }}", ")s")
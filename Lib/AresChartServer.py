@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Full resolution data for the downsampled charts.
+__
+The line and area charts with more points than the report variable samplingThreshold only get a downsampled version of
+the series in the page (see AresJsDownSampling). The full dataframe is kept in this module and the Flask blueprint
+aresCharts returns the points of the window displayed when the user zooms in the chart. The window is downsampled again
+to the same number of points, thus the resolution increases with the zoom.
+
+```python
+aresObj.chart('line', df, seriesNames=['price'], xAxis='date', sampling={'points': 2000})
+```
+
+The blueprint should be registered in the Flask application.
+
+```python
+app.register_blueprint(AresChartServer.aresCharts)
+```
+'''}
+
+
+import json
+import uuid
+import threading
+import collections
+
+from flask import Blueprint, request, Response
+
+from ares.Lib.js import AresJsEncoder
+from ares.Lib.js import AresJsDownSampling
+
+
+aresCharts = Blueprint('ares-charts', __name__, url_prefix='/charts')
+
+# Number of charts kept in memory
+MAX_CHARTS = 20
+
+# The charts are keyed by a token unique per rendering of a chart, thus two reports (or two users) with the same
+# htmlCode do not share their data. The dictionary is changed by the requests threads
+SOURCES, _sourcesLock = collections.OrderedDict(), threading.Lock()
+
+
+class ChartSource(object):
+  """
+  :category: Chart
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Dataframe sorted on the x axis used by a downsampled chart.
+  """
+
+  def __init__(self, df, xAxis, seriesNames, points, method):
+    self.df = df[[xAxis] + [seriesName for seriesName in seriesNames if seriesName != xAxis]].reset_index(drop=True)
+    self.xAxis, self.seriesNames, self.points, self.method = xAxis, seriesNames, points, method
+
+  def window(self, params):
+    """
+    :category: Chart
+    :rubric: PY
+    :type: Server
+    :dsc:
+      Return the records between the start and end parameters, downsampled to the number of points of the chart.
+      Without start and end the full range is returned. The points requested cannot be more than the ones of the chart.
+    :return: A list of Python dictionaries
+    """
+    start, end = AresJsDownSampling.window(self.df, self.xAxis, params.get('start'), params.get('end'))
+    df = self.df.iloc[start:end]
+    points = min(max(int(params.get('points', self.points)), 3), self.points)
+    if len(df) > points:
+      df = df.iloc[AresJsDownSampling.sample(df, self.xAxis, self.seriesNames, points, self.method)]
+    return AresJsEncoder.encodeDataFrame(df, orient='records', dropna=True)
+
+
+def register(chartId, df, xAxis, seriesNames, points, method='lttb'):
+  """
+  :category: Chart
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Store the full data of a downsampled chart on the server.
+  :return: The token of the chart to be used in the data url
+  """
+  sourceId = "%s_%s" % (chartId, uuid.uuid4().hex)
+  with _sourcesLock:
+    SOURCES[sourceId] = ChartSource(df, xAxis, seriesNames, points, method)
+    if len(SOURCES) > MAX_CHARTS:
+      SOURCES.popitem(last=False)
+  return sourceId
+
+
+@aresCharts.route('/data/<sourceId>', methods=['GET', 'POST'])
+def data(sourceId):
+  """
+  :category: Chart
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Endpoint used by the chart zoom requests. The wrong parameters are returned as an error.
+  """
+  with _sourcesLock:
+    source = SOURCES.get(sourceId)
+  if source is None:
+    result = {'error': 'Chart not available on the server, please run the report again'}
+  else:
+    try:
+      result = {'data': source.window(request.values)}
+    except (ValueError, TypeError) as err:
+      result = {'error': 'Wrong chart request, %s' % err}
+  return Response(json.dumps(result, cls=AresJsEncoder.AresEncoder), mimetype='application/json')
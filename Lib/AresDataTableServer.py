@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Server side processing for the Datatable components.
+__
+By default a table will write the full recordSet to the page and Datatable will page, sort and search it in the browser.
+With the table option serverSide the data is kept in this module and the table will only request the rows displayed.
+The Flask blueprint aresTables answers the Datatable requests (draw, start, length, order and search parameters).
+__
+The sort positions are stored per list of ordered columns and the search is done on a lower case text index built only once
+per table. Thus the page requests do not sort or scan the full dataframe again.
+
+```python
+aresObj.table(df, rows=['name'], cols=['value'], tableOptions={'serverSide': True})
+```
+
+The blueprint should be registered in the Flask application.
+
+```python
+app.register_blueprint(AresDataTableServer.aresTables)
+```
+'''}
+
+
+import json
+import uuid
+import threading
+import collections
+
+from flask import Blueprint, request, Response
+
+from ares.Lib.AresImports import requires
+from ares.Lib.js import AresJsEncoder
+from ares.Lib.js import AresJsPushDown
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+aresTables = Blueprint('ares-tables', __name__, url_prefix='/tables')
+
+# Number of tables and searches kept in memory
+MAX_TABLES, MAX_SEARCHES = 50, 20
+
+# The tables are keyed by a token unique per rendering of a table, thus two reports (or two users) with the same
+# htmlCode do not share their data. The dictionary is changed by the requests threads
+SOURCES, _sourcesLock = collections.OrderedDict(), threading.Lock()
+
+
+class TableSource(object):
+  """
+  :category: Table
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Dataframe used by a table in server side mode. The sort positions and the search results are stored to be reused
+    by the next page requests.
+  """
+
+  def __init__(self, df):
+    self.df = df.reset_index(drop=True)
+    self._sortPositions, self._searchMasks, self._searchIndex = {}, collections.OrderedDict(), None
+    self._lock = threading.Lock()
+
+  def sortPositions(self, orders):
+    """
+    :category: Table
+    :rubric: PY
+    :type: Server
+    :dsc:
+      Return the rows positions for a list of orders [(column, ascending)]. The null values are always at the end.
+    :return: A numpy array with the positions
+    """
+    orders = tuple(orders)
+    if not orders:
+      return ares_numpy.arange(len(self.df))
+
+    if not orders in self._sortPositions:
+      sortedDf = self.df.sort_values(by=[col for col, _ in orders], ascending=[asc for _, asc in orders], kind='mergesort', na_position='last')
+      self._sortPositions[orders] = sortedDf.index.values
+    return self._sortPositions[orders]
+
+  @property
+  def searchIndex(self):
+    """
+    :category: Table
+    :rubric: PY
+    :type: Server
+    :dsc:
+      Lower case text of all the cells in a row. This is built only once on the first search request
+    :return: A Pandas series
+    """
+    if self._searchIndex is None:
+      index = None
+      for col in self.df.columns:
+        colText = self.df[col].astype(str).where(self.df[col].notnull(), '').str.lower()
+        index = colText if index is None else index + "\t" + colText
+      self._searchIndex = index if index is not None else ares_pandas.Series([], dtype=object)
+    return self._searchIndex
+
+  def searchMask(self, value):
+    """
+    :category: Table
+    :rubric: PY
+    :type: Server
+    :dsc:
+      Return the rows matching all the words in the search value (like the Datatable smart search).
+    :return: A numpy boolean array or None if there is no search
+    """
+    value = value.strip().lower()
+    if not value:
+      return None
+
+    if not value in self._searchMasks:
+      mask = ares_numpy.ones(len(self.df), dtype=bool)
+      for word in value.split():
+        mask &= self.searchIndex.str.contains(word, regex=False).values
+      self._searchMasks[value] = mask
+      if len(self._searchMasks) > MAX_SEARCHES:
+        self._searchMasks.popitem(last=False)
+    return self._searchMasks[value]
+
+  def page(self, params):
+    """
+    :category: Table
+    :rubric: PY
+    :type: Server
+    :dsc:
+      Answer a Datatable server side request. The requests of a table are run one by one as they share the sort and
+      search caches.
+    :link Datatable Documentation: https://datatables.net/manual/server-side
+    :return: A Python dictionary with the Datatable expected keys
+    """
+    with self._lock:
+      return self._page(params)
+
+  def _page(self, params):
+    orders, i = [], 0
+    while 'order[%s][column]' % i in params:
+      colName = params.get('columns[%s][data]' % params['order[%s][column]' % i], '').replace('\\', '')
+      if colName in self.df.columns:
+        orders.append((colName, params.get('order[%s][dir]' % i, 'asc') == 'asc'))
+      i += 1
+    positions = self.sortPositions(orders)
+    mask = self.searchMask(params.get('search[value]', ''))
+    if mask is not None:
+      positions = positions[mask[positions]]
+    start, length = int(params.get('start', 0)), int(params.get('length', -1))
+    pagePositions = positions[start:] if length < 0 else positions[start:start + length]
+    return {'draw': int(params.get('draw', 0)), 'recordsTotal': len(self.df), 'recordsFiltered': len(positions),
+            'data': AresJsEncoder.encodeDataFrame(self.df.iloc[pagePositions], orient='records', dropna=True)}
+
+
+def register(tableId, recordSet):
+  """
+  :category: Table
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Store the data of a table on the server. The record functions defined in the Js object are run in Python.
+  :return: The token of the table to be used in the data url
+  """
+  df = recordSet._data
+  if recordSet._schema['fncs']:
+    try:
+      df = ares_pandas.DataFrame(AresJsPushDown.toRecords(AresJsPushDown.run(df, recordSet._schema['fncs'])))
+    except Exception as err:
+      raise Exception("Server side table %s cannot be created, %s" % (tableId, err))
+
+  sourceId = "%s_%s" % (tableId, uuid.uuid4().hex)
+  with _sourcesLock:
+    SOURCES[sourceId] = TableSource(df)
+    if len(SOURCES) > MAX_TABLES:
+      SOURCES.popitem(last=False)
+  return sourceId
+
+
+@aresTables.route('/data/<sourceId>', methods=['GET', 'POST'])
+def data(sourceId):
+  """
+  :category: Table
+  :rubric: PY
+  :type: Server
+  :dsc:
+    Endpoint used by the Datatable ajax requests. The wrong parameters (or a sort on a column with mixed types) are
+    returned as a Datatable error.
+  """
+  draw = request.values.get('draw', '0')
+  draw = int(draw) if draw.isdigit() else 0
+  with _sourcesLock:
+    source = SOURCES.get(sourceId)
+  if source is None:
+    result = {'draw': draw, 'error': 'Table not available on the server, please run the report again'}
+  else:
+    try:
+      result = source.page(request.values)
+    except (ValueError, TypeError) as err:
+      result = {'draw': draw, 'error': 'Wrong table request, %s' % err}
+  return Response(json.dumps(result, cls=AresJsEncoder.AresEncoder), mimetype='application/json')
@@ -22,10 +22,161 @@ import importlib
 import logging
 import sys
 import os
+import pickle
+import hashlib
+import time
 import datetime
+import atexit
+import threading
 import traceback
 
 from ares.Lib import AresMarkDown
+from ares.Lib.connectors import AresConnCache
+from ares.Lib.connectors.files import AresFilePandas
+from ares.Lib.js import AresJsPushDown
+
+
+# Engines shared by all the SqlConn objects in the process. The key is the database url
+ENGINES, _enginesLock = {}, threading.RLock()
+# Pool parameters for the server databases (SQLite keeps the SQLAlchemy default pool)
+POOL_OPTIONS = {'pool_size': 5, 'max_overflow': 10, 'pool_recycle': 3600}
+
+# Folder of the schema snapshots (the tables already reflected per database) and minimum delay in seconds between two writes.
+# The snapshots are pickles, they are private files of the current user in the application folder
+SCHEMA_PATH = os.environ.get('ARES_SCHEMA_PATH', os.path.join(AresConnCache.APP_PATH, 'schemas'))
+SCHEMA_SAVE_DELAY = 5
+
+# Results of the SqlConn queries (only used when a cacheTTL is defined). This is kept in memory as the results are
+# invalidated by the writes done in this process
+QUERY_CACHE = AresConnCache.ResultCache(None, int(os.environ.get('ARES_QUERY_CACHE_BYTES', 128 * 1024 * 1024)))
+# Queries returning a value which changes with the tables definitions. The snapshot is only used if this is the same
+# The snapshots are not used for the other databases
+CATALOG_VERSION_SQL = {
+  'sqlite': "PRAGMA schema_version",
+  'postgresql': "SELECT md5(string_agg(a.attrelid::text || a.attname || a.atttypid::text || a.atttypmod::text, ',' ORDER BY a.attrelid, a.attnum)) FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'v') AND a.attnum > 0 AND NOT a.attisdropped",
+  'mysql': "SELECT COUNT(*), MAX(create_time) FROM information_schema.tables WHERE table_schema = DATABASE()",
+  'oracle': "SELECT COUNT(*), MAX(last_ddl_time) FROM user_objects WHERE object_type IN ('TABLE', 'VIEW')",
+}
+
+
+def _schemaVersion(engine):
+  if not engine.dialect.name in CATALOG_VERSION_SQL:
+    return None
+
+  try:
+    return str(tuple(engine.execute(CATALOG_VERSION_SQL[engine.dialect.name]).fetchone()))
+
+  except Exception as err:
+    logging.warning("Catalog version not available for %s, %s" % (engine.dialect.name, err))
+    return None
+
+
+def _schemaPath(dbUrl):
+  return os.path.join(SCHEMA_PATH, "%s.pkl" % hashlib.sha1(repr(dbUrl).encode('utf-8')).hexdigest())
+
+
+def getEngine(dbUrl, **engineOptions):
+  """
+  :category: SQL Framework
+  :rubric: PY
+  :type: Engine
+  :dsc:
+    Return the engine, the metadata and the session factory of a database. Those are created only once per
+    process, thus the connections pool and the schema are shared by all the reports.
+    The tables are reflected only when they are used (see SqlConn.table). The tables already reflected are stored in
+    a snapshot file which is reused by the next processes as long as the catalog version of the database is the same.
+  :example: getEngine(sqlalchemy.engine.url.URL('sqlite', database='test.db'))
+  :return: A Python dictionary with the keys engine, metadata, session and version
+  """
+  key = str(dbUrl)
+  with _enginesLock:
+    if not key in ENGINES:
+      options = {'pool_pre_ping': True}
+      if not dbUrl.drivername.startswith('sqlite'):
+        options.update(POOL_OPTIONS)
+      options.update(engineOptions)
+      engine = sqlalchemy.create_engine(dbUrl, **options)
+      metadata, version = None, _schemaVersion(engine)
+      if version is not None and os.path.exists(_schemaPath(dbUrl)):
+        try:
+          snapshotVersion, metadata = None, None
+          snapshot = AresConnCache.readPrivate(_schemaPath(dbUrl))
+          if snapshot is not None:
+            snapshotVersion, metadata = pickle.loads(snapshot)
+          if metadata is None or snapshotVersion != version:
+            metadata = None
+          else:
+            metadata.bind = engine
+        except Exception as err:
+          logging.warning("Schema snapshot cannot be read, %s" % err)
+          metadata = None
+      ENGINES[key] = {'engine': engine, 'metadata': metadata if metadata is not None else sqlalchemy.MetaData(bind=engine),
+                      'session': sessionmaker(bind=engine), 'version': version, 'url': dbUrl, 'saved': time.time(), 'dirty': False}
+    return ENGINES[key]
+
+
+def saveSchema(dbUrl=None, force=True):
+  """
+  :category: SQL Framework
+  :rubric: PY
+  :type: Engine
+  :dsc:
+    Write the snapshot of the tables already reflected for a database (or for all the databases if dbUrl is None).
+    Without force the file is written only if the last write is older than SCHEMA_SAVE_DELAY. The remaining changes
+    are written when the process stops.
+  """
+  with _enginesLock:
+    for key in ([str(dbUrl)] if dbUrl is not None else list(ENGINES)):
+      dbEngine = ENGINES.get(key)
+      if dbEngine is None or dbEngine['version'] is None:
+        continue
+
+      dbEngine['dirty'] = True
+      if force or time.time() - dbEngine['saved'] > SCHEMA_SAVE_DELAY:
+        _writeSchema(dbEngine)
+
+
+def _writeSchema(dbEngine):
+  dbUrl = dbEngine['url']
+  try:
+    AresConnCache.writePrivate(_schemaPath(dbUrl), pickle.dumps((dbEngine['version'], dbEngine['metadata']), pickle.HIGHEST_PROTOCOL))
+    dbEngine['saved'], dbEngine['dirty'] = time.time(), False
+  except Exception as err:
+    logging.warning("Schema snapshot cannot be written, %s" % err)
+
+
+@atexit.register
+def _saveSchemas():
+  with _enginesLock:
+    for dbEngine in ENGINES.values():
+      if dbEngine['dirty'] and dbEngine['version'] is not None:
+        _writeSchema(dbEngine)
+
+
+def invalidate(dbUrl=None, dispose=False):
+  """
+  :category: SQL Framework
+  :rubric: PY
+  :type: Engine
+  :dsc:
+    Remove the tables definitions of a database (or of all the databases if dbUrl is None), they will be reflected again
+    on their next use. This should be called when the tables are changed outside of the SqlConn objects.
+    With dispose the engines and their connections are removed.
+  :example: invalidate(dispose=True)
+  """
+  with _enginesLock:
+    for key in ([str(dbUrl)] if dbUrl is not None else list(ENGINES)):
+      if not key in ENGINES:
+        continue
+
+      if os.path.exists(_schemaPath(ENGINES[key]['url'])):
+        os.remove(_schemaPath(ENGINES[key]['url']))
+      ENGINES[key]['dirty'] = False
+      if dispose:
+        ENGINES.pop(key)['engine'].dispose()
+      else:
+        ENGINES[key]['metadata'].clear()
+        ENGINES[key]['version'] = _schemaVersion(ENGINES[key]['engine'])
 
 
 class SqlConn(object):
@@ -38,6 +189,8 @@ class SqlConn(object):
   :link Documentation: https://www.pythonsheets.com/notes/python-sqlalchemy.html#join-joined-two-tables-via-join-statement
   """
   _extPackages = None
+  # Number of records sent in one executemany call by insert and loadDataFile
+  INSERT_CHUNK_SIZE = 5000
 
   def __init__(self, dbFamily, database=None, filename=None, modelPath=None, reset=False, migrate=True, **kwargs):
     """
@@ -60,23 +213,25 @@ class SqlConn(object):
     self.dbPath = database
     self.username = kwargs.get('username')
     self.userhost = kwargs.get('userhost')
-    self.engine = sqlalchemy.create_engine(sqlalchemy.engine.url.URL(**dbConfig))
-    self.metadata = sqlalchemy.MetaData(bind=self.engine)
-    self.metadata.reflect()
-    self.metadata.create_all(self.engine)
-    self.session = sessionmaker(bind=self.engine)()
+    # Time to live of the getData results in the QUERY_CACHE (None to not cache, True to keep them until a write)
+    self.cacheTTL = kwargs.get('cacheTTL')
+    # The engine and the schema are shared, this object only creates a new session
+    self.dbUrl = sqlalchemy.engine.url.URL(**dbConfig)
+    self._cacheSource = "sql_%s" % hashlib.sha1(repr(self.dbUrl).encode('utf-8')).hexdigest()
+    dbEngine = getEngine(self.dbUrl, **kwargs.get('engineOptions', {}))
+    self.engine, self.metadata = dbEngine['engine'], dbEngine['metadata']
+    self.session = dbEngine['session']()
     if modelPath:
       self.loadSchema(filename=filename, modelPath=modelPath, reset=reset, migrate=migrate)
-      self.metadata.reflect()
 
 
   def _loadSqlFile(self, fileName, reset, migrate):
     """
 
     :param filePath:
-    :return:
+    :return: True if a table was created, reset or dropped
     """
-    on_init_fnc = None
+    on_init_fnc, isChanged = None, False
     modelMod = importlib.import_module(fileName.replace('.py', ''))
     for tableName, table in inspect.getmembers(modelMod):
       if tableName == 'on_init':
@@ -85,8 +240,11 @@ class SqlConn(object):
         tableDef = getattr(modelMod, tableName)()
         tableDef.append(sqlalchemy.Column('lst_mod_dt', sqlalchemy.DateTime, default=datetime.datetime.utcnow(), nullable=True))
         if not self.engine.has_table(tableName):
+          if tableName in self.metadata.tables:
+            self.metadata.remove(self.metadata.tables[tableName])
           newTable = sqlalchemy.Table(tableName, self.metadata, *tableDef)
           newTable.create(self.engine, checkfirst=True)
+          isChanged = True
         else:
           # if migrate:
           #   oldTable = '__old_%s' % tableName
@@ -97,12 +255,16 @@ class SqlConn(object):
           #   self.migrateTable(oldTable, tableName)
           #   sqlalchemy.Table(oldTable, self.metadata).drop(self.engine)
           if reset:
+            if tableName in self.metadata.tables:
+              self.metadata.remove(self.metadata.tables[tableName])
             newTable = sqlalchemy.Table(tableName, self.metadata, *tableDef)
             newTable.drop(self.engine, checkfirst=True)
             newTable.create(self.engine, checkfirst=True)
+            isChanged = True
     #We do the part where we run default that need to happen on database creation
     if on_init_fnc:
       on_init_fnc(self)
+    return isChanged
 
   def help(self, category=None, rubric=None, type=None, value=None, enum=None, section=None, function=None, lang='eng', outType=None):
     """
@@ -152,6 +314,31 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     outStream.src(__file__)
     outStream.export(outType)
 
+  def refreshSchema(self):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Remove the tables definitions, they will be reflected again on their next use. The schema is shared by all the
+      connections to this database in the process
+    :return: self
+    """
+    invalidate(self.dbUrl)
+    self.clearCache()
+    return self
+
+  def clearCache(self):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Remove the cached query results of this database. This is done automatically by the writes done with this object
+      (insert, delete, emptyTable, drop, commit...) but not for the writes done by other processes (see cacheTTL)
+    :return: self
+    """
+    QUERY_CACHE.clear(self._cacheSource)
+    return self
+
   def loadSchema(self, filename=None, modelPath=None, reset=False, migrate=True):
     """
     :category: SQL Framework
@@ -159,7 +346,9 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     :dsc:
       Function that takes care of initialising the DB
       Please note that some column names are prohibited such as lst_mod_dt
+      The shared schema and the cached queries are only invalidated when a table is created, reset or dropped
     """
+    isChanged = False
 
     if not filename and not modelPath:
       raise Exception("You need to specify at least a file name or a model path")
@@ -173,16 +362,18 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
         if filename and filename != pyFile:
           continue
 
-        self._loadSqlFile(pyFile, reset, migrate)
+        isChanged = self._loadSqlFile(pyFile, reset, migrate) or isChanged
     elif filename:
-      self._loadSqlFile(filename, reset, migrate)
+      isChanged = self._loadSqlFile(filename, reset, migrate)
+    if isChanged:
+      self.refreshSchema()
 
   def cloneTable(self, oldTable, newTable, mapping=None, force=False):
     """
     :dsc: Helps to migrate between two tables. The mapping argument is used in case the column names differ between the two tables
     """
 
-    oldTableSchema = sqlalchemy.Table(oldTable, self.metadata)
+    oldTableSchema = self.table(oldTable)
     print(self.engine.table_names())
     print(self.metadata.tables)
     newTableSchema = sqlalchemy.Table(newTable, self.metadata)
@@ -197,6 +388,7 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       newTableSchema.append_column(column)
     print(newTableSchema.columns)
     newTableSchema.create(self.engine, checkfirst=True)
+    self.refreshSchema()
 
   def migrateTable(self, fromTable, toTable, mapping=None):
     """
@@ -235,16 +427,16 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       conn = self.engine.connect()
       header = dataMod.data[0]
       sqlTarget = self.table(dataMod.target)
-      if reset:
-        conn.execute(sqlTarget.delete())
-      if dataMod.target in newTables or newTables is None:
-        print("Loading data from %s" % dataMod.target)
-        if isinstance(header, list):
-          for rec in dataMod.data[1:]:
-            conn.execute(sqlTarget.insert().values(dict(zip(header, rec))))
-        else:
-          for rec in dataMod.data:
-            conn.execute(sqlTarget.insert().values(rec))
+      with conn.begin():
+        if reset:
+          conn.execute(sqlTarget.delete())
+        if newTables is None or dataMod.target in newTables:
+          print("Loading data from %s" % dataMod.target)
+          records = [dict(zip(header, rec)) for rec in dataMod.data[1:]] if isinstance(header, list) else dataMod.data
+          for i in range(0, len(records), self.INSERT_CHUNK_SIZE):
+            for recordsGrp in self._sameColumns(records[i:i + self.INSERT_CHUNK_SIZE]):
+              conn.execute(sqlTarget.insert(), recordsGrp)
+      self.clearCache()
 
   def where(self, stmts):
     """
@@ -267,14 +459,14 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     !rubric: PY
     :example: aresObj.db().select(["worldcup_teams"])
     :dsc:
-      Create a SQL statment
+      Create a SQL statment. The select is not run, the returned frame records the next operations (see SqlFrame)
     :link sqlalchemy: http://docs.sqlalchemy.org/en/latest/core/selectable.html
     :link sqlalchemy: http://docs.sqlalchemy.org/en/latest/core/sqlelement.html
-    :return: self
+    :return: A lazy SqlFrame, the query is run only when the data is used
     """
-    tables = [sqlalchemy.Table(table, self.metadata, autoload=True) for table in tableNames]
+    tables = [self.table(table) for table in tableNames]
     self.query = sqlalchemy.sql.select(tables)
-    return self
+    return SqlFrame(self, tables)
 
   def delete(self, tableName):
     """
@@ -292,20 +484,41 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     self.query = sqlalchemy.sql.select(tables)
     return self
 
-  def insert(self, tableName, records, commit=False, colUserName=None):
+  def _sameColumns(self, records):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Split a list of records in groups of successive records with the same columns. A statement executed with executemany
+      only uses the columns of the first record.
+    :return: A list of lists of records
+    """
+    groups, columns = [], None
+    for rec in records:
+      recColumns = set(rec)
+      if recColumns != columns:
+        groups.append([])
+        columns = recColumns
+      groups[-1].append(rec)
+    return groups
+
+  def insert(self, tableName, records, commit=False, colUserName=None, chunkSize=None):
     """
     :category: SQL Framework
     !rubric: PY
-    :example: db.insert('table1',[{'name': 'test'}], commit=True)
+    :example:
+      db.insert('table1',[{'name': 'test'}], commit=True)
+      db.insert('table1', df, commit=True, chunkSize=10000)
     :dsc:
-        insert a list of records to a table
-    :return: The python object itself
+        insert a list of records (or a dataframe) to a table.
+        The records are sent by chunks of chunkSize records (INSERT_CHUNK_SIZE by default) in a single executemany call.
+        If a chunk fails, its records are inserted one by one in order to only reject the records in error. The records
+        with keys which are not columns of the table are rejected (executemany would ignore those keys).
+    :return: A tuple with the status, the number of records in error and the error messages
     """
     dflt = {'lst_mod_dt': datetime.datetime.utcnow()}
     errorCount, errorLog = 0, []
-    table = sqlalchemy.Table(tableName, self.metadata)
-    if not self.engine.has_table(table.name):
-      raise Exception("Table does not exist")
+    table = self.table(tableName)
 
     if colUserName is not None:
       dflt[colUserName] = self.username
@@ -313,15 +526,36 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       dflt['hostname'] = self.userhost
     if isinstance(records, dict):
       records = [records]
-    for rec in records:
-      try:
-        tmpRec = dict(rec)
-        tmpRec.update(dflt)
-        self.session.execute(table.insert().values(tmpRec))
-      except Exception as err:
-        logging.warning(traceback.format_exc())
-        errorCount += 1
-        errorLog.append(traceback.format_exc().split('\n')[-1])
+    if isinstance(records, ares_pandas.DataFrame):
+      # The dataframe is converted column by column, the missing values are stored as NULL
+      values = records.astype(object).where(records.notnull(), None)
+      for col, val in dflt.items():
+        values[col] = val
+      cols = list(values.columns)
+      records = [dict(zip(cols, row)) for row in values.values.tolist()]
+    else:
+      records = [dict(rec, **dflt) for rec in records]
+    chunkSize, colNames = chunkSize or self.INSERT_CHUNK_SIZE, set(table.c.keys())
+    for i in range(0, len(records), chunkSize):
+      for recordsGrp in self._sameColumns(records[i:i + chunkSize]):
+        # The records of a group have the same keys, the ones with unknown columns get their error in the loop below
+        if set(recordsGrp[0]).issubset(colNames):
+          try:
+            with self.session.begin_nested():
+              self.session.execute(table.insert(), recordsGrp)
+            continue
+
+          except Exception as err:
+            logging.debug("Bulk insert failed on %s, insert records one by one" % tableName)
+        for rec in recordsGrp:
+          try:
+            with self.session.begin_nested():
+              self.session.execute(table.insert().values(rec))
+          except Exception as err:
+            logging.warning(traceback.format_exc())
+            errorCount += 1
+            errorLog.append(traceback.format_exc().strip().split('\n')[-1])
+    self.clearCache()
     if commit:
       self.session.commit()
     if errorCount:
@@ -329,23 +563,76 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
 
     return (True, 0, [])
 
-  def getData(self, limit=None):
+  def getData(self, limit=None, cacheTTL=None):
     """
     :category: SQL Framework
     :rubric: PY
-    :example: aresObj.db().getData()
+    :example:
+      aresObj.db().getData()
+      aresObj.db().select(['table1']).getData(cacheTTL=600)
     :dsc:
       Returns the results of the select statement previously instantiated in a pandas dataframe
-
+      With a cacheTTL (or the cacheTTL of the database) the result is stored in the QUERY_CACHE with the compiled SQL
+      and its parameters as key. The writes done with this object remove the cached results of the database.
     :return: A pandas dataframe
     """
     if self.query is None:
       return None
 
-    if limit:
-      return ares_pandas.read_sql(self.query, self.query.bind).head(limit)
+    query = self.query.limit(limit) if limit else self.query
+    cacheTTL = cacheTTL if cacheTTL is not None else self.cacheTTL
+    if not cacheTTL:
+      return ares_pandas.read_sql(query, self.engine)
+
+    compiled = query.compile(dialect=self.engine.dialect)
+    cacheKey = AresConnCache.ResultCache.key(self._cacheSource, str(compiled), sorted(compiled.params.items()))
+    isCached, df = QUERY_CACHE.get(self._cacheSource, cacheKey)
+    if not isCached:
+      df = ares_pandas.read_sql(query, self.engine)
+      QUERY_CACHE.set(self._cacheSource, cacheKey, df, float('inf') if cacheTTL is True else cacheTTL)
+    return df.copy()
+
+  def iterData(self, chunksize=10000, limit=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example:
+      for df in aresObj.db().select(['table1']).iterData(chunksize=50000):
+        print(df['value'].sum())
+    :dsc:
+      Similar to getData but the result is read by chunks of chunksize rows using a server side cursor (stream_results).
+      Thus only one chunk is in memory at a time and tables bigger than the memory can be processed (see toCsv and
+      SqlFrame.pushDown for the aggregations). The limit is added to the SQL query.
+    :return: An iterator over AReS Dataframes
+    """
+    if self.query is None:
+      return
+
+    query = self.query.limit(limit) if limit else self.query
+    with self.engine.connect() as conn:
+      result = conn.execution_options(stream_results=True).execute(query)
+      columns = list(result.keys())
+      while True:
+        rows = result.fetchmany(chunksize)
+        if not rows:
+          break
 
-    return ares_pandas.read_sql(self.query, self.query.bind)
+        yield AresFilePandas.AresFileDataFrame(data=[tuple(row) for row in rows], columns=columns, aresObj=getattr(self, 'aresObj', None))
+
+  def toCsv(self, filePath, chunksize=10000, limit=None, delimiter='\t', encoding='utf8'):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: aresObj.db().select(['table1']).toCsv(r'outputs/table1.csv')
+    :dsc:
+      Write the result of the select statement to a csv file chunk by chunk (see iterData).
+    :return: The number of rows written
+    """
+    count = 0
+    for i, df in enumerate(self.iterData(chunksize=chunksize, limit=limit)):
+      df.to_csv(filePath, mode='w' if i == 0 else 'a', header=(i == 0), index=False, sep=delimiter, encoding=encoding)
+      count += len(df)
+    return count
 
   def fetch(self, limit=None):
     """
@@ -353,23 +640,17 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     :rubric: PY
     :example: aresObj.db().fetch()
     :dsc:
-       Similar to getData but return an iterator over a list instead of using pandas
+       Similar to getData but return an iterator over a list instead of using pandas. The limit is added to the SQL query
     :return: An iterator over the result of the query
     """
     if self.query is None:
       yield None
+      return
 
-    counter = 0
-    if not limit:
-      limit = -1
-    for row in self.engine.connect().execute(self.query):
-      if limit == -1 or counter < limit:
-        counter += 1
+    with self.engine.connect() as conn:
+      for row in conn.execute(self.query.limit(limit) if limit else self.query):
         yield row
 
-      else:
-        raise StopIteration
-
   def tablesList(self):
     """
     :category: SQL Framework
@@ -390,12 +671,7 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
         Return the list of columns defined in the selected database
     :return: A python object with the list of tables
     """
-
-    table = sqlalchemy.Table(tableName, self.metadata)
-    if self.engine.has_table(table.name):
-      return table.columns
-
-    raise Exception('Table does not exist')
+    return self.table(tableName).columns
 
   def table(self, tableName):
     """
@@ -403,13 +679,22 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     :rubric: PY
     :example: db.table('table1')
     :dsc:
-      Return a sqlAlchemy table object. This can be useful in the where clauses
+      Return a sqlAlchemy table object. This can be useful in the where clauses.
+      The table definition is reflected from the database only on its first use in the process (or taken from the schema snapshot)
     :return: Python table object
     """
-    if self.engine.has_table(tableName):
-      return sqlalchemy.Table(tableName, self.metadata)
+    # The metadata can be cleared by invalidate in another thread, the check and the lookup are done under the lock
+    with _enginesLock:
+      if not tableName in self.metadata.tables:
+        try:
+          table = sqlalchemy.Table(tableName, self.metadata, autoload=True)
+        except sqlalchemy.exc.NoSuchTableError:
+          raise Exception('Table does not exist')
 
-    raise Exception('Table does not exist')
+        saveSchema(self.dbUrl, force=False)
+        return table
+
+      return self.metadata.tables[tableName]
 
   def column(self, tableName, columnName):
     """
@@ -420,9 +705,7 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       Return a sqlAlchemy column object. This can be useful in the where clauses
     :return: Python column object
     """
-    table = sqlalchemy.Table(tableName, self.metadata, autoload=True)
-    if self.engine.has_table(table.name):
-      return getattr(table.c, columnName)
+    return getattr(self.table(tableName).c, columnName)
 
   def drop(self, tableName, withCheck=True):
     """
@@ -442,10 +725,12 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       except:
         name = raw_input("Are you sure to delete the table %s (Y/N)? " % tableName)
       if name == 'Y':
-        sqlalchemy.Table(tableName, self.metadata, autoload=True).drop()
+        self.table(tableName).drop()
+        self.refreshSchema()
         logging.info("Table %s deleted" % tableName)
     else:
-      sqlalchemy.Table(tableName, self.metadata, autoload=True).drop()
+      self.table(tableName).drop()
+      self.refreshSchema()
       logging.info("Table %s deleted" % tableName)
 
   def delete(self, tableName, whereClauses=None, commit=False):
@@ -462,6 +747,7 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
       self.engine.execute(self.table(tableName).delete().where(whereClauses))
     else:
       self.engine.execute(self.table(tableName).delete())
+    self.clearCache()
     if commit:
       self.commit()
     return self
@@ -483,6 +769,7 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
 
   def commit(self):
     self.session.commit()
+    self.clearCache()
 
   def createTable(self, records, fileName, tableName, path=None, reset=False, migrate=True, commit=True, isAresDf=True):
     """
@@ -497,6 +784,364 @@ The database framework in AReS is fully based on [SqlAlchemy]( https://www.sqlal
     self.insert(records=records.records(), commit=commit, tableName=tableName)
 
 
+class SqlFrame(object):
+  """
+  :category: SQL Framework
+  :rubric: PY
+  :type: class
+  :dsc:
+    Lazy dataframe returned by SqlConn.select. The projections, filters, sorts, limits, distinct, aggregations and lookups
+    are only recorded and compiled to a single SQL statement. The query is run only when the data is needed, for example when
+    the frame is used in a component (records, html...) or with getData. Thus a top(10, col) only reads 10 rows.
+    The other AReS Dataframe functions are available and they are run on the materialised dataframe.
+  :example:
+    db.select(['sales']).where([db.column('sales', 'year') == 2019]).groupBy(['country'], {'amount': 'sum'}).top(10, 'amount')
+  """
+  AGG_FNCS = {'sum': 'sum', 'count': 'count', 'min': 'min', 'max': 'max', 'avg': 'avg', 'mean': 'avg'}
+  # Databases without NULLS LAST, the missing values are sorted last with a CASE expression
+  NULLS_LAST_EMULATED = ('mysql', 'mssql')
+
+  def __init__(self, sqlConn, source, columns=None, filters=None, orders=None, limit=None, distinct=False, htmlCode=None):
+    self._sqlConn, self._source, self._columns, self._filters = sqlConn, source, columns, filters or []
+    self._orders, self._limit, self._distinct, self._htmlCode, self._df = orders or [], limit, distinct, htmlCode, None
+
+  def _copy(self, **kwargs):
+    attrs = {'columns': self._columns, 'filters': self._filters, 'orders': self._orders, 'limit': self._limit,
+             'distinct': self._distinct, 'htmlCode': self._htmlCode}
+    attrs.update(kwargs)
+    return SqlFrame(self._sqlConn, self._source, **attrs)
+
+  def _result(self, frame, inplace):
+    """ Return the new frame, or with inplace change this frame to the new one (as the AReS Dataframe functions) """
+    if not inplace:
+      return frame
+
+    self.__dict__.update(frame.__dict__)
+    return self
+
+  def _orderBy(self, col, ascending):
+    # The missing values are last in both directions, as with pandas sort_values
+    if self._sqlConn.engine.dialect.name in self.NULLS_LAST_EMULATED:
+      return [sqlalchemy.case([(col.is_(None), 1)], else_=0), col if ascending else col.desc()]
+
+    return [(col.asc() if ascending else col.desc()).nullslast()]
+
+  def _subQuery(self):
+    """ Return a new frame reading the result of this one. This is used when the next operation cannot be added to this statement """
+    return SqlFrame(self._sqlConn, [self.sql().alias()], htmlCode=self._htmlCode)
+
+  def _column(self, colName):
+    for source in self._source:
+      if colName in source.c:
+        return source.c[colName]
+
+    raise Exception("Column %s not found in the query" % colName)
+
+  def _adapt(self, stmt):
+    # The clauses defined on the tables are changed to use the columns of the sub queries
+    for source in self._source:
+      if isinstance(source, sqlalchemy.sql.expression.Alias):
+        stmt = sqlalchemy.sql.util.ClauseAdapter(source).traverse(stmt)
+
+    # The other columns (for example a table column after a groupBy) would add their table to the FROM clause as a cross
+    # join, they are replaced by the column of the query with the same name
+    def replace(element):
+      if isinstance(element, sqlalchemy.sql.expression.ColumnClause) and element.table is not None:
+        if not any(element.table is source for source in self._source):
+          return self._column(element.name)
+
+    return sqlalchemy.sql.visitors.replacement_traverse(stmt, {}, replace)
+
+  @property
+  def headers(self):
+    if self._columns is not None:
+      return list(self._columns)
+
+    return [col.name for source in self._source for col in source.c]
+
+  def sql(self):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Return the SQL statement of the frame
+    :return: A sqlalchemy select statement
+    """
+    query = sqlalchemy.sql.select(self._source if self._columns is None else [self._column(col) for col in self._columns])
+    for stmt in self._filters:
+      query = query.where(stmt)
+    if self._distinct:
+      query = query.distinct()
+    if self._orders:
+      query = query.order_by(*[clause for col, asc in self._orders for clause in self._orderBy(self._column(col), asc)])
+    if self._limit is not None:
+      query = query.limit(self._limit)
+    return query
+
+  def where(self, stmts):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).where([db.column('table1', 'column') == 'X'])
+    :dsc:
+      Add a where clause to the query. After a groupBy the columns are the aggregated ones (the filter is done on the
+      result of the aggregation). A column which is not in the query raises an exception.
+    :return: A new SqlFrame
+    """
+    frame = self._subQuery() if self._limit is not None else self
+    return frame._copy(filters=frame._filters + [frame._adapt(stmt) for stmt in stmts])
+
+  def reduce(self, colNames, inplace=True):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).reduce(['col1', 'col2'])
+    :dsc:
+      Only select some columns. As for the AReS Dataframe the frame itself is changed unless inplace is False.
+    :return: The SqlFrame (or a new SqlFrame without inplace)
+    """
+    frame = self._subQuery() if self._distinct else self
+    return self._result(frame._copy(columns=list(colNames)), inplace)
+
+  def sort(self, colsIdx, ascending=True, inplace=True):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).sort(['col1', 'col2'], ascending=[True, False])
+    :dsc:
+      Add an order by clause to the query. The missing values are last. As for the AReS Dataframe the frame itself is
+      changed unless inplace is False.
+    :return: The SqlFrame (or a new SqlFrame without inplace)
+    """
+    colsIdx = colsIdx if isinstance(colsIdx, list) else [colsIdx]
+    ascending = ascending if isinstance(ascending, list) else [ascending] * len(colsIdx)
+    frame = self._subQuery() if self._limit is not None else self
+    return self._result(frame._copy(orders=list(zip(colsIdx, ascending))), inplace)
+
+  def head(self, n=5):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Only read the first n rows.
+    :return: A new SqlFrame
+    """
+    return self._copy(limit=n if self._limit is None else min(n, self._limit))
+
+  def top(self, n, colName, ascending=False):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).top(10, "col1")
+    :dsc:
+      Only read the Nth top values in the selected column. The missing values are last, as with the AReS Dataframe.
+    :return: A new SqlFrame
+    """
+    return self.sort(colName, ascending=ascending, inplace=False).head(n)
+
+  def drop_duplicates(self):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Add a distinct to the query.
+    :return: A new SqlFrame
+    """
+    frame = self._subQuery() if self._limit is not None else self
+    return frame._copy(distinct=True)
+
+  def groupBy(self, keys, aggs):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).groupBy(['country'], {'amount': 'sum', 'id': 'count'})
+    :dsc:
+      Aggregate the query by the keys. The aggregated columns keep their name.
+      The functions available are sum, count, min, max and avg (or mean).
+    :return: A new SqlFrame
+    """
+    keys = keys if isinstance(keys, list) else [keys]
+    frame = self._subQuery() if (self._limit is not None or self._distinct) else self
+    aggCols = []
+    for colName, fnc in aggs.items():
+      if not fnc in self.AGG_FNCS:
+        raise Exception("Aggregation function %s not available, it should be in %s" % (fnc, list(self.AGG_FNCS)))
+
+      aggCols.append(getattr(sqlalchemy.func, self.AGG_FNCS[fnc])(frame._column(colName)).label(colName))
+    query = sqlalchemy.sql.select([frame._column(key) for key in keys] + aggCols)
+    for stmt in frame._filters:
+      query = query.where(stmt)
+    query = query.group_by(*[frame._column(key) for key in keys])
+    return SqlFrame(self._sqlConn, [query.alias()], htmlCode=self._htmlCode)
+
+  def lookupCol(self, left_on, df2, cols, renameCols, right_on=None, aggFnc=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['trades']).lookupCol('country', db.select(['countries']), ['region'], {'region': 'area'})
+    :dsc:
+      Add columns of another frame with a left join in the database. The missing looked up values are 0.
+      When a renamed column already exists, aggFnc (sum or avg) combines both values, otherwise the columns are suffixed
+      with _x and _y. If df2 is not a frame of the same database the lookup is done on the materialised dataframes.
+    :return: A new SqlFrame
+    """
+    if not isinstance(df2, SqlFrame) or df2._sqlConn.engine is not self._sqlConn.engine:
+      return self.toDf().lookupCol(left_on, df2, cols, renameCols, right_on=right_on, aggFnc=aggFnc)
+
+    right_on = left_on if right_on is None else right_on
+    headers, newCols = self.headers, [(col, renameCols.get(col, col)) for col in cols]
+    left, right = self.sql().alias(), df2.reduce([right_on] + [col for col in cols if col != right_on], inplace=False).sql().alias()
+    isAgg = aggFnc in ('sum', 'avg')
+    selectCols = []
+    for col in headers:
+      if not col in [newCol for _, newCol in newCols]:
+        selectCols.append(left.c[col])
+      elif not isAgg:
+        selectCols.append(left.c[col].label('%s_x' % col))
+    if right_on != left_on and not right_on in headers:
+      selectCols.append(right.c[right_on])
+    for col, newCol in newCols:
+      value = sqlalchemy.func.coalesce(right.c[col], 0)
+      if newCol in headers:
+        if isAgg:
+          value = sqlalchemy.func.coalesce(left.c[newCol], 0) + value
+          value = value / 2.0 if aggFnc == 'avg' else value
+        else:
+          newCol = '%s_y' % newCol
+      selectCols.append(value.label(newCol))
+    query = sqlalchemy.sql.select(selectCols).select_from(left.outerjoin(right, left.c[left_on] == right.c[right_on]))
+    return SqlFrame(self._sqlConn, [query.alias()], htmlCode=self._htmlCode)
+
+  def tolist(self, colName, dropDuplicates=False, withAll=False):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['table1']).tolist('col1', dropDuplicates=True)
+    :dsc:
+      Read a single column. With dropDuplicates the distinct is done in the database.
+    :return: A Python list
+    """
+    frame = self.reduce([colName], inplace=False)
+    if dropDuplicates:
+      frame = frame.drop_duplicates()
+    values = [row[0] for row in frame.fetch()]
+    return [''] + values if withAll else values
+
+  @property
+  def count(self):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Number of rows of the query. This is computed in the database.
+    :return: An integer
+    """
+    with self._sqlConn.engine.connect() as conn:
+      return conn.execute(sqlalchemy.sql.select([sqlalchemy.func.count()]).select_from(self.sql().alias())).scalar()
+
+  def __len__(self):
+    return self.count
+
+  def getData(self, limit=None, cacheTTL=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Run the query and return a pandas dataframe (see SqlConn.getData)
+    :return: A pandas dataframe
+    """
+    self._sqlConn.query = self.sql()
+    return self._sqlConn.getData(limit=limit, cacheTTL=cacheTTL)
+
+  def fetch(self, limit=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Run the query and return an iterator over the rows (see SqlConn.fetch)
+    :return: An iterator over the result of the query
+    """
+    self._sqlConn.query = self.sql()
+    return self._sqlConn.fetch(limit=limit)
+
+  def iterData(self, chunksize=10000, limit=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Run the query and return an iterator over AReS Dataframes of chunksize rows (see SqlConn.iterData)
+    :return: An iterator over AReS Dataframes
+    """
+    self._sqlConn.query = self.sql()
+    return self._sqlConn.iterData(chunksize=chunksize, limit=limit)
+
+  def toCsv(self, filePath, chunksize=10000, limit=None, delimiter='\t', encoding='utf8'):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Write the result of the query to a csv file chunk by chunk (see SqlConn.toCsv)
+    :return: The number of rows written
+    """
+    self._sqlConn.query = self.sql()
+    return self._sqlConn.toCsv(filePath, chunksize=chunksize, limit=limit, delimiter=delimiter, encoding=encoding)
+
+  def pushDown(self, fncNames, chunksize=10000, htmlCode=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :example: db.select(['trades']).pushDown([('sum', ['country'], ['amount']), ('top', 10, 'amount')])
+    :dsc:
+      Run the record functions (defined as in the Js fncs) on the query chunk by chunk (see AresJsPushDown.runChunks).
+      The first function should be an aggregation (sum, count or aggregation), thus only one chunk and the groups are
+      in memory and the result can be used by the components instead of the table.
+    :return: An AReS Dataframe
+    """
+    fncs = [{'name': "ares_%s" % fncName[0].replace("-", ""), 'args': list(fncName)[1:]} for fncName in fncNames]
+    df = ares_pandas.DataFrame(AresJsPushDown.toRecords(AresJsPushDown.runChunks(self.iterData(chunksize=chunksize), fncs)))
+    htmlCode = htmlCode if htmlCode is not None else self._htmlCode
+    aresObj = getattr(self._sqlConn, 'aresObj', None)
+    if aresObj is not None:
+      return aresObj.df(df, htmlCode=htmlCode)
+
+    return AresFilePandas.AresFileDataFrame(data=df, htmlCode=htmlCode)
+
+  def toDf(self, htmlCode=None, aresObj=None):
+    """
+    :category: SQL Framework
+    :rubric: PY
+    :dsc:
+      Run the query and return the AReS Dataframe. The result is kept, thus the query is run only once for the frame.
+      This is called automatically when the frame is used by a component.
+    :return: An AReS Dataframe
+    """
+    if self._df is None:
+      htmlCode = htmlCode if htmlCode is not None else self._htmlCode
+      df = self.getData()
+      aresObj = aresObj if aresObj is not None else getattr(self._sqlConn, 'aresObj', None)
+      if aresObj is not None:
+        self._df = aresObj.df(df, htmlCode=htmlCode)
+      else:
+        self._df = AresFilePandas.AresFileDataFrame(data=df, htmlCode=htmlCode)
+    return self._df
+
+  def records(self, selectCols=None, dropna=None):
+    return self.toDf().records(selectCols=selectCols, dropna=dropna)
+
+  def html(self):
+    return self.toDf().html()
+
+  def __getitem__(self, colName):
+    return self.toDf()[colName]
+
+  def __getattr__(self, name):
+    # All the other functions of the AReS Dataframe are run on the result of the query
+    if name.startswith('_'):
+      raise AttributeError(name)
+
+    return getattr(self.toDf(), name)
+
+
 class AresSqlConn(SqlConn):
   """
   :category: SQL Framework
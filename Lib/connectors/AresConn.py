@@ -2,14 +2,18 @@
 # -*- coding: utf-8 -*-
 # author: Olivier Noguès
 
+import asyncio
+import functools
 import importlib
 import inspect
 import logging
 import os
 import sys
+import threading
 import traceback
 
 from ares.Lib import AresMarkDown
+from ares.Lib.connectors import AresConnCache
 import ares.Lib.AresSql
 
 
@@ -36,6 +40,17 @@ class AresConn(object):
   ENV = None
   SECURED = True
 
+  # Time to live in seconds of the getData results in the cache (None to not cache the results)
+  # The user context keys are added to the cache key as the data returned might depend on the user
+  CACHE_TTL = None
+  CACHE_USER_KEYS = ('user', 'groups')
+  # Source definition keys which do not change the result and which are not in the cache key
+  CACHE_IGNORED_SOURCE_KEYS = ('cache_ttl', 'max_concurrency')
+
+  # Maximum number of concurrent calls to the source in the process (can be overridden with max_concurrency in the source definition)
+  MAX_CONCURRENCY = 4
+  __semaphores, __semaphoresLock = {}, threading.Lock()
+
   def __init__(self, aresObj=None):
     """
     :category: Connector
@@ -47,9 +62,55 @@ class AresConn(object):
     self.aresObj = aresObj
 
   @classmethod
-  def getData(cls, params, **kwargs):
+  def getData(cls, params, env=None, cacheTTL=None, **kwargs):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Call the connector and return the result. If a time to live is defined (cacheTTL, the source definition cache_ttl
+      or the class CACHE_TTL) the result will be taken from the cache AresConnCache if it is available.
+    :return: A tuple with the status and the result (or the error message)
+    """
+    cacheTTL, cacheKey = cls._cacheKey(params, env, cacheTTL, kwargs)
+    if cacheTTL:
+      isCached, res = AresConnCache.CACHE.get(getattr(cls, 'ALIAS', cls.__name__), cacheKey)
+      if isCached:
+        return (True, res)
+
     try:
       res = cls._getData(params, **kwargs)
+      if cacheTTL:
+        AresConnCache.CACHE.set(getattr(cls, 'ALIAS', cls.__name__), cacheKey, res, cacheTTL)
+      return (True, res)
+
+    except Exception as e:
+      print(e)
+      logging.debug("%s | %s" % (cls.__name__, e), exc_info=True)
+      return (False, "%s %s" % (cls.__name__, traceback.format_exc().strip().split('\n')[-1]) )
+
+  @classmethod
+  async def agetData(cls, params, env=None, cacheTTL=None, **kwargs):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Coroutine version of getData. The connector coroutine _agetData is awaited, thus many sources can be called on the
+      same event loop. The cache is used in the same way as getData.
+    :example: status, res = await AresJira.AresJira.agetData(params, env='LIVE', sourceDef=sourceDef)
+    :return: A tuple with the status and the result (or the error message)
+    """
+    cacheTTL, cacheKey = cls._cacheKey(params, env, cacheTTL, kwargs)
+    if cacheTTL:
+      isCached, res = AresConnCache.CACHE.get(getattr(cls, 'ALIAS', cls.__name__), cacheKey)
+      if isCached:
+        return (True, res)
+
+    try:
+      res = await cls._agetData(params, **kwargs)
+      if cacheTTL:
+        AresConnCache.CACHE.set(getattr(cls, 'ALIAS', cls.__name__), cacheKey, res, cacheTTL)
       return (True, res)
 
     except Exception as e:
@@ -57,6 +118,59 @@ class AresConn(object):
       logging.debug("%s | %s" % (cls.__name__, e), exc_info=True)
       return (False, "%s %s" % (cls.__name__, traceback.format_exc().strip().split('\n')[-1]) )
 
+  @classmethod
+  async def _agetData(cls, params, **kwargs):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Coroutine called by agetData. By default the blocking _getData is run in the event loop executor, the connectors
+      doing HTTP calls should override this with a real coroutine.
+    :return: The connector result
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(cls._getData, params, **kwargs))
+
+  @classmethod
+  def _cacheKey(cls, params, env, cacheTTL, kwargs):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Return the time to live (cacheTTL, the source definition cache_ttl or the class CACHE_TTL) and the cache key of a request.
+      The key is built with the parameters, the environment, the user context keys CACHE_USER_KEYS and all the other
+      options sent to _getData (the source definition without the CACHE_IGNORED_SOURCE_KEYS).
+    :return: A tuple with the time to live and the key (None if the result should not be cached)
+    """
+    sourceDef, userContext = kwargs.get('sourceDef') or {}, kwargs.get('userContext') or {}
+    cacheTTL = cacheTTL if cacheTTL is not None else sourceDef.get('cache_ttl', cls.CACHE_TTL)
+    if not cacheTTL:
+      return cacheTTL, None
+
+    alias = getattr(cls, 'ALIAS', cls.__name__)
+    options = dict([(k, v) for k, v in kwargs.items() if k not in ('sourceDef', 'userContext')])
+    options['sourceDef'] = dict([(k, v) for k, v in sourceDef.items() if k not in cls.CACHE_IGNORED_SOURCE_KEYS])
+    return cacheTTL, AresConnCache.ResultCache.key(alias, [params, options], env, dict([(k, userContext.get(k)) for k in cls.CACHE_USER_KEYS]))
+
+  @classmethod
+  def semaphore(cls, sourceDef=None):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Return the semaphore limiting the number of concurrent calls to this source. This is shared by all the reports
+      in the process in order to not flood the source system.
+    :example: with connCls.semaphore(sourceDef): connCls.getData(params)
+    :return: A threading BoundedSemaphore
+    """
+    alias = getattr(cls, 'ALIAS', cls.__name__)
+    with AresConn.__semaphoresLock:
+      if not alias in AresConn.__semaphores:
+        AresConn.__semaphores[alias] = threading.BoundedSemaphore((sourceDef or {}).get('max_concurrency', cls.MAX_CONCURRENCY))
+      return AresConn.__semaphores[alias]
+
   @classmethod
   def getSource(cls, sourceCode, run_details):
     return cls.getSources()[sourceCode][1]
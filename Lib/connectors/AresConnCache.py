@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {
+  'eng': '''
+  :dsc:
+Result cache for the connectors getData calls.
+__
+The results are stored per source, parameters, environment and the part of the user context used by the connector.
+The most recent results are kept in memory up to a byte budget and all the results are also written to a disk store in
+order to be shared between the different processes and to survive a server restart.
+__
+The cache is only used for the sources with a time to live (TTL). This can be defined in the connector class (CACHE_TTL),
+in the source definition (cache_ttl) or directly in the getData call (cacheTTL)
+
+```python
+aresObj.getData('JIRA', params, cacheTTL=600)
+```
+
+The location of the disk store and the memory budget can be changed with the environment variables ARES_CACHE_PATH and
+ARES_CACHE_BYTES. The disk store is a private folder of the application (ARES_APP_PATH, by default ~/.ares) as the
+results are pickled: the folder is only accessible by the current user and the files not owned by this user are not read.
+'''}
+
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+import uuid
+import threading
+import collections
+
+
+# Private folder of the application data (the cache stores are pickles, they should not be written by the other users)
+APP_PATH = os.environ.get('ARES_APP_PATH', os.path.join(os.path.expanduser('~'), '.ares'))
+
+
+def privateFolder(path):
+  """
+  :category: Connector
+  :rubric: PY
+  :type: Cache
+  :dsc:
+    Create a folder only accessible by the current user. An existing folder owned by another user is not used.
+  :return: True if the folder can be used
+  """
+  os.makedirs(path, mode=0o700, exist_ok=True)
+  if hasattr(os, 'getuid'):
+    folderStat = os.stat(path)
+    if folderStat.st_uid != os.getuid():
+      logging.warning("Folder %s is not owned by the current user, it is not used" % path)
+      return False
+
+    if folderStat.st_mode & 0o077:
+      os.chmod(path, 0o700)
+  return True
+
+
+def readPrivate(path):
+  """
+  :category: Connector
+  :rubric: PY
+  :type: Cache
+  :dsc:
+    Read a file written by writePrivate. The files not owned by the current user (or writable by the other users) are
+    ignored, thus a pickle cannot be planted in the stores.
+  :return: The bytes of the file or None
+  """
+  if not os.path.exists(path):
+    return None
+
+  if hasattr(os, 'getuid'):
+    fileStat = os.stat(path)
+    if fileStat.st_uid != os.getuid() or fileStat.st_mode & 0o022:
+      logging.warning("File %s is not a private file of the current user, it is not read" % path)
+      return None
+
+  with open(path, "rb") as f:
+    return f.read()
+
+
+def writePrivate(path, data):
+  """
+  :category: Connector
+  :rubric: PY
+  :type: Cache
+  :dsc:
+    Write bytes to a file only readable by the current user. The file is written to a temporary file which is then
+    renamed, thus the readers never get a partial file.
+  :return: True if the file is written
+  """
+  if not privateFolder(os.path.dirname(path)):
+    return False
+
+  tmpPath = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+  with os.fdopen(os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600), "wb") as f:
+    f.write(data)
+  os.replace(tmpPath, path)
+  return True
+
+
+class ResultCache(object):
+  """
+  :category: Connector
+  :rubric: PY
+  :type: Cache
+  :dsc:
+    In memory LRU cache with a byte budget in front of a disk store. The hits, misses and evictions are counted per source.
+    The cache can be used by several threads (for example with Report.getDataMany).
+    The results are kept pickled in memory, thus each get returns a new copy and the callers can change it.
+  """
+
+  def __init__(self, path=None, maxBytes=256 * 1024 * 1024):
+    self.path, self.maxBytes, self.memBytes = path, maxBytes, 0
+    self._mem, self.stats, self._lock = collections.OrderedDict(), {}, threading.RLock()
+
+  @staticmethod
+  def key(source, params, env=None, userContext=None):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Return the cache key for a request. The parameters are written with sorted keys to get the same key for the same request.
+    :example: ResultCache.key('JIRA', {'jql': 'project=ARES'}, 'LIVE', {'user': 'olivier'})
+    :return: A String with the key
+    """
+    keyDef = json.dumps([source, params, env, userContext], sort_keys=True, default=str)
+    return hashlib.sha1(keyDef.encode('utf-8')).hexdigest()
+
+  def _count(self, source, stat):
+    sourceStats = self.stats.setdefault(source, {'hits': 0, 'misses': 0, 'evictions': 0})
+    sourceStats[stat] += 1
+
+  def _filePath(self, key):
+    return os.path.join(self.path, "%s.pkl" % key)
+
+  def _addMem(self, source, key, expiry, data):
+    self.remove(key, disk=False)
+    self._mem[key] = (expiry, len(data), data, source)
+    self.memBytes += len(data)
+    while self.memBytes > self.maxBytes and len(self._mem) > 1:
+      _, (_, oldSize, _, oldSource) = self._mem.popitem(last=False)
+      self.memBytes -= oldSize
+      self._count(oldSource, 'evictions')
+
+  def remove(self, key, disk=True):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Remove a result from the cache.
+    """
+    with self._lock:
+      if key in self._mem:
+        self.memBytes -= self._mem.pop(key)[1]
+      if disk and self.path is not None and os.path.exists(self._filePath(key)):
+        os.remove(self._filePath(key))
+
+  def get(self, source, key):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Return the result from the memory or the disk store. The expired results are removed.
+    :return: A tuple with a boolean (True if found) and the result
+    """
+    with self._lock:
+      key = "%s@%s" % (source, key)
+      if key in self._mem:
+        expiry, _, data, _ = self._mem[key]
+        if expiry > time.time():
+          self._mem.move_to_end(key)
+          self._count(source, 'hits')
+          return True, pickle.loads(data)[1]
+
+        self.remove(key)
+      elif self.path is not None and os.path.exists(self._filePath(key)):
+        try:
+          data = readPrivate(self._filePath(key))
+          if data is not None:
+            expiry, value = pickle.loads(data)
+            if expiry > time.time():
+              self._addMem(source, key, expiry, data)
+              self._count(source, 'hits')
+              return True, value
+
+            self.remove(key)
+        except Exception as err:
+          logging.warning("Cache file %s cannot be read, %s" % (key, err))
+      self._count(source, 'misses')
+      return False, None
+
+  def set(self, source, key, value, ttl):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Store a result for ttl seconds. The results which cannot be pickled are not stored.
+    """
+    with self._lock:
+      key, expiry = "%s@%s" % (source, key), time.time() + ttl
+      try:
+        data = pickle.dumps((expiry, value), pickle.HIGHEST_PROTOCOL)
+      except Exception as err:
+        logging.warning("Result for %s cannot be cached, %s" % (source, err))
+        return
+
+      self._addMem(source, key, expiry, data)
+      if self.path is not None:
+        try:
+          writePrivate(self._filePath(key), data)
+        except Exception as err:
+          logging.warning("Result for %s cannot be written to the disk store, %s" % (source, err))
+
+  def clear(self, source=None):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Remove all the results of a source (or all the results if source is None) from the memory and the disk store.
+    """
+    with self._lock:
+      prefix = "" if source is None else "%s@" % source
+      for key in [k for k in self._mem if k.startswith(prefix)]:
+        self.remove(key)
+      if self.path is not None and os.path.exists(self.path):
+        for fileName in os.listdir(self.path):
+          if fileName.startswith(prefix) and fileName.endswith(".pkl"):
+            os.remove(os.path.join(self.path, fileName))
+
+  def monitor(self, source):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Cache
+    :dsc:
+      Cache statistics for a source since the start of the server. Those are displayed in the dataSourceMonitor
+    :return: A Python dictionary
+    """
+    sourceStats = self.stats.get(source, {'hits': 0, 'misses': 0, 'evictions': 0})
+    return {'Cache Hits': sourceStats['hits'], 'Cache Misses': sourceStats['misses'], 'Cache Evictions': sourceStats['evictions']}
+
+
+# Cache shared by all the reports in the process
+CACHE = ResultCache(os.environ.get('ARES_CACHE_PATH', os.path.join(APP_PATH, 'cache')),
+                    int(os.environ.get('ARES_CACHE_BYTES', 256 * 1024 * 1024)))
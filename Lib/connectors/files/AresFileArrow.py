@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+
+from ares.Lib.connectors.files import AresFile
+
+
+class FileArrow(AresFile.AresFile):
+  """
+  :category: Ares File
+  :rubric: PY
+  :type: Class
+  :dsc:
+    Arrow IPC (Feather V2) files. The columns types are stored in the file and the file is not compressed in order to be
+    memory mapped when it is read. Thus reopening a big file is almost instant and only the columns used are loaded.
+    This format can be used for the cached data sources by changing the report variable cacheFileFormat to .arrow
+  :link Documentation: https://arrow.apache.org/docs/python/ipc.html
+  """
+  __fileExt = ['.arrow', '.feather']
+  label = "Interface to read and write Arrow IPC (Feather) files"
+  _extPackages = [("pyarrow", 'pyarrow'), ("pandas", 'pandas')]
+
+  def table(self, columns=None):
+    """
+    :category: Ares File
+    :rubric: PY
+    :type: Data Loading
+    :dsc:
+      Return the memory mapped Arrow table. No data is read from the disk before the columns are used.
+    :example: aresObj.file(filename='data.arrow').table(columns=['name', 'value'])
+    :return: A pyarrow Table
+    """
+    pyarrow = self.pkgs['pyarrow']
+    table = pyarrow.ipc.open_file(pyarrow.memory_map(self.filePath, 'r')).read_all()
+    if columns is not None:
+      table = table.select(columns)
+    return table
+
+  def _read(self, toPandas=False, htmlCode=None, columns=None, **kwargs):
+    """
+    :category: Ares File
+    :rubric: PY
+    :type: Data Loading
+    :dsc:
+      Read the file to an AReS Dataframe. The extra parameters (for example the ones for the csv files) are not used.
+    :example: aresObj.file(filename='data.arrow').read(columns=['name', 'value'])
+    :return: An AReS Dataframe
+    """
+    from ares.Lib.connectors.files import AresFilePandas
+
+    return AresFilePandas.AresFileDataFrame(data=self.table(columns).to_pandas(), filePath=self.filePath, aresObj=self.aresObj,
+                                            htmlCode=htmlCode if htmlCode is not None else self.htmlCode)
+
+  def write(self, data, isAresDf=False):
+    """
+    :category: Ares File
+    :rubric: PY
+    :type: Data Loading
+    :dsc:
+      Write a dataframe (or a list of records) to the file. The index is not stored.
+      Arrow needs one type per column, so the columns with mixed types (common in the REST and JSON results) are written
+      as strings like in the csv files.
+    """
+    pyarrow, pandas = self.pkgs['pyarrow'], self.pkgs['pandas']
+    if isinstance(data, list):
+      data = pandas.DataFrame(data)
+    try:
+      data = pyarrow.Table.from_pandas(self.stringColumns(data), preserve_index=False)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+      data = pyarrow.Table.from_pandas(self.stringColumns(data, mixedOnly=False), preserve_index=False)
+    self.setFolder()
+    with pyarrow.OSFile(self.filePath, 'wb') as sink:
+      with pyarrow.ipc.new_file(sink, data.schema) as writer:
+        writer.write_table(data)
+
+  def stringColumns(self, df, mixedOnly=True):
+    """
+    :category: Ares File
+    :rubric: PY
+    :type: Data Loading
+    :dsc:
+      Convert the object columns with mixed types (or all the object columns) to strings, the null values are kept.
+      The dataframe is copied only if a column is changed.
+    :return: A Pandas dataframe
+    """
+    pandas, isCopied = self.pkgs['pandas'], False
+    for i in range(len(df.columns)):
+      series = df.iloc[:, i]
+      if series.dtype != object or (mixedOnly and not pandas.api.types.infer_dtype(series, skipna=True).startswith('mixed')):
+        continue
+
+      if not isCopied:
+        df, isCopied = pandas.DataFrame(df, copy=True), True
+      df.iloc[:, i] = series.where(series.isnull(), series.astype(str))
+    return df
@@ -6,8 +6,10 @@
 import time
 import os
 import json
+import hashlib
 
 from ares.Lib.connectors.files import AresFile
+from ares.Lib.connectors.files import AresFileArrow
 from ares.Lib.js import AresJsEncoder
 from ares.Lib.AresImports import requires
 
@@ -25,7 +27,7 @@ class AresFileSeries(ares_pandas.Series):
   def _constructor_expanddim(self):
     return AresFileDataFrame
 
-  _metadata = ['filePath', 'aresObj', 'selectCols', '_ares_data', '_filters', 'htmlId', 'jsColsUsed']
+  _metadata = ['filePath', 'aresObj', 'selectCols', '_ares_data', '_filters', 'htmlId', 'jsColsUsed', 'jsFormat', 'jsKeepColumns', 'jsDictRatio', 'jsTypedArrays']
 
   # @classmethod
   # def _internal_ctor(cls, *args, **kwargs):
@@ -59,12 +61,13 @@ class AresFileDataFrame(ares_pandas.DataFrame):
   #   return cls(*args, **kwargs)
 
   # Remove the error message by declaring the columns as metadata
-  _metadata = ['filePath', 'aresObj', 'selectCols', '_ares_data', '_filters', 'htmlId', 'jsColsUsed']
+  _metadata = ['filePath', 'aresObj', 'selectCols', '_ares_data', '_filters', 'htmlId', 'jsColsUsed', 'jsFormat', 'jsKeepColumns', 'jsDictRatio', 'jsTypedArrays']
 
   def __init__(self, data=None, filePath=None, aresObj=None, htmlCode=None, index=None, columns=None, dtype=None, copy=True):
     super(AresFileDataFrame, self).__init__(data=data, index=index, columns=columns, dtype=dtype, copy=copy)
     self.filePath, self.aresObj, self.selectCols, self._ares_data, self.htmlCode = filePath, aresObj, [], [], htmlCode.replace("/", "_") if htmlCode is not None else htmlCode
     self._filters, self.htmlId, self.jsColsUsed = {}, 'recordset_%s' % id(self) if self.htmlCode is None else self.htmlCode.replace("/", "_"), set()
+    self.jsFormat, self.jsKeepColumns, self.jsDictRatio, self.jsTypedArrays = 'records', False, AresJsEncoder.DICT_MAX_RATIO, False
     self.filePathNoExt, self.fileExtension = os.path.splitext(filePath) if filePath is not None else (None, None)
     self.path, self.filename = os.path.split(filePath) if filePath is not None else (None, None)
 
@@ -86,6 +89,10 @@ class AresFileDataFrame(ares_pandas.DataFrame):
       if 'htmlCode' in kwargs:
         del kwargs['htmlCode']
 
+      if self.fileExtension in AresFileArrow.FileArrow._FileArrow__fileExt:
+        self._ares_data = AresFileArrow.FileArrow(filePath=self.filePath, aresObj=self.aresObj).read(htmlCode=htmlCode, columns=kwargs.get('usecols'))
+        return self._ares_data
+
       self._ares_data = AresFileDataFrame(data=ares_pandas.read_csv(self.filePath, sep=kwargs["delimiter"] if kwargs.get("delimiter") is not None else '\t', **kwargs), filePath=self.filePath, aresObj=self.aresObj, htmlCode=htmlCode)
       # TODO: Remove this when we will migrate to a list of lists instread of dictionary
       cols = dict([(col, col.replace("[", "").replace("]", "").replace("(", "").replace(")", "")) for col in self._ares_data.headers])
@@ -106,6 +113,10 @@ class AresFileDataFrame(ares_pandas.DataFrame):
 
     if not os.path.exists(self.path):
       os.makedirs(self.path)
+    if os.path.splitext(self.filename)[1] in AresFileArrow.FileArrow._FileArrow__fileExt:
+      AresFileArrow.FileArrow(filePath=os.path.join(self.path, self.filename), aresObj=self.aresObj).write(self)
+      return
+
     self.to_csv(os.path.join(self.path, self.filename), index=kwargs.get("index", False), sep=kwargs["delimiter"] if kwargs.get("delimiter") is not None else '\t', encoding=kwargs.get("encoding", 'utf8'))
 
   def saveTo(self, fileFamily, filePath=None, dbName=None):
@@ -376,6 +387,71 @@ class AresFileDataFrame(ares_pandas.DataFrame):
 
     return self.to_dict(orient='records')
 
+  def toColumns(self, selectCols=None):
+    """
+    :category: Dataframe
+    :rubric: PY
+    :type: Transformation
+    :dsc:
+      Return the dataframe as a columnar structure. The column names are written only once and each column is a list
+      of values in the row order. Null values are replaced by None in order to be written as null in the Javascript.
+    :example: aresDf.toColumns()
+    :return: A Python dictionary {"cols": [...], "data": {col: [...]}}
+    """
+    selectCols = self.selectCols if selectCols is None else selectCols
+    if selectCols:
+      self.reduce(self.jsColsUsed)
+    return AresJsEncoder.encodeDataFrame(self, orient='columns')
+
+  def jsRecords(self, selectCols=None):
+    """
+    :category: Dataframe
+    :rubric: JS
+    :type: Transformation
+    :dsc:
+      Return the same list of records as the function records but the conversion is done column by column based on the
+      dtype. The result only contains Python objects and it can be directly written to the Javascript.
+    :example: aresDf.jsRecords()
+    :return: A Python list of dictionaries
+    """
+    selectCols = self.selectCols if selectCols is None else selectCols
+    if selectCols:
+      self.reduce(self.jsColsUsed)
+    return AresJsEncoder.encodeDataFrame(self, orient='records', dropna=True)
+
+  def setJsFormat(self, jsFormat='columns', keepColumns=False, dictRatio=None, typedArrays=None):
+    """
+    :category: Dataframe
+    :rubric: JS
+    :type: Front End
+    :example: aresObj.df(records).setJsFormat('columns')
+    :example: aresObj.df(records).setJsFormat('columns', keepColumns=True)
+    :example: aresObj.df(records).setJsFormat('records', dictRatio=0)
+    :example: aresObj.df(records).setJsFormat('columns', keepColumns=True, typedArrays=True)
+    :dsc:
+      Change the way the dataframe is written to the page. By default a list of records is written which repeats every
+      column name on every row. The columns format will only write each column name once and the records will be
+      rebuilt in the browser by the function AresColumnsToRecords. All the Javascript record functions and the chart
+      containers will still receive records.
+      If keepColumns is set to True, the columnar structure will also be available in the variable jsColumns (the values
+      are in arrays which can be directly used in the Plotly or ChartJs series).
+      The string columns with a number of distinct values below dictRatio times the number of rows are written as a list
+      of distinct values and a list of codes (whatever the format, the records are still rebuilt by AresColumnsToRecords).
+      Set dictRatio to 0 to disable this encoding. It is never used with keepColumns.
+      With typedArrays the float and int32 columns are written in binary (base64) and read in the browser as Float64Array
+      and Int32Array. This avoids the conversion of each number to text in Python and its parsing in the browser.
+    :return: The AReS Dataframe itself
+    """
+    if jsFormat not in ('records', 'columns'):
+      raise Exception("Javascript format %s not recognised, it should be records or columns" % jsFormat)
+
+    self.jsFormat, self.jsKeepColumns = jsFormat, keepColumns
+    if dictRatio is not None:
+      self.jsDictRatio = dictRatio
+    if typedArrays is not None:
+      self.jsTypedArrays = typedArrays
+    return self
+
   def toList(self):
     """
     :category: Dataframe
@@ -389,7 +465,49 @@ class AresFileDataFrame(ares_pandas.DataFrame):
       self.selectCols = self.columns.tolist()
     return [self.selectCols] + self[self.selectCols].values.tolist()
 
-  def html(self):
+  def fingerprint(self, columns=None):
+    """
+    :category: Dataframe
+    :rubric: PY
+    :type: Transformation
+    :dsc:
+      Hash of the content written to the page (column names, dtypes and values). The values are hashed column by column
+      with the Pandas vectorized function and the Python types are added for the object columns which are not only strings.
+      Two dataframes with the same fingerprint are written only once by the report.
+    :example: aresDf.fingerprint(['name', 'value'])
+    :return: A String with the hash or None if the dataframe cannot be shared
+    """
+    if self.jsKeepColumns:
+      return None
+
+    data = self if columns is None else self[[col for col in self.columns if col in columns]]
+    dataDef = [list(map(str, data.columns)), list(map(str, data.dtypes))]
+    try:
+      hashes = [ares_pandas.util.hash_pandas_object(data, index=False).values.tobytes()]
+      for i, dtype in enumerate(data.dtypes):
+        if dtype == object and ares_pandas.api.types.infer_dtype(data.iloc[:, i], skipna=True) not in ('string', 'empty'):
+          # The objects are hashed as strings so 1 and '1' would be the same
+          hashes.append(ares_pandas.util.hash_pandas_object(data.iloc[:, i].map(lambda val: type(val).__name__), index=False).values.tobytes())
+    except TypeError:
+      # Unhashable values (lists, dictionaries...)
+      return None
+
+    fingerprint = hashlib.sha1(json.dumps(dataDef).encode('utf-8'))
+    for colHashes in hashes:
+      fingerprint.update(colHashes)
+    return fingerprint.hexdigest()
+
+  def html(self, columns=None):
+    """
+    :category: Dataframe
+    :rubric: JS
+    :type: Front End
+    :dsc:
+      Write the recordSet to the page. If columns is defined only those columns are written (the columns not used by
+      the containers are removed by the report, see AresJs.usedColumns). The dataframe itself is not changed.
+      The low cardinality string columns are dictionary encoded and the numeric columns can be typed arrays (see setJsFormat).
+    :return: An empty string, the data is added to the Javascript global variables
+    """
     # for filterId, filterDefinition in self._filters.items():
     #   jsFilters = []
     #   for rule in filterDefinition['filters']:
@@ -412,7 +530,22 @@ class AresFileDataFrame(ares_pandas.DataFrame):
     #         dataComp = "%s(%s)" % (fnc, dataComp)
     #     for src in filterDefinition['src']:
     #       src['obj'].jsFrg(src['event'], container.jsGenerate(dataComp))
-    self.aresObj.jsGlobal.add(self.htmlCode, json.dumps(self.records(), cls=AresJsEncoder.AresEncoder))
+    if columns is not None and not self.jsKeepColumns and len(columns) < len(self.columns):
+      data = ares_pandas.DataFrame(self[[col for col in self.columns if col in columns]])
+    else:
+      if self.selectCols:
+        self.reduce(self.jsColsUsed)
+      data = self
+    dictCols = [] if self.jsKeepColumns else AresJsEncoder.dictColumns(data, self.jsDictRatio)
+    if self.jsFormat == 'columns' or dictCols or self.jsTypedArrays:
+      jsColumns = json.dumps(AresJsEncoder.encodeDataFrame(data, orient='columns', dictCols=dictCols, typedArrays=self.jsTypedArrays), cls=AresJsEncoder.AresEncoder)
+      if self.jsKeepColumns:
+        self.aresObj.jsGlobal.addData(self.jsColumns, jsColumns, 'AresColumnsDecode')
+        self.aresObj.jsGlobal.addData(self.htmlCode, self.jsColumns, 'AresColumnsToRecords', isJson=False)
+      else:
+        self.aresObj.jsGlobal.addData(self.htmlCode, jsColumns, 'AresColumnsToRecords')
+    else:
+      self.aresObj.jsGlobal.addData(self.htmlCode, json.dumps(AresJsEncoder.encodeDataFrame(data, orient='records', dropna=True), cls=AresJsEncoder.AresEncoder))
     return ''
 
   def tableHeader(self, forceHeader=None, headerOptions=None):
@@ -474,6 +607,9 @@ class AresFileDataFrame(ares_pandas.DataFrame):
   @property
   def jsData(self): return self.htmlId
 
+  @property
+  def jsColumns(self): return "%s_cols" % self.htmlCode
+
 if __name__ == '__main__':
   df = AresFileDataFrame(data=[["feef", "bfb"], ["vfv", "bfffsb"]], columns=['A', "V"], filePath=r'D:\BitBucket\Youpi-Ares\user_scripts\outputs\coucou\test.csv')
   df.save()
\ No newline at end of file
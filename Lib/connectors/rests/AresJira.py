@@ -3,19 +3,31 @@
 # author: Olivier Noguès
 
 
+import os
+import re
 import json
+import time
+import pickle
 import base64
+import hashlib
+import datetime
+import threading
+import concurrent.futures
 
 try:
   import urllib.request as request
   from urllib.error import HTTPError, URLError
-  import urllib
+  from urllib.parse import urlencode, urlsplit
+  import http.client as httpClient
 except ImportError:
   import urllib2 as request
   from urllib2 import HTTPError, URLError
-  import urllib
+  from urllib import urlencode
+  from urlparse import urlsplit
+  import httplib as httpClient
 
 from ares.Lib.connectors import AresConn
+from ares.Lib.connectors import AresConnCache
 
 
 class AresJira(AresConn.AresConn):
@@ -24,9 +36,21 @@ class AresJira(AresConn.AresConn):
   :rubric: PY
   :type: class
   :dsc:
-      Youpi
+    Connector to the JIRA search API. All the pages of the result are retrieved (the first one gives the total number of
+    issues and the other ones are requested in parallel). Only the fields in ISSUES_FIELDS are requested.
+    With the parameter incremental the issues are stored locally and only the issues updated since the last run are
+    requested. The issues deleted (or moved out of the JQL) are kept in the local store until it is removed.
+    The local store is a private file (only readable by the current user) in the folder of the result cache.
+  :example: aresObj.getData('JIRA', {'searchJql': 'project = ARES', 'incremental': True})
+  :link JIRA Documentation: https://docs.atlassian.com/software/jira/docs/api/REST/latest/#api/2/search
   """
   ALIAS = 'JIRA'
+  PAGE_SIZE = 100
+  ISSUES_FIELDS = ['created', 'status', 'summary', 'assignee', 'resolutiondate', 'updated',
+                   'timeestimate', 'timespent', 'duedate', 'description', 'resolution']
+
+  # HTTP connections kept per thread in order to not open a new connection for each page
+  __connections = threading.local()
 
   @classmethod
   def isCompatible(cls, params):
@@ -35,29 +59,179 @@ class AresJira(AresConn.AresConn):
 
     return (False, '<i class="fas fa-times-circle"></i>&nbsp;&nbsp;Credential missing <a style="color:red;text-decoration:underline;font-weight:bold;" href="/admin/account">Account Settings</a>')
 
+  @classmethod
+  def _search(cls, sourceDef, jql, startAt):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Request one page of the JIRA search. The connection to the server is reused by the next requests of the thread.
+    :return: The JIRA json response as a Python dictionary
+    """
+    url = urlsplit(sourceDef['baseUrl'])
+    searchUrl = '%s/search?%s' % (url.path.rstrip('/'), urlencode({"jql": jql, "startAt": startAt, "maxResults": cls.PAGE_SIZE, "fields": ",".join(cls.ISSUES_FIELDS)}))
+    headers = {'Authorization': 'Basic %s' % base64.b64encode(('%(user_id)s:%(pwd)s' % sourceDef).encode('utf-8')).decode('ascii'),
+               'Accept': 'application/json'}
+    connections = cls.__connections.__dict__.setdefault('connections', {})
+    for retry in range(2):
+      if not (url.scheme, url.netloc) in connections:
+        connCls = httpClient.HTTPSConnection if url.scheme == 'https' else httpClient.HTTPConnection
+        connections[(url.scheme, url.netloc)] = connCls(url.netloc, timeout=sourceDef.get('timeout', 60))
+      conn = connections[(url.scheme, url.netloc)]
+      try:
+        conn.request('GET', searchUrl, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+      except (httpClient.HTTPException, IOError):
+        # The server might have closed the connection kept alive
+        conn.close()
+        del connections[(url.scheme, url.netloc)]
+        if retry:
+          raise
+
+        continue
+
+      if response.status != 200:
+        raise HTTPError(searchUrl, response.status, response.reason, response.msg, None)
+
+      return json.loads(data.decode('utf-8'))
+
+  @classmethod
+  def _issue(cls, issue):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Convert a JIRA issue to a flat record with the ISSUES_FIELDS
+    :return: A Python dictionary
+    """
+    newIssue = {'key': issue['key']}
+    for field in cls.ISSUES_FIELDS:
+      newIssue[field] = 'NA'
+      if field == 'assignee' and issue['fields'] and field in issue['fields'] and issue['fields'][field] and 'displayName' in issue['fields'][field]:
+        newIssue[field] = issue['fields'][field]['displayName']
+      elif field == 'status' and issue['fields'] and field in issue['fields'] and 'name' in issue['fields'][field]:
+        newIssue[field] = issue['fields'][field]['name']
+      elif issue['fields'] and field in issue['fields']:
+        newIssue[field] = issue['fields'][field]
+    return newIssue
+
+  @classmethod
+  def _searchAll(cls, sourceDef, jql):
+    """
+    :category: Connector
+    :rubric: PY
+    :type: Data retrieval
+    :dsc:
+      Return all the issues of a JQL. The pages after the first one are requested in parallel (the number of threads is
+      limited by MAX_CONCURRENCY or max_concurrency in the source definition).
+    :return: A list of flat records
+    """
+    firstPage = cls._search(sourceDef, jql, 0)
+    pages = [firstPage]
+    startAts = list(range(len(firstPage['issues']), firstPage.get('total', 0), firstPage.get('maxResults', cls.PAGE_SIZE) or cls.PAGE_SIZE))
+    if startAts and firstPage['issues']:
+      with concurrent.futures.ThreadPoolExecutor(max_workers=sourceDef.get('max_concurrency', cls.MAX_CONCURRENCY)) as executor:
+        pages.extend(executor.map(lambda startAt: cls._search(sourceDef, jql, startAt), startAts))
+    return [cls._issue(issue) for page in pages for issue in page['issues']]
+
+  @classmethod
+  def _storePath(cls, sourceDef, jql):
+    storeKey = hashlib.sha1(json.dumps([sourceDef['baseUrl'], sourceDef['user_id'], jql]).encode('utf-8')).hexdigest()
+    return os.path.join(sourceDef.get('store_path', AresConnCache.CACHE.path or AresConnCache.APP_PATH), 'jira', '%s.pkl' % storeKey)
+
+  @classmethod
+  def _updatedSince(cls, jql, day):
+    # The ORDER BY clause should stay at the end of the JQL, only the condition is wrapped
+    orderBys = list(re.finditer(r'\border\s+by\b', jql, flags=re.IGNORECASE))
+    condition, orderBy = (jql[:orderBys[-1].start()], " %s" % jql[orderBys[-1].start():]) if orderBys else (jql, '')
+    updated = 'updated >= "%s"' % day.strftime('%Y/%m/%d')
+    return "%s%s" % ('(%s) AND %s' % (condition.strip(), updated) if condition.strip() else updated, orderBy)
+
   @classmethod
   def _getData(cls, params, sourceDef=None, **kwargs):
-    base64Str = base64.b64encode('%(user_id)s:%(pwd)s' % sourceDef)
+    jql = params['searchJql']
     try:
-      searchData = {"maxResults": "200", "jql": params['searchJql'] }
-      searchUrl = '%s/search?%s' % (sourceDef['baseUrl'], urllib.urlencode(searchData))
-      searchRequest = request.Request(url=searchUrl)
-      searchRequest.add_header('Authorization', 'Basic %s' % base64Str)
-      issues_fields = ['created', 'status', 'summary', 'assignee', 'resolutiondate', 'updated',
-                       'timeestimate', 'timespent', 'duedate', 'description', 'resolution']
-      issues_list = []
-      jsonResponse = request.urlopen(searchRequest)
-      for issue in json.loads(jsonResponse.read())['issues']:
-        newIssue = {'key': issue['key']}
-        for field in issues_fields:
-          newIssue[field] = 'NA'
-          if field == 'assignee' and issue['fields'] and field in issue['fields'] and issue['fields'][field] and 'displayName' in issue['fields'][field]:
-            newIssue[field] = issue['fields'][field]['displayName']
-          elif field == 'status' and issue['fields'] and field in issue['fields'] and 'name' in issue['fields'][field]:
-            newIssue[field] = issue['fields'][field]['name']
-          elif issue['fields'] and field in issue['fields']:
-            newIssue[field] = issue['fields'][field]
-        issues_list.append(newIssue)
-      return issues_list
+      if not params.get('incremental', False):
+        return cls._searchAll(sourceDef, jql)
+
+      # Incremental mode, only the issues updated since the last run (with one day of margin for the time zones) are requested
+      storePath, store = cls._storePath(sourceDef, jql), {'watermark': None, 'issues': {}}
+      storeData = AresConnCache.readPrivate(storePath)
+      if storeData is not None:
+        store = pickle.loads(storeData)
+      searchJql = jql
+      if store['watermark'] is not None:
+        lastDay = datetime.datetime.strptime(store['watermark'][:10], '%Y-%m-%d') - datetime.timedelta(days=1)
+        searchJql = cls._updatedSince(jql, lastDay)
+      for issue in cls._searchAll(sourceDef, searchJql):
+        store['issues'][issue['key']] = issue
+      updated = [issue['updated'] for issue in store['issues'].values() if issue['updated'] not in (None, 'NA')]
+      store['watermark'] = max(updated) if updated else store['watermark']
+      AresConnCache.writePrivate(storePath, pickle.dumps(store, pickle.HIGHEST_PROTOCOL))
+      return list(store['issues'].values())
+
     except HTTPError as e:
-      return [{ 'status': False, 'message': 'url %s, data %s' % (e.url, searchRequest.get_data()) }]
+      return [{ 'status': False, 'message': 'url %s, data %s' % (e.url, jql) }]
+
+
+if __name__ == '__main__':
+  # Check of the pagination and of the incremental mode with a local stub of the JIRA search API
+  import tempfile
+
+  try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+  except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+
+  ISSUES, QUERIES = [{'key': 'ARES-%s' % i, 'fields': {'summary': 'Issue %s' % i, 'status': {'name': 'Open'}, 'updated': '2019-01-%02dT10:00:00.000+0000' % (i % 28 + 1)}} for i in range(450)], []
+
+  class JiraStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+      query = dict([(k, v[0]) for k, v in parse_qs(urlsplit(self.path).query).items()])
+      QUERIES.append(query)
+      issues = ISSUES
+      if 'updated >=' in query['jql']:
+        since = query['jql'].split('"')[1].replace('/', '-')
+        issues = [issue for issue in ISSUES if issue['fields']['updated'][:10] >= since]
+      start, size = int(query['startAt']), int(query['maxResults'])
+      data = json.dumps({'startAt': start, 'maxResults': size, 'total': len(issues), 'issues': issues[start:start+size]}).encode('utf-8')
+      self.send_response(200)
+      self.send_header('Content-Length', str(len(data)))
+      self.end_headers()
+      self.wfile.write(data)
+
+    def log_message(self, *args): pass
+
+  class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+  server = ThreadingServer(('127.0.0.1', 0), JiraStub)
+  serverThread = threading.Thread(target=server.serve_forever)
+  serverThread.daemon = True
+  serverThread.start()
+  sourceDef = {'baseUrl': 'http://127.0.0.1:%s/rest/api/2' % server.server_port, 'user_id': 'ares', 'pwd': 'ares', 'store_path': tempfile.mkdtemp()}
+
+  startTime = time.time()
+  issues = AresJira._getData({'searchJql': 'project = ARES'}, sourceDef=sourceDef)
+  print("Full search: %s issues, %s requests, %.3fs" % (len(issues), len(QUERIES), time.time() - startTime))
+  assert sorted(issue['key'] for issue in issues) == sorted(issue['key'] for issue in ISSUES)
+  assert QUERIES[0]['fields'] == ",".join(AresJira.ISSUES_FIELDS)
+
+  del QUERIES[:]
+  AresJira._getData({'searchJql': 'project = ARES', 'incremental': True}, sourceDef=sourceDef)
+  ISSUES[0]['fields'].update({'summary': 'Changed', 'updated': '2019-01-28T12:00:00.000+0000'})
+  fullRequests = len(QUERIES)
+  issues = AresJira._getData({'searchJql': 'project = ARES', 'incremental': True}, sourceDef=sourceDef)
+  print("Incremental search: %s issues, %s requests (%s for the first run)" % (len(issues), len(QUERIES) - fullRequests, fullRequests))
+  assert len(issues) == len(ISSUES) and [issue for issue in issues if issue['key'] == 'ARES-0'][0]['summary'] == 'Changed'
+  assert AresJira._updatedSince('project = ARES ORDER BY created DESC', datetime.datetime(2019, 1, 27)) == '(project = ARES) AND updated >= "2019/01/27" ORDER BY created DESC'
+  server.shutdown()
@@ -326,6 +326,36 @@ class Chart(AresHtml.Html):
     self.jsFrg('plotly_click', jsFncs)
     return self
 
+  def serverZoom(self, url, points):
+    """
+    :category: Chart Update
+    :rubric: JS
+    :type: Events
+    :dsc:
+      Request the full resolution data of the x axis range displayed after a zoom. This is used by the downsampled
+      charts (the full data is kept on the server by AresChartServer). A double click (autorange) gets the full range back.
+    :link Plotly Documentation: https://plot.ly/javascript/plotlyjs-events/#update-data
+    :return: The Python Chart Object
+    """
+    # The server records are transformed in the browser, the functions run in Python are only for the page data
+    recordSet = self.__chart.data
+    schema = (recordSet._schema['pushdown'], recordSet._pushDownData, list(recordSet._schema['post']))
+    recordSet._schema['pushdown'] = False
+    jsData = recordSet.setId('data').getJs([('extend', self.seriesProperties)])
+    recordSet._schema['pushdown'], recordSet._pushDownData, recordSet._schema['post'] = schema
+    recordSet.setId(None)
+    self.aresObj.jsOnLoadFnc.add('''
+      document.getElementById('%(htmlId)s').on('plotly_relayout', function(event){
+        var params = {points: %(points)s};
+        if(event['xaxis.range[0]'] !== undefined){params.start = event['xaxis.range[0]']; params.end = event['xaxis.range[1]']}
+        else if(event['xaxis.range'] !== undefined){params.start = event['xaxis.range'][0]; params.end = event['xaxis.range'][1]}
+        else if(event['xaxis.autorange'] === undefined){return}
+        $.post('%(url)s', params, function(result){
+          if(result.error !== undefined){console.log(result.error); return}
+          var data = result.data; Plotly.react('%(htmlId)s', %(jsData)s, document.getElementById('%(htmlId)s').layout)}, 'json')
+      })''' % {'htmlId': self.htmlId, 'points': json.dumps(points), 'url': url, 'jsData': jsData})
+    return self
+
   def __str__(self):
     """
     :category: Container Representation
@@ -7,6 +7,7 @@ import json
 
 from ares.Lib.graph import AresHtmlGraphFabric
 from ares.Lib.html import AresHtml
+from ares.Lib.js import AresJsLayout
 
 
 DSC = {
@@ -30,6 +31,7 @@ class Chart(AresHtml.Html):
 
   def __init__(self, aresObj, chartType, data, width, widthUnit, height, heightUnit, title, chartOptions, toolsbar, htmlCode, globalFilter):
     self.seriesProperties, self.height, self._groups, self.__edges = {'static': {}, 'dynamic': {}}, height, None, None
+    self._layout, self._positions = None, None
     if AresHtmlGraphFabric.CHARTS_FACTORY is None:
       AresHtmlGraphFabric.CHARTS_FACTORY = AresHtmlGraphFabric.loadFactory()  # atomic function to store all the different table mapping
     super(Chart, self).__init__(aresObj, data, width=width, widthUnit=widthUnit, height=height, heightUnit=heightUnit, code=htmlCode)
@@ -54,6 +56,7 @@ class Chart(AresHtml.Html):
 
   def onDocumentReady(self):
     """ Return the javascript calls to be returned to update the component """
+    self.setPositions()
     self.ctx = []  # Just to ensure that the Structure of the chart component will not be changed in the python layer
     AresHtmlGraphFabric.Chart.resolveDict(dict([(key, val) for key, val in self.__chart.items() if val]), self.ctx)
     self.aresObj.jsOnLoadFnc.add('''
@@ -80,6 +83,7 @@ class Chart(AresHtml.Html):
     return ''' 
       window['%(htmlId)s_data'] = new vis.DataSet(%(chartData)s);
       if(window['%(htmlId)s_chart'] === undefined){
+        %(positions)s
         window['%(htmlId)s_edges'] = %(edges)s;
         if (window['%(htmlId)s_edges'] == undefined){
           window['%(htmlId)s_chart'] = new vis.%(chartObj)s($("#%(htmlId)s").get(0), window['%(htmlId)s_data'], window['%(htmlId)s_options'])}
@@ -91,7 +95,8 @@ class Chart(AresHtml.Html):
       ''' % {'htmlId': self.htmlId,
              'groups': "window['%s_chart'].setGroups(%s)" % (self.htmlId, json.dumps(self._groups)) if self._groups is not None else '',
              'chartData': self.__chart.data.setId(jsData).getJs([('extend', self.seriesProperties)]),
-             'chartObj': self.__chart.jsCls, 'edges': json.dumps(self.__edges)}
+             'chartObj': self.__chart.jsCls, 'edges': json.dumps(self.__edges),
+             'positions': "window['%s_data'].update(%s);" % (self.htmlId, json.dumps(self._positions)) if self._positions is not None else ''}
 
   def addAttr(self, key, val=None, tree=None, category=None, isPyData=True):
     """
@@ -196,6 +201,46 @@ class Chart(AresHtml.Html):
     self.__edges = edgesInfo
     return self
 
+  def layout(self, iterations=50, seed=0, active=True):
+    """
+    :category: Chart Layout
+    :rubric: PY
+    :type: Configuration
+    :example: chartObj.edges(edges).layout(iterations=100)
+    :dsc:
+      Only available for network charts. Compute the positions of the nodes in Python (see AresJsLayout) and disable
+      the physics simulation in the browser. This is done by default for the networks with more than
+      AresJsLayout.LAYOUT_THRESHOLD nodes, active=False keeps the simulation in the browser.
+    :return: The Python Chart object
+    """
+    if self.__chart.jsCls != 'Network':
+      raise Exception("This property is only available for Network Charts to set the nodes positions")
+
+    self._layout = {'iterations': iterations, 'seed': seed} if active else False
+    return self
+
+  def setPositions(self):
+    """
+    :category: Chart Layout
+    :rubric: PY
+    :type: Configuration
+    :dsc:
+      Compute the nodes positions of a network chart with its edges, the nodes should have an id.
+    """
+    nodes = self.__chart.data._data
+    if self.__chart.jsCls != 'Network' or self._layout is False or not self.__edges or not 'id' in nodes.columns:
+      return
+
+    if self._layout is None and len(nodes) <= AresJsLayout.LAYOUT_THRESHOLD:
+      return
+
+    layout = self._layout or {}
+    positions = AresJsLayout.layout(nodes['id'].tolist(), [(edge.get('from'), edge.get('to')) for edge in self.__edges],
+                                    iterations=layout.get('iterations', 50), seed=layout.get('seed', 0))
+    self._positions = [{'id': nodeId, 'x': x, 'y': y} for nodeId, (x, y) in positions.items()]
+    self.__chart.setdefault('physics', {})['enabled'] = 'false'
+    self.__chart.setdefault('layout', {})['improvedLayout'] = 'false'
+
   # ---------------------------------------------------------------------------------------------------------
   #                                          PYTHON CONFIGURATION
   # ---------------------------------------------------------------------------------------------------------
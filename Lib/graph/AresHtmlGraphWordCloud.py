@@ -7,6 +7,7 @@ import json
 
 from ares.Lib.html import AresHtml
 from ares.Lib.graph import AresHtmlGraphFabric
+from ares.Lib.js import AresJsWordCloud
 
 
 class Chart(AresHtml.Html):
@@ -22,6 +23,9 @@ class Chart(AresHtml.Html):
   def __init__(self, aresObj, chartType, data, width, widthUnit, height, heightUnit, title, chartDesc, margin):
     if data is None:
       data = self.mocks('')
+    elif not (isinstance(data, list) and data and isinstance(data[0], dict)):
+      # Raw texts, the words are counted in Python (see AresJsWordCloud)
+      data = AresJsWordCloud.cloud(data, placement=False)
     super(Chart, self).__init__(aresObj, data)
     self.height, self.width, self.title = height, width, title
     self.css({'height': '%s%s' % (height, heightUnit), 'width': '%s%s' % (width, widthUnit)})
@@ -34,6 +38,12 @@ class Chart(AresHtml.Html):
     """
     self.factor = factor
 
+  def spiral(self, **kwargs):
+    """ Place the words in Python (see AresJsWordCloud.spiral), d3-cloud is then not used in the browser """
+    if self.vals and not 'x' in self.vals[0]:
+      self.vals = AresJsWordCloud.spiral(self.vals, **kwargs)
+    return self
+
   def autoscale(self):
     """ Rescale the values in order to get something not to big for the div size """
     vals = [rec[self.seriesGrps[0].jsVar['val']] for rec in self.seriesGrps[0].xFilter.recordSet]
@@ -51,6 +61,18 @@ class Chart(AresHtml.Html):
 
   def onDocumentLoadFnc(self):
     """ Pure Javascript onDocumentLoad Function """
+    if self.vals and 'x' in self.vals[0]:
+      self.addGlobalFnc("D3_%s(htmlObj, data)" % self.htmlId, '''
+        htmlObj.find("svg").remove() ; d3.select(htmlObj.get(0)).append("svg");
+        d3.select(htmlObj.find("svg").get(0)).style("height", '%(height)spx').style("width", '%(width)s%%')
+          .attr("viewBox", "%(viewBox)s").append("g").selectAll("text")
+          .data(data).enter().append("text").style("font-size", function(d) { return d.size + "px"; })
+          .style("font-family", "Impact").style("fill", function(d, i) {  return %(color)s[i]; }).attr("text-anchor", "middle")
+          .attr("transform", function(d) { return "translate(" + [d.x, d.y] + ")rotate(" + d.rotate + ")"; }).text(function(d) { return d.text; });
+        ''' % {"height": self.height, "width": self.width, 'color': json.dumps(AresHtmlGraphFabric.chartColors),
+               "viewBox": "%s %s %s %s" % (-AresJsWordCloud.WIDTH / 2, -AresJsWordCloud.HEIGHT / 2, AresJsWordCloud.WIDTH, AresJsWordCloud.HEIGHT)})
+      return
+
     self.addGlobalFnc("D3_%s(htmlObj, data)" % self.htmlId, '''
       htmlObj.find("svg").remove() ; d3.select(htmlObj.get(0)).append("svg");
       d3.select(htmlObj.find("svg").get(0)).style("height", '%(height)spx').style("width", '%(width)s%%');
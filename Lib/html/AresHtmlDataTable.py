@@ -145,7 +145,15 @@ class DataTable(AresHtml.Html):
           }})''' % {'pyDetailCls': pyDetailCls, 'htmlId': self.htmlId, 'jsTableId': self.jsTableId, 'pyShownDetailCls': pyShownDetailCls})
 
     self.__table = FACTORY['base'](aresObj, headers, recordSet, self.jsTableId)
-    self.__table.data.attach(self)
+    if tableOptions.get('serverSide', False):
+      # The data is kept on the server and only the displayed rows will be requested by the table
+      from ares.Lib import AresDataTableServer
+
+      sourceId = AresDataTableServer.register(self.htmlId, recordSet)
+      self.addAttr({'processing': True, 'paginate': True, 'searching': True})
+      self.addAttr('ajax', {'url': "%s/data/%s" % (getattr(aresObj, '_urlsApp', {}).get('ares-tables', '/tables'), sourceId), 'type': 'POST'})
+    else:
+      self.__table.data.attach(self)
     if len(colValues) > 0:
       tableStyles = tableOptions.get('style', {})
       valsDef = tableStyles.get('values', {}).get('attr', {})
@@ -399,6 +407,12 @@ class DataTable(AresHtml.Html):
       columnOrders = [col['data'] for col in self.__table.header]
       self.addAttr('aoColumnDefs', self._cols.toJs(), isPyData=False)
       self.ctx = self.__table.js()
+    if self.tableOptions.get('serverSide', False):
+      return '''
+        var table_data = {%(options)s};
+        if(typeof %(jsTableId)s === 'undefined'){%(jsTableId)s = $('#%(htmlId)s table').DataTable(table_data)}
+        else {%(jsTableId)s.ajax.reload()} ''' % {'jsTableId': self.jsTableId, 'htmlId': self.htmlId, 'options': ", ".join(self.ctx)}
+
     return '''
       var table_data = {%(options)s};
       if(typeof %(jsTableId)s === 'undefined'){
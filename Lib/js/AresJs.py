@@ -13,6 +13,8 @@ import ares.Lib.js.fncs
 import ares.Lib.js.objects
 import ares.utils.AresSiphash
 
+from ares.Lib.js import AresJsPushDown
+
 
 # Factory wii all the javascript information
 factory = None
@@ -116,6 +118,67 @@ def load(forceReload=False):
   return factory
 
 
+def isPushedDown(jsSource):
+  """
+  :category: Javascript
+  :rubric: JS
+  :type: Data Transformation
+  :dsc:
+    Check if all the containers attached to a data source are using the result of the Python functions.
+    In this case the raw recordSet is not needed anymore in the page.
+  :return: A boolean
+  """
+  recordSets = jsSource.get('recordSets', {})
+  for htmlObj in jsSource['containers']:
+    if not id(htmlObj) in recordSets or not recordSets[id(htmlObj)].isPushDown():
+      return False
+
+  return True
+
+
+def isRawData(jsData):
+  """
+  :category: Javascript
+  :rubric: PY
+  :type: Data Transformation
+  :dsc:
+    Check if the browser uses the raw recordSet of a Js object, thus without any record function or filter attached to
+    the data source. Only in this case a summary computed in Python on the data (box plot statistics...) is the same
+    as the one of the page. The filters should be attached to the data source before the chart is created.
+  :return: A boolean
+  """
+  return not jsData._schema['fncs'] and not getattr(jsData.aresObj, 'jsSources', {}).get(jsData.jqId, {}).get('filters')
+
+
+def usedColumns(jsSource):
+  """
+  :category: Javascript
+  :rubric: PY
+  :type: Data Transformation
+  :dsc:
+    Union of the columns of a data source used by all the attached containers and by the filters. The containers using
+    the result of the Python functions do not need any column. Only the first record function reads the raw recordSet,
+    so the columns are known when this function defines them (method inputColumns in the module jsFncsRecords).
+    If the columns of one container are not known, all the columns of the data source should be written to the page.
+  :return: A Python set or None if all the columns are needed
+  """
+  cols, recordSets = set(), jsSource.get('recordSets', {})
+  for htmlObj in jsSource['containers']:
+    if not id(htmlObj) in recordSets:
+      return None
+
+    containerCols = recordSets[id(htmlObj)].usedColumns()
+    if containerCols is None:
+      return None
+
+    cols |= containerCols
+  filters = jsSource.get('filters', {})
+  for colName in filters:
+    if not colName in ('allIfEmpty', '_colsMaps'):
+      cols.add(filters.get('_colsMaps', {}).get(colName, colName))
+  return cols
+
+
 class Js(object):
   """
   :category:
@@ -125,10 +188,15 @@ class Js(object):
 
   """
 
-  def __init__(self, aresObj, pyDf, keys=None, values=None, debug=False):
+  def __init__(self, aresObj, pyDf, keys=None, values=None, debug=False, pushdown=None):
     load()
     self._schema = {'fncs': [], 'out': None, 'post': [], 'keys': set() if keys is None else set(keys),
-                    'values': set() if values is None else set(values), 'debug': getattr(aresObj, 'DEBUG', debug)}
+                    'values': set() if values is None else set(values), 'debug': getattr(aresObj, 'DEBUG', debug),
+                    'pushdown': pushdown}
+    self._pushDownData = None # Result of the record functions run in Python
+    if callable(getattr(type(pyDf), 'toDf', None)):
+      # Lazy frames (for example the SqlConn select) are only run when they are used by a component
+      pyDf = pyDf.toDf(aresObj=aresObj)
     self._dataId = id(pyDf) # Store the memory ID of the original object (the one known by all the components
     if not hasattr(pyDf, 'htmlCode'):
       dataCode = None
@@ -166,6 +234,7 @@ class Js(object):
     if not self._jqId in self.aresObj.jsSources:
       self.aresObj.jsSources[self._jqId] = {'dataId': self._dataId, 'containers': [], 'data': self._data}
     self.aresObj.jsSources[self._jqId]['containers'].append(htmlObj)
+    self.aresObj.jsSources[self._jqId].setdefault('recordSets', {})[id(htmlObj)] = self
     self.aresObj.jsSources[self._jqId]['data'] = self._data # In case of replacements
 
   def output(self, outFamily, outType, args):
@@ -218,8 +287,86 @@ class Js(object):
         for category, sysCols in systemInfo.items():
           args = factory['fncs'][fncName]['class'].extendArgs(category, args, sysCols)
       self._schema['fncs'].append({'name': fncName, 'args': args})
+    self._pushDownData = None
     return self
 
+  def setPushDown(self, flag=True):
+    """
+    :category: Formatting
+    :rubric: PY
+    :type: Data Transformation
+    :example: js.AresJs.Js(aresObj, df).fncs([('sum', ['name'], ['value'])]).setPushDown(False)
+    :dsc:
+      Run the record functions in Python and only write the result to the page. By default (None) this is done
+      automatically when all the functions are available in the module AresJsPushDown and when there is no filter
+      attached to the data source. If False the functions will always be run in the browser.
+      If True an error will be raised if the functions cannot be run in Python.
+    :return: The Python Js object
+    """
+    self._schema['pushdown'], self._pushDownData = flag, None
+    return self
+
+  def isPushDown(self):
+    """
+    :category: Formatting
+    :rubric: PY
+    :type: Data Transformation
+    :dsc:
+      Check if the record functions can be run in Python. The result is computed only once and it is stored in the object.
+      The functions are run in the browser when some filters are attached to the data source as the raw data is needed.
+    :return: A boolean
+    """
+    if self._schema['pushdown'] is False or not self._schema['fncs'] or not hasattr(self.aresObj, 'jsGlobal'):
+      return False
+
+    if self.aresObj.jsSources.get(self.jqId, {}).get('filters'):
+      return False
+
+    if self._pushDownData is None:
+      try:
+        self._pushDownData = AresJsPushDown.toJs(AresJsPushDown.run(self._data, self._schema['fncs']))
+      except Exception as err:
+        if self._schema['pushdown']:
+          raise Exception("Record functions cannot be run in Python, %s" % err)
+
+        if self._schema['debug']:
+          self.aresObj.jsOnLoadFnc.add(self.aresObj.jsConsole("Record functions run in Javascript for %s, %s" % (self._jqId, err), isPyData=True))
+        self._pushDownData = False
+    return self._pushDownData is not False
+
+  def usedColumns(self):
+    """
+    :category: Formatting
+    :rubric: PY
+    :type: Data Transformation
+    :dsc:
+      Columns of the original recordSet read in the browser for this object.
+    :return: A Python set or None if the columns are not known
+    """
+    if self.isPushDown():
+      return set()
+
+    if not self._schema['fncs'] or not self._schema['fncs'][0]['name'] in factory['fncs']:
+      return None
+
+    fnc = self._schema['fncs'][0]
+    fncCls = factory['fncs'][fnc['name']]['class']
+    if not hasattr(fncCls, 'inputColumns') or fnc['args'] is None:
+      return None
+
+    return fncCls.inputColumns(fnc['args'])
+
+  @property
+  def jsPushDown(self):
+    """
+    :category: Javascript Object
+    :rubric: JS
+    :type: System
+    :dsc:
+      The Javascript variable name with the result of the record functions run in Python.
+    """
+    return "%s_%s" % (self._jqId, ares.utils.AresSiphash.SipHash().hashId(json.dumps(self._schema['fncs'])))
+
   def post(self, fncNames):
     """
     :category: Formatting
@@ -270,6 +417,9 @@ class Js(object):
       filters.append("'%s': %s" % (k, v))
     if len(filters) > 0:
       jsFncs = [{'args_js': ['{%s}' % ", ".join(filters)], 'name': 'ares_filter'}] + jsFncs
+    elif self.isPushDown():
+      self.aresObj.jsGlobal.add(self.jsPushDown, self._pushDownData)
+      val, jsFncs = self.jsPushDown, []
     # Set all the Javascript functions
     for fnc in jsFncs:
       if fnc['name'] in factory['fncs']:
@@ -318,7 +468,7 @@ class Js(object):
     """
     tsv = ares.Lib.js.objects.jsText.JsTextTsv()
     self.aresObj.jsGlobal.fnc("ToTsv(data, colNames)", "%s; return result" % tsv.value)
-    return "ToTsv(%s, %s)" % (self.jqId, json.dumps(list(self._schema['keys'] | self._schema['values'])))
+    return "ToTsv(%s, %s)" % (self.jsPushDown if self.isPushDown() else self.jqId, json.dumps(list(self._schema['keys'] | self._schema['values'])))
 
   # --------------------------------------------------------------------------------------------------------------
   #
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Downsampling of the time series before they are written to the page.
+__
+A line chart cannot display more points than the number of pixels of its canvas, so a series with millions of ticks
+can be reduced to a few thousands points without any visible change. Two algorithms are available:
+
+- lttb, Largest Triangle Three Buckets. In each bucket the point kept is the one with the largest triangle with the
+point kept in the previous bucket and the average of the next bucket. This keeps the shape of the series.
+- minmax, the minimum and the maximum of each bucket are kept. This keeps all the peaks of the series.
+
+The buckets are computed with numpy and the algorithms are run per series. The rows kept for a chart are the union of
+the rows kept for each series.
+
+```python
+aresObj.chart('line', df, seriesNames=['price'], xAxis='date', sampling={'points': 2000, 'method': 'minmax'})
+```
+'''}
+
+
+from ares.Lib.AresImports import requires
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+# Charts drawing a continuous series which can be downsampled
+SAMPLING_CHARTS = ('line', 'spline', 'step', 'area', 'area-spline', 'area-step', 'area-end')
+
+
+def xValues(series):
+  """
+  :category: Down Sampling
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Numeric values of the x axis. The dates are converted to nanoseconds and the other non numeric values (categories)
+    are replaced by their positions.
+  :return: A numpy float array
+  """
+  if series.dtype.kind == 'M':
+    return series.values.view('i8').astype(float)
+
+  if series.dtype.kind in 'iufb':
+    return series.values.astype(float)
+
+  return ares_numpy.arange(len(series), dtype=float)
+
+
+def lttb(x, y, points):
+  """
+  :category: Down Sampling
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Largest Triangle Three Buckets. The first and the last points are always kept. The null values are ignored.
+  :example: lttb(ares_numpy.arange(10 ** 6), values, 1000)
+  :link Algorithm: https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf
+  :return: A numpy array with the positions of the points kept
+  """
+  valid = ares_numpy.flatnonzero(~ares_numpy.isnan(y))
+  if len(valid) <= points or points < 3:
+    return valid
+
+  x, y = x[valid], y[valid]
+  # Buckets of the same size between the first and the last point
+  edges = ares_numpy.linspace(1, len(x) - 1, points - 1).astype(int)
+  sums = ares_numpy.add.reduceat(ares_numpy.vstack([x[:-1], y[:-1]]), edges[:-1], axis=1)
+  counts = ares_numpy.diff(edges)
+  avgX, avgY = sums[0] / counts, sums[1] / counts
+  result = ares_numpy.empty(points, dtype=int)
+  result[0], result[-1], a = 0, len(x) - 1, 0
+  for i in range(points - 2):
+    start, end = edges[i], edges[i + 1]
+    nextX, nextY = (avgX[i + 1], avgY[i + 1]) if i + 1 < len(avgX) else (x[-1], y[-1])
+    areas = ares_numpy.abs((x[a] - nextX) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (nextY - y[a]))
+    a = start + int(ares_numpy.argmax(areas))
+    result[i + 1] = a
+  return valid[result]
+
+
+def minMax(x, y, points):
+  """
+  :category: Down Sampling
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Keep the minimum and the maximum of each bucket (plus the first and the last points). The null values are ignored.
+  :example: minMax(ares_numpy.arange(10 ** 6), values, 1000)
+  :return: A numpy array with the positions of the points kept
+  """
+  valid = ares_numpy.flatnonzero(~ares_numpy.isnan(y))
+  if len(valid) <= points or points < 4:
+    return valid
+
+  y = y[valid]
+  # Buckets of the same size stored as the rows of a matrix, the last one is padded
+  bucketSize = -(-len(y) // (points // 2))
+  padSize = bucketSize * (-(-len(y) // bucketSize)) - len(y)
+  lows = ares_numpy.append(y, ares_numpy.full(padSize, ares_numpy.inf)).reshape(-1, bucketSize)
+  highs = ares_numpy.append(y, ares_numpy.full(padSize, -ares_numpy.inf)).reshape(-1, bucketSize)
+  offsets = ares_numpy.arange(len(lows)) * bucketSize
+  positions = ares_numpy.unique(ares_numpy.concatenate([[0, len(y) - 1], offsets + lows.argmin(axis=1), offsets + highs.argmax(axis=1)]))
+  return valid[positions]
+
+
+METHODS = {'lttb': lttb, 'minmax': minMax}
+
+
+def sample(df, xAxis, seriesNames, points, method='lttb'):
+  """
+  :category: Down Sampling
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Return the rows to be kept to draw the series. The dataframe should be sorted on the x axis.
+  :example: df.iloc[sample(df, 'date', ['price'], 1000)]
+  :return: A sorted numpy array with the rows positions
+  """
+  if not method in METHODS:
+    raise Exception("Down sampling method %s not recognised, it should be in %s" % (method, ", ".join(sorted(METHODS))))
+
+  x, positions = xValues(df[xAxis]), []
+  for seriesName in seriesNames:
+    y = ares_pandas.to_numeric(df[seriesName], errors='coerce').values.astype(float)
+    positions.append(METHODS[method](x, y, points))
+  if not positions:
+    return ares_numpy.arange(len(df))
+
+  return ares_numpy.unique(ares_numpy.concatenate(positions))
+
+
+def window(df, xAxis, start=None, end=None):
+  """
+  :category: Down Sampling
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Rows of a dataframe sorted on the x axis between start and end (for example the range of a chart zoom). Those values
+    are the ones received from the browser, the dates are strings. The points just before and after the window are
+    kept to draw the lines up to the borders.
+  :return: A tuple with the first and the last position (excluded)
+  """
+  if start is None or end is None:
+    return 0, len(df)
+
+  series = df[xAxis]
+  if series.dtype.kind == 'M':
+    start, end = ares_pandas.Timestamp(start).to_datetime64(), ares_pandas.Timestamp(end).to_datetime64()
+  else:
+    start, end = float(start), float(end)
+  first, last = series.values.searchsorted(start, side='left'), series.values.searchsorted(end, side='right')
+  return max(int(first) - 1, 0), min(int(last) + 1, len(df))
+
+
+if __name__ == '__main__':
+  import time
+
+  rowsCount = 2 * 10 ** 6
+  df = ares_pandas.DataFrame({'date': ares_pandas.date_range('2018-01-01', periods=rowsCount, freq='s'),
+                              'price': 100 + ares_numpy.random.randn(rowsCount).cumsum(), 'volume': ares_numpy.random.rand(rowsCount)})
+  df.loc[df.index[::1000], 'volume'] = ares_numpy.nan
+  for method in sorted(METHODS):
+    start = time.time()
+    positions = sample(df, 'date', ['price', 'volume'], 1000, method)
+    print("%s: %s rows to %s in %.3fs" % (method, rowsCount, len(positions), time.time() - start))
+  positions = sample(df, 'date', ['price'], 1000, 'minmax')
+  assert df['price'].iloc[positions].max() == df['price'].max() and df['price'].iloc[positions].min() == df['price'].min()
+  assert (ares_numpy.diff(sample(df, 'date', ['price'], 1000)) > 0).all()
+  print("Window %s" % str(window(df, 'date', '2018-01-01 01:00:00', '2018-01-01 02:00:00')))
@@ -18,11 +18,15 @@ __
 As a reminder a global variable in javascript is something set at the beginning using the var keyword which can be then used in each function in the report. The scope of those variables are global and no need normally to mention the use of a global variable in a function. There is no need for special keyword.
 __
 To add a variable, please use the function add by only adding the varName, the function definition (without the ; at the end. It is not necessary as it will be added anyway).
+The data sources are added with the function addData in order to be compressed in the offline reports (see compressData).
 """}
 
 
 import json
+import gzip
+import base64
 import logging
+import collections
 from ares.Lib import AresMarkDown
 
 
@@ -80,10 +84,13 @@ class JsGlobalVars(object):
     Then at the end it will return all the global variable as a string in the function __str__
   """
   breadCrumVar = 'breadCrumUrl'
+  # Promise resolved when all the compressed data variables are defined
+  dataPromise = 'AresDataLoaded'
 
   def __init__(self, aresObj=None):
     """ Create an object to monitor the definition of the global variables """
     self.jsGlobals, self.jsVarOrder, self.jsFragments, self.reportHtmlCode = {}, [], set(), set([])
+    self.jsData = collections.OrderedDict()
     self.aresObj = aresObj
     self.jsGlobalsFnc = {'buildBreadCrum()': '''
         var params = [] ; for(var key in %(breadCrumVar)s['params']) { params.push(key + "=" + %(breadCrumVar)s['params'][key]) ;  }
@@ -152,6 +159,37 @@ class JsGlobalVars(object):
       text = text.replace(/\[(.*?)\]\((.*?)\)/g, "<a href='$2'>$1</a>");
       if ( (text == '') || ( text == '__' ) ) { text = '<br />'; }
       return text ;'''
+    self.jsGlobalsFnc['AresInflate(b64)'] = '''
+        var bin = atob(b64); var bytes = new Uint8Array(bin.length);
+        for(var i = 0; i < bin.length; i++){bytes[i] = bin.charCodeAt(i)};
+        return new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'))).text().then(function(text){
+          try {return JSON.parse(text)} catch(err) {return (new Function('return ' + text))()}});
+      '''
+    self.jsGlobalsFnc['AresColumnsDecode(payload)'] = '''
+        if ((payload === null) || ((payload.dicts === undefined) && (payload.types === undefined))) {return payload};
+        var arrayTypes = {Float64Array: Float64Array, Int32Array: Int32Array};
+        var dicts = payload.dicts || {}; var types = payload.types || {}; var data = {};
+        payload.cols.forEach(function(col){
+          var values = payload.data[col];
+          if (col in dicts) {values = values.map(function(code){return code === null ? null : dicts[col][code]})}
+          else if (col in types) {
+            var bin = atob(values); var bytes = new Uint8Array(bin.length);
+            for(var i = 0; i < bin.length; i++){bytes[i] = bin.charCodeAt(i)};
+            values = new arrayTypes[types[col]](bytes.buffer)};
+          data[col] = values});
+        return {cols: payload.cols, data: data};
+      '''
+    self.jsGlobalsFnc['AresColumnsToRecords(payload)'] = '''
+        var result = []; payload = AresColumnsDecode(payload); if (payload === null) {return result};
+        var cols = payload.cols; var count = cols.length > 0 ? payload.data[cols[0]].length : 0;
+        for(var i = 0; i < count; i++){
+          var rec = {};
+          for(var j = 0; j < cols.length; j++){
+            var val = payload.data[cols[j]][i];
+            if((val !== null) && (val === val)){rec[cols[j]] = val}};
+          result.push(rec)};
+        return result;
+      '''
     self.jsGlobalsFnc['getDict(object, key, defaultValue)'] = '''
         var result = object[key];
         return (typeof result !== "undefined") ? result : defaultValue;
@@ -231,6 +269,49 @@ class JsGlobalVars(object):
       logging.info("Javascript global variable %s will be overriden" % varName)
     self.jsGlobals[varName] = stringDefinition
 
+  def addData(self, varName, jsData, jsFnc=None, varDeps=None, isJson=True):
+    """
+    :category: JS Framework
+    :rubric: JS
+    :dsc:
+      Add a data variable. jsData is the json text of the data (or a Javascript expression using other data variables
+      if isJson is False) and jsFnc the optional function to be applied to it in the browser.
+      Those variables are written as the other global variables unless compressData is called.
+    :example: aresObj.jsGlobal.addData('recordset_1', '{"cols": [], "data": {}}', 'AresColumnsToRecords')
+    """
+    self.jsData[varName] = (jsData, jsFnc, isJson)
+    self.add(varName, jsData if jsFnc is None else "%s(%s)" % (jsFnc, jsData), varDeps=varDeps)
+
+  def compressData(self, minBytes=1024):
+    """
+    :category: JS Framework
+    :rubric: JS
+    :dsc:
+      Compress the json data variables with gzip and write them in base64. The browser will inflate them with its
+      native DecompressionStream and the variables will be defined once the promise AresDataLoaded is resolved.
+      The level 6 is used as the level 9 is several times slower for a few percents of size.
+      The data variables smaller than minBytes are not compressed.
+    :return: True if some variables are compressed. In this case the code using the data should wait for AresDataLoaded
+    """
+    blocks, assignments = [], []
+    for varName in [var for var in self.jsVarOrder if var in self.jsData]:
+      jsData, jsFnc, isJson = self.jsData[varName]
+      if isJson:
+        if len(jsData) < minBytes:
+          continue
+
+        blocks.append('"%s"' % base64.b64encode(gzip.compress(jsData.encode('utf-8'), compresslevel=6)).decode('ascii'))
+        jsData = "values[%s]" % (len(blocks) - 1)
+      assignments.append((varName, jsData if jsFnc is None else "%s(%s)" % (jsFnc, jsData)))
+    if not blocks:
+      return False
+
+    for varName, _ in assignments:
+      self.jsGlobals[varName] = None
+    self.jsFragments.add("var %s = Promise.all([%s].map(AresInflate)).then(function(values){%s}) ;" % (
+      self.dataPromise, ", ".join(blocks), "".join(["%s = %s;" % assignment for assignment in assignments])))
+    return True
+
   def addJs(self, jsFnc):
     """
     :category: JS Framework
@@ -266,3 +347,19 @@ class JsGlobalVars(object):
     items.extend(PROTOTYPE_FNC)
     items.append('var %s = {url: "", params: {} } ;' % self.breadCrumVar)
     return "".join(items)
+
+
+if __name__ == '__main__':
+  from ares.Lib import Ares
+
+  # The data variables sharing the content of another one (see Report.html) should be declared after it
+  jsGlobal = JsGlobalVars(Ares.ReportAPI())
+  jsGlobal.addData('recordset_1', '[%s]' % ", ".join(['{"a": %s}' % i for i in range(500)]))
+  jsGlobal.addData('recordset_2', 'recordset_1', isJson=False)
+  assert jsGlobal.jsVarOrder == ['recordset_1', 'recordset_2']
+  page = str(jsGlobal)
+  assert page.index('var recordset_1 = [') < page.index('var recordset_2 = recordset_1;')
+  assert jsGlobal.compressData(minBytes=10)
+  fragment = list(jsGlobal.jsFragments)[0]
+  assert fragment.index('recordset_1 = values[0];') < fragment.index('recordset_2 = recordset_1;')
+  print(page[:200])
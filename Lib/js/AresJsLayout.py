@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Force directed layout of the network charts computed in Python.
+__
+The network charts run a physics simulation in the browser to place the nodes, this can freeze the page for large
+graphs. The layout can be computed here with numpy and the nodes are then written with fixed positions (the physics is
+disabled in the chart):
+
+- Spectral initialisation: the two first non trivial eigenvectors of the random walk matrix (power iterations on the
+sparse edges, Koren's method). This gives the global shape of the graph.
+- Force refinement: Fruchterman-Reingold iterations where the repulsion of the far nodes is approximated by the
+centroids of the cells of a grid (like a one level Barnes-Hut tree). Thus an iteration costs n * sqrt(n) instead of n^2.
+
+The positions are cached by the content of the graph (nodes and edges) in the connectors result cache, so the layout is
+only computed once for a graph.
+
+```python
+c = aresObj.chart('network', nodes, chartFamily='Vis')
+c.edges(edges).layout(iterations=100)
+```
+'''}
+
+
+from ares.Lib.AresImports import requires
+from ares.Lib.connectors import AresConnCache
+
+# Will automatically add the external library to be able to use this module
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+# Number of nodes above which the network charts get a Python layout by default and cache time to live (in seconds)
+LAYOUT_THRESHOLD, LAYOUT_TTL = 500, 30 * 24 * 3600
+
+
+def spectral(nodesCount, sources, targets, iterations=100, seed=0):
+  """
+  :category: Graph Layout
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Two dimensions spectral layout with power iterations on the random walk matrix 0.5 * (I + D^-1 A). Each dimension is
+    kept D-orthogonal to the constant vector and to the previous dimension.
+  :link Koren, Drawing graphs by eigenvectors: https://www.sciencedirect.com/science/article/pii/S0898122104003185
+  :return: A numpy array (nodesCount, 2)
+  """
+  rand = ares_numpy.random.RandomState(seed)
+  degrees = ares_numpy.bincount(sources, minlength=nodesCount) + ares_numpy.bincount(targets, minlength=nodesCount)
+  degrees = ares_numpy.maximum(degrees, 1).astype(float)
+  vectors = [ares_numpy.ones(nodesCount) / ares_numpy.sqrt(nodesCount)]
+  for _ in range(2):
+    x = rand.rand(nodesCount) - 0.5
+    for _ in range(iterations):
+      for vector in vectors:
+        x -= (x * degrees).dot(vector) / (vector * degrees).dot(vector) * vector
+      neighbours = ares_numpy.bincount(sources, weights=x[targets], minlength=nodesCount) + ares_numpy.bincount(targets, weights=x[sources], minlength=nodesCount)
+      x = 0.5 * (x + neighbours / degrees)
+      x /= ares_numpy.linalg.norm(x) or 1
+    vectors.append(x)
+  return ares_numpy.column_stack(vectors[1:])
+
+
+def forces(positions, sources, targets, k, chunkSize=500):
+  """
+  :category: Graph Layout
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Fruchterman-Reingold displacements. The repulsion (k^2 / d) is computed with the centroids of the grid cells, the
+    own cell of a node is used without the node itself. The attraction (d^2 / k) is computed on the edges.
+  :return: A numpy array (nodesCount, 2)
+  """
+  nodesCount = len(positions)
+  gridSize = max(int(ares_numpy.ceil(1.5 * nodesCount ** 0.25)), 1)
+  low, high = positions.min(axis=0), positions.max(axis=0)
+  cellXY = ares_numpy.minimum(((positions - low) / ares_numpy.maximum(high - low, 1e-9) * gridSize).astype(int), gridSize - 1)
+  cells = cellXY[:, 0] * gridSize + cellXY[:, 1]
+  counts = ares_numpy.bincount(cells, minlength=gridSize * gridSize).astype(float)
+  sums = ares_numpy.column_stack([ares_numpy.bincount(cells, weights=positions[:, i], minlength=gridSize * gridSize) for i in range(2)])
+  used = ares_numpy.flatnonzero(counts)
+  centroids, masses = sums[used] / counts[used, None], counts[used]
+  cellPositions = ares_numpy.searchsorted(used, cells)
+  displacements = ares_numpy.zeros_like(positions)
+  for start in range(0, nodesCount, chunkSize):
+    chunk = slice(start, start + chunkSize)
+    deltaX = ares_numpy.subtract.outer(positions[chunk, 0], centroids[:, 0])
+    deltaY = ares_numpy.subtract.outer(positions[chunk, 1], centroids[:, 1])
+    weights = deltaX * deltaX
+    weights += deltaY * deltaY
+    weights += 1e-2
+    ares_numpy.divide(masses * (k * k), weights, out=weights)
+    weights[ares_numpy.arange(len(weights)), cellPositions[chunk]] = 0
+    displacements[chunk, 0] = ares_numpy.einsum('ij,ij->i', deltaX, weights)
+    displacements[chunk, 1] = ares_numpy.einsum('ij,ij->i', deltaY, weights)
+  # Repulsion of the other nodes of the same cell
+  others = counts[cells] - 1
+  ownCentroids = (sums[cells] - positions) / ares_numpy.maximum(others, 1)[:, None]
+  deltas = positions - ownCentroids
+  displacements += deltas * (others * k * k / ares_numpy.maximum((deltas ** 2).sum(axis=1), 1e-2))[:, None]
+  # Attraction along the edges
+  deltas = positions[sources] - positions[targets]
+  attractions = deltas * (ares_numpy.sqrt((deltas ** 2).sum(axis=1)) / k)[:, None]
+  for i in range(2):
+    displacements[:, i] -= ares_numpy.bincount(sources, weights=attractions[:, i], minlength=nodesCount)
+    displacements[:, i] += ares_numpy.bincount(targets, weights=attractions[:, i], minlength=nodesCount)
+  return displacements
+
+
+def forceLayout(nodesCount, sources, targets, iterations=50, seed=0, size=None):
+  """
+  :category: Graph Layout
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Spectral initialisation and force refinement. The temperature (maximum move of a node) decreases linearly and a
+    small gravity keeps the disconnected parts together.
+  :example: forceLayout(3, numpy.array([0, 0]), numpy.array([1, 2]))
+  :return: A numpy array (nodesCount, 2) with the positions
+  """
+  sources, targets = ares_numpy.asarray(sources, dtype=int), ares_numpy.asarray(targets, dtype=int)
+  if nodesCount < 3:
+    return ares_numpy.array([[i * 100.0, 0] for i in range(nodesCount)]).reshape(nodesCount, 2)
+
+  size = size or 100 * ares_numpy.sqrt(nodesCount)
+  k = size / ares_numpy.sqrt(nodesCount)
+  positions = spectral(nodesCount, sources, targets, seed=seed)
+  positions = (positions - positions.mean(axis=0)) / ares_numpy.maximum(positions.std(axis=0), 1e-12) * size / 4
+  # Small noise to split the nodes with the same spectral position (for example the disconnected parts)
+  positions += ares_numpy.random.RandomState(seed).rand(nodesCount, 2) * k
+  for i in range(iterations):
+    temperature = size / 10 * (1 - float(i) / iterations) + k / 10
+    displacements = forces(positions, sources, targets, k) - 0.05 * positions / k
+    lengths = ares_numpy.maximum(ares_numpy.sqrt((displacements ** 2).sum(axis=1)), 1e-9)
+    positions += displacements / lengths[:, None] * ares_numpy.minimum(lengths, temperature)[:, None]
+  return positions - positions.mean(axis=0)
+
+
+def layout(nodeIds, edges, iterations=50, seed=0):
+  """
+  :category: Graph Layout
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Positions of the nodes of a graph. The edges to unknown nodes are ignored. The result is cached by the content of
+    the graph and the parameters.
+  :example: layout([1, 2, 3], [(1, 2), (1, 3)])
+  :return: A Python dictionary with the position (x, y) per node id
+  """
+  nodeIds = list(nodeIds)
+  key = AresConnCache.ResultCache.key('LAYOUT', [nodeIds, [list(edge) for edge in edges], iterations, seed])
+  found, positions = AresConnCache.CACHE.get('LAYOUT', key)
+  if found:
+    return positions
+
+  indices = dict([(nodeId, i) for i, nodeId in enumerate(nodeIds)])
+  pairs = [(indices[s], indices[t]) for s, t in edges if s in indices and t in indices and s != t]
+  sources, targets = ([s for s, _ in pairs], [t for _, t in pairs]) if pairs else ([], [])
+  coords = forceLayout(len(nodeIds), sources, targets, iterations=iterations, seed=seed)
+  positions = dict([(nodeId, (round(float(coords[i, 0]), 1), round(float(coords[i, 1]), 1))) for i, nodeId in enumerate(nodeIds)])
+  AresConnCache.CACHE.set('LAYOUT', key, positions, LAYOUT_TTL)
+  return positions
+
+
+if __name__ == '__main__':
+  import time
+
+  # Random dependency graph: a tree with some extra edges
+  nodesCount, rand = 20000, ares_numpy.random.RandomState(1)
+  targets = ares_numpy.arange(1, nodesCount)
+  sources = (rand.rand(nodesCount - 1) * targets).astype(int)
+  extraSources, extraTargets = rand.randint(0, nodesCount, 2000), rand.randint(0, nodesCount, 2000)
+  sources, targets = ares_numpy.append(sources, extraSources), ares_numpy.append(targets, extraTargets)
+  start = time.time()
+  positions = forceLayout(nodesCount, sources, targets)
+  print("Layout of %s nodes and %s edges in %.2fs" % (nodesCount, len(sources), time.time() - start))
+  edgeLengths = ares_numpy.sqrt(((positions[sources] - positions[targets]) ** 2).sum(axis=1))
+  randomLengths = ares_numpy.sqrt(((positions[rand.randint(0, nodesCount, 5000)] - positions[rand.randint(0, nodesCount, 5000)]) ** 2).sum(axis=1))
+  print("Median edge length %.1f, median distance between random nodes %.1f" % (ares_numpy.median(edgeLengths), ares_numpy.median(randomLengths)))
+  assert ares_numpy.isfinite(positions).all() and ares_numpy.median(edgeLengths) < ares_numpy.median(randomLengths) / 3
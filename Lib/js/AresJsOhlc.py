@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Open, high, low, close and volume bars computed from the tick data for the candlestick charts.
+__
+The ticks are resampled with pandas (resample().ohlc()) to bars of a given interval. The bars are aligned on the epoch
+so they are the same from one run to another. Only the bars are written to the page, the date of a bar is its start in
+milliseconds (the bars can be shorter than a day).
+
+When a cache key is defined, the closed bars are kept in the connectors result cache. All the bars but the last one are
+closed (the ticks are supposed to arrive in time order), thus on a refresh only the ticks of the current bar are
+resampled again. The cached bars are stored with a hash of the ticks of the closed bars and they are only reused when
+the ticks are the same (otherwise, for example for another ticker with the same key or a late tick, all the bars are
+computed again).
+
+```python
+aresObj.chart('candlestick', ticks, seriesNames=['price', 'volume'], xAxis='time', bars={'interval': '5min', 'cache': 'ticks_AAPL'})
+```
+'''}
+
+
+from ares.Lib.AresImports import requires
+from ares.Lib.connectors import AresConnCache
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+
+
+# Columns of the bars and cache time to live (in seconds)
+COLUMNS, OHLC_TTL = ('open', 'high', 'low', 'close', 'volume'), 24 * 3600
+
+
+def bars(df, dateCol, priceCol, volumeCol=None, interval='1min'):
+  """
+  :category: Candlestick
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Resample the ticks to bars. The volume is the sum of the volume column or the number of ticks when there is no
+    volume column. The intervals without any tick are removed.
+  :example: bars(df, 'time', 'price', 'volume', '5min')
+  :return: A pandas dataframe with the open, high, low, close and volume per bar start
+  """
+  ticks = df[[priceCol] + ([volumeCol] if volumeCol is not None else [])].set_index(ares_pandas.DatetimeIndex(ares_pandas.to_datetime(df[dateCol]), name=dateCol))
+  result = ticks[priceCol].resample(interval, origin='epoch').ohlc()
+  if volumeCol is not None:
+    result['volume'] = ticks[volumeCol].resample(interval, origin='epoch').sum()
+  else:
+    result['volume'] = ticks[priceCol].resample(interval, origin='epoch').count()
+  return result.dropna(subset=['open'])
+
+
+def resample(df, dateCol, priceCol, volumeCol=None, interval='1min', cacheKey=None):
+  """
+  :category: Candlestick
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Bars of the ticks. With a cache key only the ticks from the start of the last cached bar are resampled, if the ticks
+    of the cached closed bars did not change. The content of the ticks is checked with the sum of the rows hashes.
+  :example: resample(df, 'time', 'price', 'volume', '5min', cacheKey='ticks_AAPL')
+  :return: A pandas dataframe with the open, high, low, close and volume per bar start
+  """
+  closedBars, key, ticks = None, None, df
+  if cacheKey is not None:
+    key = AresConnCache.ResultCache.key('OHLC', [cacheKey, dateCol, priceCol, volumeCol, interval])
+    dates = ares_pandas.DatetimeIndex(ares_pandas.to_datetime(df[dateCol]))
+    rowHashes = ares_pandas.util.hash_pandas_object(df[[dateCol, priceCol] + ([volumeCol] if volumeCol is not None else [])], index=False).values
+    found, cached = AresConnCache.CACHE.get('OHLC', key)
+    if found and int(rowHashes[dates < cached[1]].sum()) == cached[2]:
+      closedBars, ticks = cached[0], df[dates >= cached[1]]
+
+  result = bars(ticks, dateCol, priceCol, volumeCol, interval)
+  if closedBars is not None:
+    result = ares_pandas.concat([closedBars, result])
+  if key is not None and len(result):
+    # The last bar is still open, its ticks will be resampled again on the next refresh
+    AresConnCache.CACHE.set('OHLC', key, (result.iloc[:-1], result.index[-1], int(rowHashes[dates < result.index[-1]].sum())), OHLC_TTL)
+  return result
+
+
+def records(ohlc, dateCol='date'):
+  """
+  :category: Candlestick
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Bars to the chart records, the date is the start of the bar in milliseconds.
+  :return: A list of Python dictionaries
+  """
+  result = ohlc.reset_index(drop=True)
+  result.insert(0, dateCol, ohlc.index.asi8 // 10 ** 6)
+  return result.to_dict(orient='records')
+
+
+if __name__ == '__main__':
+  import time
+  import numpy
+
+  ticksCount = 5 * 10 ** 6
+  ticks = ares_pandas.DataFrame({'time': ares_pandas.Timestamp('2018-01-01') + ares_pandas.to_timedelta(numpy.sort(numpy.random.randint(0, 10 ** 10, ticksCount)), unit='ms'),
+                                 'price': 100 + numpy.random.randn(ticksCount).cumsum() / 100, 'volume': numpy.random.randint(1, 100, ticksCount)})
+  # The cache key identifies the ticks, a new one is used for the random data of each run
+  cacheKey = 'ticks_test_%s' % time.time()
+  for run in range(2):
+    start = time.time()
+    ohlc = resample(ticks, 'time', 'price', 'volume', '5min', cacheKey=cacheKey)
+    print("Run %s: %s ticks to %s bars in %.3fs" % (run, ticksCount, len(ohlc), time.time() - start))
+  assert ohlc.equals(bars(ticks, 'time', 'price', 'volume', '5min'))
+  # New ticks in the current bar and in a new bar
+  newTicks = ares_pandas.DataFrame({'time': [ticks['time'].iloc[-1], ticks['time'].iloc[-1] + ares_pandas.Timedelta('5min')], 'price': [1000.0, 0.5], 'volume': [10, 20]})
+  ticks = ares_pandas.concat([ticks, newTicks], ignore_index=True)
+  ohlc = resample(ticks, 'time', 'price', 'volume', '5min', cacheKey=cacheKey)
+  assert ohlc.equals(bars(ticks, 'time', 'price', 'volume', '5min')) and ohlc['high'].iloc[-2] == 1000.0
+  # Other ticks with the same key
+  ticks['price'] = 5.0
+  assert (resample(ticks, 'time', 'price', 'volume', '5min', cacheKey=cacheKey)['close'] == 5.0).all()
+  print(records(ohlc.iloc[-1:]))
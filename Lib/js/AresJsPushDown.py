@@ -0,0 +1,620 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Python implementation of the record functions defined in the module **jsFncsRecords.py**.
+Those functions are by default run in the browser on the full recordSet. When a component does not need the raw data
+(no global filters attached to the data source) the chain of functions can be run in Python and only the result will be
+written to the page. The outputs and the post functions are still run on the Javascript side.
+__
+The implementations follow the Javascript semantics (the keys are converted to strings, the missing values are undefined,
+the null values are 0 in the arithmetic) in order to get the same result in both layers.
+__
+To add a new function, write a Python function with the same parameters as the Javascript one and register it in FNCS
+with the name of the Javascript function. Any exception raised during the Python run will keep the Javascript version.
+'''}
+
+
+import os
+import json
+import collections
+import shutil
+import subprocess
+
+from ares.Lib.AresImports import requires
+from ares.Lib.js import AresJsEncoder
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+class JsUndefined(object):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: System
+  :dsc:
+    Marker for a key which is not defined in a Javascript record. Those keys are removed when the result is written
+  """
+  def __repr__(self): return 'undefined'
+
+
+UNDEFINED = JsUndefined()
+
+
+def jsString(val, join=False):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :dsc:
+    Convert a value to a string like the Javascript String function. If join is set to True the null and undefined
+    values are converted to an empty string as in the Javascript join function.
+  :return: A Python string
+  """
+  if isinstance(val, str):
+    return val
+
+  if val is UNDEFINED:
+    return '' if join else 'undefined'
+
+  if val is None:
+    return '' if join else 'null'
+
+  if isinstance(val, bool):
+    return 'true' if val else 'false'
+
+  if isinstance(val, float):
+    if val != val:
+      return 'NaN'
+
+    if val in (float('inf'), float('-inf')):
+      return 'Infinity' if val > 0 else '-Infinity'
+
+    if val.is_integer() and abs(val) < 1e21:
+      return str(int(val))
+
+    return repr(val).replace('e-0', 'e-')
+
+  return str(val)
+
+
+def jsNumber(val):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :dsc:
+    Convert a value to a number for the arithmetic like in Javascript (undefined is NaN and null is 0).
+    The string concatenations are not supported.
+  :return: A Python number
+  """
+  if val is UNDEFINED:
+    return float('nan')
+
+  if val is None:
+    return 0
+
+  if isinstance(val, bool):
+    return int(val)
+
+  if isinstance(val, (int, float)):
+    return val
+
+  raise Exception("Value %s not supported in the Python arithmetic" % val)
+
+
+def jsStrictEqual(a, b):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :dsc:
+    Python version of the strict equality (===) used in the Javascript indexOf function
+  :return: A boolean
+  """
+  if isinstance(a, bool) or isinstance(b, bool) or a is UNDEFINED or b is UNDEFINED or a is None or b is None:
+    return a is b or (type(a) == type(b) and a == b)
+
+  if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+    return a == b
+
+  return type(a) == type(b) and a == b
+
+
+def jsTruthy(val):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :return: True if the value is considered as true in Javascript
+  """
+  if val is UNDEFINED or val is None:
+    return False
+
+  if isinstance(val, float) and val != val:
+    return False
+
+  return bool(val)
+
+
+def jsValue(val):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :dsc:
+    Convert a numpy number to a Python one. Integer floats are written as integer to reduce the size of the result
+  :return: A Python number
+  """
+  if isinstance(val, ares_numpy.generic):
+    val = val.item()
+  if isinstance(val, float) and val.is_integer() and abs(val) < 2 ** 53:
+    return int(val)
+
+  return val
+
+
+def records(data):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Return the records as they would be received by a Javascript function.
+    For a dataframe the null values are removed from the records (as done by the function jsRecords)
+  :return: A list of Python dictionaries
+  """
+  if isinstance(data, ares_pandas.DataFrame):
+    return AresJsEncoder.encodeDataFrame(data, orient='records', dropna=True)
+
+  return data
+
+
+def columns(data, cols):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Return the values of the selected columns. The undefined values in the records are replaced by UNDEFINED.
+  :return: A tuple with the number of records and a dictionary with a list of values per column
+  """
+  if isinstance(data, ares_pandas.DataFrame):
+    result = {}
+    for col in cols:
+      if col in data.columns:
+        result[col] = [UNDEFINED if val is None else val for val in AresJsEncoder.encodeSeries(data[col])]
+      else:
+        result[col] = [UNDEFINED] * len(data)
+    return len(data), result
+
+  return len(data), dict([(col, [rec.get(col, UNDEFINED) for rec in data]) for col in cols])
+
+
+def numbers(data, col):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Return the values of a column as a numpy float array with the Javascript arithmetic conversion and a function to
+    get the original value of a given row.
+  :return: A tuple with the numpy array and the function
+  """
+  if isinstance(data, ares_pandas.DataFrame) and col in data.columns and data[col].dtype.kind in 'iufb':
+    series = data[col]
+    return series.values.astype(float), lambda i: UNDEFINED if ares_pandas.isnull(series.iat[i]) else series.iat[i].item()
+
+  _, cols = columns(data, [col])
+  values = cols[col]
+  return ares_numpy.array([jsNumber(val) for val in values], dtype=float), lambda i: values[i]
+
+
+def groups(data, keys):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Group the records according to the keys. Like in Javascript the key is the join of the values with the # separator
+    and the groups are in the order of the first record found.
+  :return: A tuple with the group codes of the records and the list of the labels
+  """
+  count, cols = columns(data, keys)
+  if count == 0:
+    return ares_numpy.array([], dtype=int), []
+
+  if not keys:
+    return ares_numpy.zeros(count, dtype=int), ['']
+
+  strings = [[jsString(val, join=True) for val in cols[k]] for k in keys]
+  labels = strings[0] if len(keys) == 1 else ['#'.join(vals) for vals in zip(*strings)]
+  codes, uniques = ares_pandas.factorize(ares_numpy.array(labels, dtype=object))
+  return codes, list(uniques)
+
+
+def aggregation(data, keys, values, operations):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Python version of the Javascript function ares_aggregation. The operations can be sum or count (default)
+  :return: A list of Python dictionaries
+  """
+  return aggregationChunks([data], keys, values, operations)
+
+
+def aggregationChunks(chunks, keys, values, operations):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Function ares_aggregation run on an iterator of recordSets (for example SqlConn.iterData). Only the groups are kept
+    in memory and the sums of the chunks are added, thus the floats can differ slightly from a single Javascript run.
+  :return: A list of Python dictionaries
+  """
+  sumCols, result = [v for v in values if operations.get(v, 'count') == 'sum'], collections.OrderedDict()
+  for data in chunks:
+    codes, labels = groups(data, keys)
+    sizes = ares_numpy.bincount(codes, minlength=len(labels))
+    firsts = ares_numpy.unique(codes, return_index=True)[1]
+    totals = {}
+    for v in sumCols:
+      # The sum is done in the records order to get exactly the same float than in Javascript
+      vals, firstVal = numbers(data, v)
+      totals[v] = (ares_numpy.bincount(codes, weights=vals, minlength=len(labels)), firstVal)
+    for i, label in enumerate(labels):
+      if not label in result:
+        result[label] = {'size': 0, 'sums': dict([(v, 0.0) for v in sumCols]), 'firsts': dict([(v, totals[v][1](firsts[i])) for v in sumCols])}
+      result[label]['size'] += int(sizes[i])
+      for v in sumCols:
+        result[label]['sums'][v] += totals[v][0][i]
+  recs = []
+  for label, group in result.items():
+    rec, splitKey = {}, label.split("#")
+    for i, k in enumerate(keys):
+      rec[k] = splitKey[i] if i < len(splitKey) else UNDEFINED
+    for v in values:
+      operation = operations.get(v, 'count')
+      if operation == 'count':
+        rec[v] = group['size']
+      elif operation == 'sum':
+        rec[v] = group['firsts'][v] if group['size'] == 1 else jsValue(group['sums'][v])
+    recs.append(rec)
+  return recs
+
+
+def aggSum(data, keys, values):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Python version of the Javascript function ares_sum
+  :return: A list of Python dictionaries
+  """
+  if keys is None or values is None:
+    return records(data)
+
+  return aggregation(data, keys, values, dict([(v, 'sum') for v in values]))
+
+
+def aggCount(data, keys, values):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Python version of the Javascript function ares_count
+  :return: A list of Python dictionaries
+  """
+  return aggregation(data, keys, values, {})
+
+
+def countDistinct(data, keys):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Python version of the Javascript function ares_count(Distinct)
+  :return: A list of Python dictionaries
+  """
+  _, cols = columns(data, keys)
+  return [{'column': k, 'count_distinct': len(set([jsString(val) for val in cols[k]]))} for k in keys]
+
+
+def countAll(data, keys):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Aggregation
+  :dsc:
+    Python version of the Javascript function ares_count(All)
+  :return: A list of Python dictionaries
+  """
+  _, cols = columns(data, keys)
+  counts = []
+  for j, k in enumerate(keys):
+    if not cols[k]:
+      continue
+
+    codes, labels = ares_pandas.factorize(ares_numpy.array(["%s#%s" % (k, jsString(val)) for val in cols[k]], dtype=object))
+    sizes, firsts = ares_numpy.bincount(codes), ares_numpy.unique(codes, return_index=True)[1]
+    for i, label in enumerate(labels):
+      counts.append((firsts[i], j, label, int(sizes[i])))
+  result = []
+  for _, _, label, count in sorted(counts, key=lambda row: (row[0], row[1])):
+    splitKey = label.split("#")
+    result.append({'column': splitKey[0], 'value': splitKey[1], 'count': count})
+  return result
+
+
+def top(data, countItems, value, sortType=None):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_top
+  :return: A list of Python dictionaries
+  """
+  _, cols = columns(data, [value])
+  order = ares_numpy.argsort(ares_numpy.array([jsString(val) for val in cols[value]], dtype=object), kind='stable')
+  if countItems is not None:
+    order = order[-int(countItems):] if sortType == 'descending' else order[:int(countItems)]
+  if isinstance(data, ares_pandas.DataFrame):
+    return records(data.iloc[order])
+
+  return [data[i] for i in order]
+
+
+def rename(data, colsWithName):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_rename
+  :return: A list of Python dictionaries
+  """
+  result = records(data)
+  for rec in result:
+    for col, newCol in colsWithName.items():
+      rec[newCol] = rec.get(col, UNDEFINED)
+      rec.pop(col, None)
+  return result
+
+
+def extend(data, values, recKey=None):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_extend. The sub records (recKey) are not supported
+  :return: A list of Python dictionaries
+  """
+  if recKey is not None:
+    raise Exception("Sub records extension not supported in Python")
+
+  result = records(data)
+  for i, rec in enumerate(result):
+    rec.update(values.get('static') or {})
+    if str(i) in values['dynamic']:
+      rec.update(values['dynamic'][str(i)])
+  return result
+
+
+def rowBuckets(data, allGroups, seriesNames):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_rowbuckets
+  :return: A list of Python dictionaries
+  """
+  result, groupRows = records(data), {}
+  for rec in result:
+    for g, groupDef in allGroups.items():
+      inBucket = False
+      for col, groupVals in groupDef.items():
+        inBucket = any([jsStrictEqual(val, rec.get(col, UNDEFINED)) for val in groupVals])
+        if not inBucket:
+          break
+
+      if inBucket:
+        groupRows.setdefault(g, []).append(rec)
+  result = list(result)
+  for g, groupRecs in groupRows.items():
+    row, text = {'_system': True}, g
+    for col in allGroups[g]:
+      row[col], text = text, ''
+    for v in seriesNames:
+      row[v] = 0
+    for rec in groupRecs:
+      for v in seriesNames:
+        row[v] = jsNumber(row[v]) + jsNumber(rec.get(v, UNDEFINED))
+    result.append(row)
+  return result
+
+
+def rowTotal(data, seriesNames, rowDefinition):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_rowtotal
+  :return: A list of Python dictionaries
+  """
+  result, rowDefinition = list(records(data)), dict(rowDefinition)
+  for v in seriesNames:
+    rowDefinition[v] = 0
+  for rec in result:
+    if not jsTruthy(rec.get('_system', UNDEFINED)):
+      for v in seriesNames:
+        rowDefinition[v] = jsNumber(rowDefinition[v]) + jsNumber(rec.get(v, UNDEFINED))
+  result.append(rowDefinition)
+  return result
+
+
+def intensity(data, cols):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Python version of the Javascript function ares_intensity
+  :return: A list of Python dictionaries
+  """
+  result, stats = records(data), dict([(col, {'min': None, 'max': None}) for col in cols])
+  for rec in result:
+    for col in cols:
+      val = rec.get(col, UNDEFINED)
+      if stats[col]['max'] in (None, UNDEFINED) or jsNumber(val) > jsNumber(stats[col]['max']):
+        stats[col]['max'] = val
+      if stats[col]['min'] in (None, UNDEFINED) or jsNumber(val) < jsNumber(stats[col]['min']):
+        stats[col]['min'] = val
+  for rec in result:
+    for col in cols:
+      rec["%s.intensity.min" % col], rec["%s.intensity.max" % col] = stats[col]['min'], stats[col]['max']
+  return result
+
+
+# Mapping between the Javascript function names and the Python implementations
+FNCS = {
+  'ares_sum': aggSum,
+  'ares_count': aggCount,
+  'ares_aggregation': aggregation,
+  'ares_count(Distinct)': countDistinct,
+  'ares_count(All)': countAll,
+  'ares_top': top,
+  'ares_rename': rename,
+  'ares_extend': extend,
+  'ares_rowbuckets': rowBuckets,
+  'ares_rowtotal': rowTotal,
+  'ares_intensity': intensity,
+}
+
+
+# Aggregations which can be run chunk by chunk (see runChunks)
+CHUNK_FNCS = {
+  'ares_sum': lambda chunks, keys, values: aggregationChunks(chunks, keys, values, dict([(v, 'sum') for v in values])),
+  'ares_count': lambda chunks, keys, values: aggregationChunks(chunks, keys, values, {}),
+  'ares_aggregation': aggregationChunks,
+}
+
+
+def runChunks(chunks, fncs):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Run the chain of record functions on an iterator of recordSets. The first function should be an aggregation with
+    keys and values (CHUNK_FNCS), it is run chunk by chunk and the next functions are run on its result. Thus only one
+    chunk and the groups are in memory (see SqlFrame.pushDown).
+  :example: runChunks(db.select(['trades']).iterData(), [{'name': 'ares_sum', 'args': [['country'], ['amount']]}])
+  :return: A list of Python dictionaries
+  """
+  args = json.loads(json.dumps(fncs[0].get('args') or [], cls=AresJsEncoder.AresEncoder)) if fncs else []
+  if not fncs or not fncs[0]['name'] in CHUNK_FNCS or len(args) < 2 or args[0] is None or args[1] is None:
+    raise Exception("The first function should be an aggregation in %s with keys and values" % list(CHUNK_FNCS))
+
+  return run(CHUNK_FNCS[fncs[0]['name']](chunks, *args[:2]), fncs[1:])
+
+
+def run(data, fncs):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Run the chain of record functions defined in a Js object on the Python data. The arguments are passed as they would
+    be received by the Javascript functions (after a json conversion)
+  :example: run(df, [{'name': 'ares_sum', 'args': [['name'], ['value']]}])
+  :return: A list of Python dictionaries
+  """
+  for fnc in fncs:
+    if not fnc['name'] in FNCS:
+      raise Exception("Function %s not available in Python" % fnc['name'])
+
+    args = json.loads(json.dumps(fnc.get('args') or [], cls=AresJsEncoder.AresEncoder))
+    data = FNCS[fnc['name']](data, *args)
+  return records(data)
+
+
+def toRecords(result):
+  """
+  :category: Javascript Push Down
+  :rubric: PY
+  :type: Conversion
+  :dsc:
+    Remove the undefined keys from the result of the function run
+  :return: A list of Python dictionaries
+  """
+  return [dict([(k, v) for k, v in rec.items() if v is not UNDEFINED]) for rec in result]
+
+
+def toJs(result):
+  """
+  :category: Javascript Push Down
+  :rubric: PY / JS
+  :type: Conversion
+  :dsc:
+    Write the result of the function run to a Javascript definition. The undefined keys are removed and the NaN values
+    are kept as in the Javascript layer
+  :return: A String with the Javascript recordSet
+  """
+  return json.dumps(toRecords(result), cls=AresJsEncoder.AresEncoder)
+
+
+if __name__ == '__main__':
+  # Compare the Python functions with the Javascript ones (Node.js is needed to run the Javascript part)
+  from ares.Lib.js import AresJs
+
+  factory = AresJs.load()
+  df = ares_pandas.DataFrame({
+    'name': ['Olivier', 'Olivier', 'Aurelie', None, 'Aurelie', 'Olivier'],
+    'job': ['BNP', 'BNP', 'BNP', 'BNP', 'SG', 'SG'],
+    'year': [2018, 2018, 2019, 2019, 2018, 2019],
+    'value': [11, 4, 4, 1.5, ares_numpy.nan, 0.1],
+    'value2': [2, 3, None, 0.2, 7, 1]})
+  tests = [
+    [{'name': 'ares_sum', 'args': [['name'], ['value', 'value2']]}],
+    [{'name': 'ares_sum', 'args': [['name', 'year'], ['value']]}],
+    [{'name': 'ares_count', 'args': [['job'], ['value']]}],
+    [{'name': 'ares_aggregation', 'args': [['job'], ['value', 'value2', 'year'], {'value': 'sum', 'year': 'count'}]}],
+    [{'name': 'ares_count(Distinct)', 'args': [['name', 'job', 'value2']]}],
+    [{'name': 'ares_count(All)', 'args': [['name', 'year']]}],
+    [{'name': 'ares_top', 'args': [2, 'value', 'descending']}],
+    [{'name': 'ares_top', 'args': [3, 'name', 'ascending']}],
+    [{'name': 'ares_sum', 'args': [['job'], ['value']]}, {'name': 'ares_rename', 'args': [{'value': 'total', 'job': 'label'}]}],
+    [{'name': 'ares_sum', 'args': [['job'], ['value']]}, {'name': 'ares_extend', 'args': [{'static': {'color': 'red'}, 'dynamic': {1: {'color': 'blue'}}}]}],
+    [{'name': 'ares_rowbuckets', 'args': [{'Bnp 2018': {'job': ['BNP'], 'year': [2018]}, 'Sg': {'job': ['SG']}}, ['value', 'value2']]}],
+    [{'name': 'ares_sum', 'args': [['job', 'year'], ['value']]}, {'name': 'ares_rowtotal', 'args': [['value'], {'job': 'Total'}]}],
+    [{'name': 'ares_intensity', 'args': [['value', 'value2']]}],
+  ]
+  nodePath = shutil.which('node')
+  for fncs in tests:
+    pyResult = toJs(run(df, fncs))
+    if nodePath is None:
+      print(pyResult)
+      continue
+
+    jsFncs, val = [], 'data'
+    for fnc in fncs:
+      jsFncs.append("function %s(%s) {var result = []; %s; return result; };" % (fnc['name'].replace('(', '').replace(')', ''), factory['fncs'][fnc['name']]['params'], factory['fncs'][fnc['name']]['text']))
+      val = "%s(%s, %s)" % (fnc['name'].replace('(', '').replace(')', ''), val, ", ".join([json.dumps(a) for a in fnc['args']]))
+    jsScript = "%s var performance = {now: function(){return 0}}; var data = %s; var pyResult = %s; var jsResult = %s; console.log(JSON.stringify(jsResult) == JSON.stringify(pyResult) ? 'OK' : 'KO ' + JSON.stringify(jsResult) + ' ' + JSON.stringify(pyResult))" % (
+      "".join(jsFncs), json.dumps(records(df), cls=AresJsEncoder.AresEncoder), pyResult, val)
+    jsRun = subprocess.Popen([nodePath, '-e', jsScript], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(__file__))
+    print("%s %s" % (", ".join([fnc['name'] for fnc in fncs]), jsRun.communicate()[0].decode('utf-8').strip()))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Distribution statistics computed in Python for the statistic charts.
+__
+The box plots and the histograms only need a summary of the series (quartiles, whiskers, outliers or the bins counts).
+Those are computed here with numpy and only the summary objects are written to the page, thus a box plot over millions
+of values costs a few KB in the page instead of the full series.
+
+- Box plot: the quartiles are the numpy linear quantiles, the whiskers are the last values within 1.5 interquartile
+range of the quartiles and the values outside are the outliers (at most MAX_OUTLIERS are kept).
+- Histogram: the bins width follows the Freedman–Diaconis rule (2 IQR / n^(1/3)) with at most MAX_BINS bins.
+
+```python
+aresObj.chart('box', df, seriesNames=['price', 'volume'])
+aresObj.chart('histogram', df, seriesNames=['price'])
+```
+'''}
+
+
+from ares.Lib.AresImports import requires
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+# Maximum number of outliers kept per series and maximum number of bins in a histogram
+MAX_OUTLIERS, MAX_BINS = 500, 200
+# Number of values above which the charts computing the statistics in the browser get the summary instead
+STATS_THRESHOLD = 5000
+
+
+def values(series):
+  """
+  :category: Statistics
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Numeric values of a series without the null values (the non numeric values are ignored).
+  :return: A numpy float array
+  """
+  vals = ares_pandas.to_numeric(ares_pandas.Series(series), errors='coerce').values.astype(float)
+  return vals[~ares_numpy.isnan(vals)]
+
+
+def boxStats(series, whisker=1.5, maxOutliers=MAX_OUTLIERS):
+  """
+  :category: Statistics
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Box plot summary of a series. When there are more than maxOutliers outliers, the ones kept are spread over the sorted
+    outliers (the minimum and the maximum are always kept).
+  :example: boxStats(df['price'])
+  :return: A Python dictionary with the count, mean, q1, median, q3, lowerWhisker, upperWhisker and outliers
+  """
+  vals = values(series)
+  if len(vals) == 0:
+    return {'count': 0, 'mean': None, 'q1': None, 'median': None, 'q3': None, 'lowerWhisker': None, 'upperWhisker': None, 'outliers': []}
+
+  q1, median, q3 = ares_numpy.percentile(vals, [25, 50, 75])
+  lowFence, highFence = q1 - whisker * (q3 - q1), q3 + whisker * (q3 - q1)
+  inside = (vals >= lowFence) & (vals <= highFence)
+  outliers = ares_numpy.sort(vals[~inside])
+  if len(outliers) > maxOutliers:
+    outliers = outliers[ares_numpy.unique(ares_numpy.linspace(0, len(outliers) - 1, maxOutliers).astype(int))]
+  return {'count': int(len(vals)), 'mean': float(vals.mean()), 'q1': float(q1), 'median': float(median), 'q3': float(q3),
+          'lowerWhisker': float(vals[inside].min()), 'upperWhisker': float(vals[inside].max()), 'outliers': outliers.tolist()}
+
+
+def boxPoints(stats):
+  """
+  :category: Statistics
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Smallest list of values with the same box plot as the summary. This is used for the charting libraries which only
+    accept the raw values (Plotly 1.43 computes the quartiles with a linear interpolation at the positions p * n - 0.5).
+    The quartiles are repeated around those positions and the whiskers and outliers are added at both ends.
+  :example: boxPoints(boxStats(df['price']))
+  :return: A sorted list of values
+  """
+  if not stats['count']:
+    return []
+
+  lows = [val for val in stats['outliers'] if val < stats['lowerWhisker']]
+  highs = [val for val in stats['outliers'] if val > stats['upperWhisker']]
+  size = max(len(lows) + 2, len(highs) + 3)
+  points = lows + [stats['lowerWhisker']] + [stats['q1']] * (2 * size - 2 - len(lows)) + [stats['median']] * 2
+  points += [stats['q3']] * (4 * size - len(points) - len(highs) - 1) + [stats['upperWhisker']] + highs
+  return points
+
+
+def fdBins(series, maxBins=MAX_BINS):
+  """
+  :category: Statistics
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Bins edges with the Freedman–Diaconis rule. The Sturges rule is used when the interquartile range is null.
+  :example: fdBins(df['price'])
+  :link Freedman–Diaconis rule: https://en.wikipedia.org/wiki/Freedman%E2%80%93Diaconis_rule
+  :return: A numpy array with the bins edges
+  """
+  vals = values(series)
+  if len(vals) == 0:
+    return ares_numpy.array([0.0, 1.0])
+
+  low, high = vals.min(), vals.max()
+  if low == high:
+    return ares_numpy.array([low - 0.5, high + 0.5])
+
+  q1, q3 = ares_numpy.percentile(vals, [25, 75])
+  width = 2 * (q3 - q1) / len(vals) ** (1.0 / 3)
+  binsCount = int(ares_numpy.ceil((high - low) / width)) if width > 0 else int(ares_numpy.ceil(ares_numpy.log2(len(vals)))) + 1
+  return ares_numpy.linspace(low, high, min(max(binsCount, 1), maxBins) + 1)
+
+
+def histogram(df, seriesNames, maxBins=MAX_BINS):
+  """
+  :category: Statistics
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Count the values of the series per bin. The bins are computed on all the series in order to be shared in the chart.
+    The label of a bin is its lower edge.
+  :example: histogram(df, ['price', 'volume'])
+  :return: A list of records with the bin label (x), its edges (x0, x1) and the count per series
+  """
+  allValues = ares_numpy.concatenate([values(df[seriesName]) for seriesName in seriesNames]) if seriesNames else []
+  edges = fdBins(allValues, maxBins)
+  records = [{'x': float("%.4g" % edges[i]), 'x0': float(edges[i]), 'x1': float(edges[i+1])} for i in range(len(edges) - 1)]
+  for seriesName in seriesNames:
+    counts, _ = ares_numpy.histogram(values(df[seriesName]), bins=edges)
+    for i, count in enumerate(counts):
+      records[i][seriesName] = int(count)
+  return records
+
+
+if __name__ == '__main__':
+  import json
+  import time
+
+  rowsCount = 10 ** 7
+  df = ares_pandas.DataFrame({'price': ares_numpy.random.lognormal(size=rowsCount), 'volume': ares_numpy.random.randn(rowsCount)})
+  start = time.time()
+  stats = [dict(boxStats(df[seriesName]), label=seriesName) for seriesName in df.columns]
+  print("Box plot: %s values, %s bytes in %.2fs (raw data %s bytes)" % (rowsCount, len(json.dumps(stats)), time.time() - start, len(json.dumps(df['price'].tolist()))))
+  start = time.time()
+  bins = histogram(df, list(df.columns))
+  print("Histogram: %s bins, %s bytes in %.2fs" % (len(bins), len(json.dumps(bins)), time.time() - start))
+  assert sum(rec['price'] for rec in bins) == rowsCount
+  check = boxStats([1, 2, 3, 4, 5, 6, 7, 8, 100])
+  assert check['median'] == 5 and check['outliers'] == [100.0] and check['upperWhisker'] == 8
+  # Same quartiles with the Plotly interpolation
+  for stats in [check, boxStats(df['price'])]:
+    points = boxPoints(stats)
+    plotlyQuartiles = [ares_numpy.interp(p * len(points) - 0.5, ares_numpy.arange(len(points)), points) for p in (0.25, 0.5, 0.75)]
+    assert ares_numpy.allclose(plotlyQuartiles, [stats['q1'], stats['median'], stats['q3']]) and points == sorted(points)
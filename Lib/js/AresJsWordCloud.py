@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# author: Olivier Noguès
+
+DSC = {'eng': '''
+:dsc:
+Word frequencies and placement of the word cloud charts computed in Python.
+__
+The word cloud charts were receiving the raw texts and d3-cloud was splitting, counting and placing the words in the
+browser. For a large corpus (for example the comments of an incidents table) this is slow and the full text is written
+to the page. The pipeline is done here:
+
+- Tokenisation with the vectorised pandas string functions (lower case, words with apostrophes, stop words and numbers
+removed). The n-grams are built in the same documents and they cannot start or end with a stop word.
+- Counts with value_counts, only the top words are kept.
+- Optional placement on an Archimedean spiral like d3-cloud. The occupied cells of a grid are stored in a numpy array and
+all the positions of the spiral are tested at once with a summed area table, so a word costs a few numpy operations.
+
+The result is cached by the hash of the corpus and the parameters in the connectors result cache.
+
+```python
+aresObj.plot('worldcloud', df['comment'])
+aresObj.plot('worldcloud', AresJsWordCloud.cloud(df['comment'], ngrams=(1, 2), top=150))
+```
+'''}
+
+
+import hashlib
+
+from ares.Lib.AresImports import requires
+from ares.Lib.connectors import AresConnCache
+
+# Will automatically add the external library to be able to use this module
+ares_pandas = requires("pandas", reason='Missing Package', install='pandas', autoImport=True, sourceScript=__file__)
+ares_numpy = requires("numpy", reason='Missing Package', install='numpy', autoImport=True, sourceScript=__file__)
+
+
+# Words with the apostrophes (it's, don't...), the underscores are separators
+TOKEN_REGEX = r"[^\W_]+(?:'[^\W_]+)*"
+
+STOPWORDS = frozenset('''i,me,my,myself,we,us,our,ours,ourselves,you,your,yours,yourself,yourselves,he,him,his,himself,she,
+her,hers,herself,it,its,itself,they,them,their,theirs,themselves,what,which,who,whom,whose,this,that,these,those,am,is,are,
+was,were,be,been,being,have,has,had,having,do,does,did,doing,will,would,should,can,could,ought,i'm,you're,he's,she's,it's,
+we're,they're,i've,you've,we've,they've,i'd,you'd,he'd,she'd,we'd,they'd,i'll,you'll,he'll,she'll,we'll,they'll,isn't,
+aren't,wasn't,weren't,hasn't,haven't,hadn't,doesn't,don't,didn't,won't,wouldn't,shan't,shouldn't,can't,cannot,couldn't,
+mustn't,let's,that's,who's,what's,here's,there's,when's,where's,why's,how's,a,an,the,and,but,if,or,because,as,until,while,
+of,at,by,for,with,about,against,between,into,through,during,before,after,above,below,to,from,up,upon,down,in,out,on,off,
+over,under,again,further,then,once,here,there,when,where,why,how,all,any,both,each,few,more,most,other,some,such,no,nor,
+not,only,own,same,so,than,too,very,say,says,said,shall'''.replace("\n", "").split(","))
+
+# Size of the placement area (in pixels), the chart is then scaled with the SVG viewBox. Cache time to live (in seconds)
+WIDTH, HEIGHT, CLOUD_TTL = 800, 400, 7 * 24 * 3600
+
+
+def tokens(texts, ngrams=(1, ), stopwords=None, minLength=2):
+  """
+  :category: Word Cloud
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Split the texts in lower case words and n-grams. The stop words, the numbers and the words shorter than minLength
+    are removed. An n-gram is kept when its first and last words are kept (bank of america).
+  :example: tokens(df['comment'], ngrams=(1, 2))
+  :return: A pandas series with one row per word or n-gram
+  """
+  words = ares_pandas.Series(texts).dropna().astype(str).reset_index(drop=True).str.lower().str.findall(TOKEN_REGEX).explode().dropna()
+  docs, words = words.index.values, words.values
+  # The filters are computed on the vocabulary only
+  codes, vocabulary = ares_pandas.factorize(words)
+  vocabulary, stopwords = ares_pandas.Series(vocabulary, dtype=object), STOPWORDS if stopwords is None else frozenset(stopwords)
+  useful = (~vocabulary.isin(stopwords) & (vocabulary.str.len() >= minLength) & ~vocabulary.str.isnumeric()).values[codes]
+  result = []
+  for n in ngrams:
+    size = len(words) - n + 1
+    if n < 1 or size <= 0:
+      continue
+
+    # The rows of a document are contiguous after explode, so the first and the last words are enough to check
+    valid = ares_numpy.flatnonzero((docs[:size] == docs[n-1:]) & useful[:size] & useful[n-1:])
+    result.append(ares_pandas.Series(words[valid]).str.cat([ares_pandas.Series(words[valid + i]) for i in range(1, n)], sep=' '))
+  if not result:
+    return ares_pandas.Series([], dtype=object)
+
+  return ares_pandas.concat(result, ignore_index=True)
+
+
+def counts(texts, ngrams=(1, ), top=100, stopwords=None, minLength=2):
+  """
+  :category: Word Cloud
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Number of occurrences of the most frequent words and n-grams.
+  :example: counts(df['comment'], top=50)
+  :return: A list of records with the key (the word) and the value (the count) sorted by count
+  """
+  valueCounts = tokens(texts, ngrams, stopwords, minLength).value_counts()
+  if top is not None:
+    valueCounts = valueCounts.iloc[:top]
+  return [{'key': key, 'value': int(value)} for key, value in valueCounts.items()]
+
+
+def spiral(records, width=WIDTH, height=HEIGHT, fontSizes=(10, 80), rotations=(0, 90), cellSize=2, seed=0):
+  """
+  :category: Word Cloud
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Place the words by decreasing counts on an Archimedean spiral from the centre (the d3-cloud algorithm). The words are
+    approximated by their boxes (0.6 em per letter), the words without any free position are dropped.
+    The positions are the text anchors relative to the centre of the area (text-anchor middle).
+  :example: spiral(counts(df['comment']))
+  :return: A list of records with the text, the value, the font size, the position (x, y) and the rotation
+  """
+  records = sorted(records, key=lambda rec: -rec['value'])
+  if not records:
+    return []
+
+  rand = ares_numpy.random.RandomState(seed)
+  cols, rows = int(width // cellSize), int(height // cellSize)
+  grid = ares_numpy.zeros((rows, cols), dtype=ares_numpy.int32)
+  # Points of the spiral every cell with 2 cells between two turns. The x axis is stretched to the ratio of the area
+  turnGap, ratio = 2.0 / (2 * ares_numpy.pi), float(cols) / rows
+  maxAngle = ares_numpy.hypot(cols / ratio, rows) / 2 / turnGap
+  angles = ares_numpy.sqrt(2 * ares_numpy.arange(0, turnGap * maxAngle ** 2 / 2) / turnGap)
+  centerX = ares_numpy.rint(cols / 2.0 + ratio * turnGap * angles * ares_numpy.cos(angles)).astype(int)
+  centerY = ares_numpy.rint(rows / 2.0 + turnGap * angles * ares_numpy.sin(angles)).astype(int)
+  inArea = (centerX >= 0) & (centerX < cols) & (centerY >= 0) & (centerY < rows)
+  _, first = ares_numpy.unique(centerY[inArea] * cols + centerX[inArea], return_index=True)
+  first.sort()
+  centerX, centerY = centerX[inArea][first], centerY[inArea][first]
+  low, high = records[-1]['value'], records[0]['value']
+  result = []
+  for rec in records:
+    fontSize = fontSizes[1] if high == low else fontSizes[0] + (fontSizes[1] - fontSizes[0]) * float(rec['value'] - low) / (high - low)
+    rotate = rotations[rand.randint(len(rotations))]
+    boxWidth, boxHeight = int(ares_numpy.ceil(len(rec['key']) * fontSize * 0.6 / cellSize)) + 1, int(ares_numpy.ceil(fontSize / cellSize)) + 1
+    if rotate:
+      boxWidth, boxHeight = boxHeight, boxWidth
+    x0, y0 = centerX - boxWidth // 2, centerY - boxHeight // 2
+    inside = ares_numpy.flatnonzero((x0 >= 0) & (y0 >= 0) & (x0 + boxWidth <= cols) & (y0 + boxHeight <= rows))
+    x0, y0 = x0[inside], y0[inside]
+    # Summed area table, the number of occupied cells of a box is given by its four corners
+    table = ares_numpy.zeros((rows + 1, cols + 1), dtype=ares_numpy.int32)
+    table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+    occupied = table[y0 + boxHeight, x0 + boxWidth] - table[y0, x0 + boxWidth] - table[y0 + boxHeight, x0] + table[y0, x0]
+    free = ares_numpy.flatnonzero(occupied == 0)
+    if not len(free):
+      continue
+
+    x, y = int(x0[free[0]]), int(y0[free[0]])
+    grid[y:y + boxHeight, x:x + boxWidth] = 1
+    # The text is anchored on its baseline, shifted by 0.35 em from the centre of the box (to the left when rotated)
+    posX, posY = (x + boxWidth / 2.0) * cellSize - width / 2.0, (y + boxHeight / 2.0) * cellSize - height / 2.0
+    if rotate:
+      posX -= 0.35 * fontSize
+    else:
+      posY += 0.35 * fontSize
+    result.append({'text': rec['key'], 'value': rec['value'], 'size': round(fontSize, 1), 'x': round(posX, 1), 'y': round(posY, 1), 'rotate': rotate})
+  return result
+
+
+def cloud(texts, ngrams=(1, ), top=100, stopwords=None, minLength=2, placement=True, width=WIDTH, height=HEIGHT, seed=0):
+  """
+  :category: Word Cloud
+  :rubric: PY
+  :type: Transformation
+  :dsc:
+    Counts and placement of the words of a corpus. The result is cached by the hash of the texts and the parameters.
+  :example: cloud(df['comment'], ngrams=(1, 2), top=150)
+  :return: The list of records from spiral (or from counts when placement is False)
+  """
+  texts = ares_pandas.Series(texts).dropna().astype(str)
+  corpusHash = hashlib.sha1(ares_pandas.util.hash_pandas_object(texts, index=False).values.tobytes()).hexdigest()
+  params = [corpusHash, list(ngrams), top, sorted(stopwords) if stopwords is not None else None, minLength, placement, width, height, seed]
+  key = AresConnCache.ResultCache.key('WORDCLOUD', params)
+  found, result = AresConnCache.CACHE.get('WORDCLOUD', key)
+  if found:
+    return result
+
+  result = counts(texts, ngrams, top, stopwords, minLength)
+  if placement:
+    result = spiral(result, width, height, seed=seed)
+  AresConnCache.CACHE.set('WORDCLOUD', key, result, CLOUD_TTL)
+  return result
+
+
+if __name__ == '__main__':
+  import time
+
+  rand = ares_numpy.random.RandomState(1)
+  vocabulary = ares_numpy.array(["server", "restart", "database", "timeout", "disk", "full", "network", "latency", "user",
+                                 "login", "failed", "the", "a", "of", "is", "job", "batch", "error", "memory", "leak", "42"])
+  weights = rand.zipf(1.5, len(vocabulary)).astype(float)
+  comments = [" ".join(rand.choice(vocabulary, 12, p=weights / weights.sum())) for _ in range(200000)]
+  start = time.time()
+  words = counts(comments, ngrams=(1, 2), top=150)
+  print("Counts of %s comments in %.2fs, top %s" % (len(comments), time.time() - start, words[:3]))
+  assert not [rec for rec in words if rec['key'] in STOPWORDS or rec['key'] == '42' or rec['key'].split()[0] in STOPWORDS]
+  assert counts(["Bank of America, the bank!"], ngrams=(1, 2, 3)) == [{'key': 'bank', 'value': 2}, {'key': 'america', 'value': 1}, {'key': 'bank of america', 'value': 1}, {'key': 'america the bank', 'value': 1}]
+  start = time.time()
+  placed = spiral(words)
+  print("Placement of %s words out of %s in %.2fs" % (len(placed), len(words), time.time() - start))
+  boxes = [(rec['x'], rec['y'], len(rec['text']) * rec['size'] * 0.6, rec['size'], rec['rotate']) for rec in placed]
+  boxes = [(x - w / 2, y - 0.85 * h, w, h) if not r else (x - 0.15 * h, y - w / 2, h, w) for x, y, w, h, r in boxes]
+  for i, (x1, y1, w1, h1) in enumerate(boxes):
+    assert -WIDTH / 2 <= x1 and x1 + w1 <= WIDTH / 2 and -HEIGHT / 2 <= y1 and y1 + h1 <= HEIGHT / 2
+    assert not [j for j, (x2, y2, w2, h2) in enumerate(boxes[:i]) if x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1]
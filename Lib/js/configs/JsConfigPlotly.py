@@ -3,6 +3,8 @@
 # author: Olivier Noguès
 
 
+from ares.Lib.js import AresJs
+from ares.Lib.js import AresJsStats
 from ares.Lib.js.configs import JsConfig
 
 
@@ -151,13 +153,40 @@ class JsBox(JsBase):
   reference = "https://plot.ly/javascript/box-plots/"
   _statics = {"boxpoints": 'all'}
 
+  @classmethod
+  def transformation(cls, data):
+    """
+    :category: Data Transformation
+    :rubric: PY
+    :type: Statistics
+    :dsc:
+      Above AresJsStats.STATS_THRESHOLD rows the box plots are computed in Python and only the values with the same
+      quartiles, whiskers and outliers are written to the page (see AresJsStats.boxPoints).
+      The values are kept when the records are changed in the browser (record functions or filters).
+    """
+    if len(data._data) <= AresJsStats.STATS_THRESHOLD or not AresJs.isRawData(data):
+      return data
+
+    seriesNames = list(data._schema['out']['params'][0])
+    points = dict([(series, AresJsStats.boxPoints(AresJsStats.boxStats(data._data[series]))) for series in seriesNames])
+    records = [dict([(series, points[series][i]) for series in seriesNames if i < len(points[series])]) for i in range(max([len(vals) for vals in points.values()] + [0]))]
+    statsData = AresJs.Js(data.aresObj, data.aresObj.df(records, htmlCode="%s_box" % data._jqId), values=seriesNames)
+    statsData._isSummary = True
+    return statsData.output(data._schema['out']['family'], data._schema['out']['type'], data._schema['out']['params'])
+
+  def config(self):
+    super(JsBox, self).config()
+    if getattr(self.data, '_isSummary', False):
+      self.seriesProperties["static"]["boxpoints"] = 'outliers'
+
 
-class JsHBox(JsBase):
+class JsHBox(JsBox):
   """ Configuration for a Box Chart in Plotly """
   alias = 'hbox'
   name = 'Horizontal Box Series'
   _attrs = {'type': 'box'}
   reference = "https://plot.ly/javascript/box-plots/"
+  _statics = None
 
 
 class JsSankey(JsBase):
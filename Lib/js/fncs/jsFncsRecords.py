@@ -52,6 +52,19 @@ class JsRecFunc(object):
   def extendColumns(jsSchema, params):
     raise Exception("Method extendColumns should be overriden")
 
+  @staticmethod
+  def inputColumns(params):
+    """
+    :category: Javascript Record Function
+    :rubric: PY
+    :type: Data Transformation
+    :dsc:
+      Columns of the recordSet read by the function. None means that the function can read any column (for example
+      when the records are returned unchanged) and in this case all the columns are kept in the page.
+    :return: A Python set or None
+    """
+    return None
+
 
 class JsRowBuckets(JsRecFunc):
   """
@@ -137,6 +150,11 @@ class JsSum(JsRecFunc):
       jsSchema['keys'] |= set(params[0])
       jsSchema['values'] |= set(params[1])
 
+  @staticmethod
+  def inputColumns(params):
+    if params[0] is not None and params[1] is not None:
+      return set(params[0]) | set(params[1])
+
   alias = "sum"
   params = ("keys", "values")
   value = '''
@@ -145,8 +163,8 @@ class JsSum(JsRecFunc):
       var temp = {};
       var order = [];
       data.forEach( function(rec) { 
-        var aggKey = []; keys.forEach(function(k){ aggKey.push(rec[k])}); var newKey = aggKey.join("#"); order.push(newKey);
-        if (!(newKey in temp)) {temp[newKey] = {}};
+        var aggKey = []; keys.forEach(function(k){ aggKey.push(rec[k])}); var newKey = aggKey.join("#");
+        if (!(newKey in temp)) {temp[newKey] = {}; order.push(newKey)};
         values.forEach(function(v) {if (!(v in temp[newKey])) {temp[newKey][v] = rec[v]} else {temp[newKey][v] += rec[v]}}) ;}); 
       order.forEach(function(label) {
         var rec = {}; var splitKey = label.split("#");
@@ -194,14 +212,17 @@ class JsOperations(JsRecFunc):
       jsSchema['keys'] |= set(params[0])
       jsSchema['values'] |= set(params[1])
 
+  @staticmethod
+  def inputColumns(params): return set(params[0]) | set(params[1])
+
   alias = "aggregation"
   params = ("keys", "values", "operations")
   value = '''
     var temp = {};
     var order = [];
     data.forEach( function(rec) { 
-      var aggKey = []; keys.forEach(function(k){ aggKey.push( rec[k])}); var newKey = aggKey.join("#"); order.push(newKey);
-      if (!(newKey in temp)) {temp[newKey] = {}};
+      var aggKey = []; keys.forEach(function(k){ aggKey.push( rec[k])}); var newKey = aggKey.join("#");
+      if (!(newKey in temp)) {temp[newKey] = {}; order.push(newKey)};
       values.forEach(function(v) {
         if (operations[v] === undefined){ if (!(v in temp[newKey])) {temp[newKey][v] = 1} else {temp[newKey][v] += 1} }
         else if (operations[v] == 'sum') {if (!(v in temp[newKey])) {temp[newKey][v] = rec[v]} else {temp[newKey][v] += rec[v]}}
@@ -229,14 +250,17 @@ class JsCount(JsRecFunc):
       jsSchema['keys'] |= set(params[0])
       jsSchema['values'] |= set(params[1])
 
+  @staticmethod
+  def inputColumns(params): return set(params[0]) | set(params[1])
+
   alias = "count"
   params = ("keys", "values")
   value = '''
     var temp = {};
     var order = [];
     data.forEach( function(rec) { 
-      var aggKey = []; keys.forEach(function(k){ aggKey.push( rec[k])}); var newKey = aggKey.join("#"); order.push(newKey);
-      if (!(newKey in temp)) {temp[newKey] = {}};
+      var aggKey = []; keys.forEach(function(k){ aggKey.push( rec[k])}); var newKey = aggKey.join("#");
+      if (!(newKey in temp)) {temp[newKey] = {}; order.push(newKey)};
       values.forEach(function(v) {if (!(v in temp[newKey])) {temp[newKey][v] = 1} else {temp[newKey][v] += 1}}) ;}); 
     order.forEach(function(label) {
       var rec = {}; var splitKey = label.split("#");
@@ -283,6 +307,10 @@ class JsCountDistinct(object):
     with the following structure {'column': '', 'count_distinct': 0}
   :return: A new recordSet with the properties of the requested keys
   """
+
+  @staticmethod
+  def inputColumns(params): return set(params[0])
+
   alias = "count(Distinct)"
   params = ("keys", )
   value = '''
@@ -302,14 +330,18 @@ class JsCountAll(object):
     columns of the original data source.
   :return: A new recordSet with the properties of the requested keys
   """
+
+  @staticmethod
+  def inputColumns(params): return set(params[0])
+
   alias = "count(All)"
   params = ("keys", )
   value = '''
     var temp = {}; var order= []; var t0 = performance.now();
     data.forEach(function(rec) { 
       keys.forEach(function(k){
-        var aggKey = k + "#" + rec[k]; order.push(aggKey); if (!(aggKey in temp)) {temp[aggKey] = 1} else {temp[aggKey] += 1}});}); 
-    order.forEach(function(label) {{
+        var aggKey = k + "#" + rec[k]; if (!(aggKey in temp)) {temp[aggKey] = 1; order.push(aggKey)} else {temp[aggKey] += 1}});}); 
+    order.forEach(function(label) {
       var keys = label.split("#"); var rec = {'column': keys[0], 'value': keys[1], 'count': temp[label]};
       result.push(rec);})'''
 
@@ -329,7 +361,7 @@ class JsRename(object):
   value = '''
     var t0 = performance.now();
     data.forEach( function(rec) { 
-      for (var col in colsWithName) {rec[colsWithName[col]] = rec[col]; delete rec[col]; result.push(rec); } })'''
+      for (var col in colsWithName) {rec[colsWithName[col]] = rec[col]; delete rec[col]}; result.push(rec) })'''
 
 
 class JsExtend(object):
@@ -38,6 +38,70 @@ class JsNVD3Pie(object):
     '''
 
 
+class JsNVD3Box(object):
+  """
+  :category: RecordSet to NVD3 Object
+  :rubric: JS
+  :type: Data Transformation
+  :dsc:
+    Box plot summary computed in Python (one record per series) to the NVD3 boxPlotChart structure
+  """
+  alias = "NVD3"
+  chartTypes = ['box']
+  params = ("seriesNames", "xAxis")
+  value = '''
+    data.forEach(function(rec) {
+      if(rec.count > 0) {
+        result.push({label: rec[xAxis], values: {Q1: rec.q1, Q2: rec.median, Q3: rec.q3, whisker_low: rec.lowerWhisker, 
+                     whisker_high: rec.upperWhisker, outliers: rec.outliers}})}})
+    '''
+
+
+class JsNVD3BoxRecords(object):
+  """
+  :category: RecordSet to NVD3 Object
+  :rubric: JS
+  :type: Data Transformation
+  :dsc:
+    Box plot statistics of the series computed in the browser, for the records changed by functions or filters.
+    The quartiles are interpolated as in Python (AresJsStats.boxStats) and the whiskers are at 1.5 IQR
+  """
+  alias = "NVD3"
+  chartTypes = ['boxRecords']
+  params = ("seriesNames", "xAxis")
+  value = '''
+    seriesNames.forEach(function(name) {
+      var vals = [];
+      data.forEach(function(rec) {var val = parseFloat(rec[name]); if(!isNaN(val)) {vals.push(val)}});
+      if(vals.length > 0) {
+        vals.sort(function(a, b) {return a - b});
+        var quantile = function(p) {var pos = p * (vals.length - 1), i = Math.floor(pos); return i + 1 < vals.length ? vals[i] + (pos - i) * (vals[i + 1] - vals[i]) : vals[i]};
+        var q1 = quantile(0.25), q3 = quantile(0.75), lowFence = q1 - 1.5 * (q3 - q1), highFence = q3 + 1.5 * (q3 - q1);
+        var inside = vals.filter(function(val) {return val >= lowFence && val <= highFence});
+        result.push({label: name, values: {Q1: q1, Q2: quantile(0.5), Q3: q3, whisker_low: inside[0], whisker_high: inside[inside.length - 1],
+                     outliers: vals.filter(function(val) {return val < lowFence || val > highFence})}})}})
+    '''
+
+
+class JsNVD3CandleStick(object):
+  """
+  :category: RecordSet to NVD3 Object
+  :rubric: JS
+  :type: Data Transformation
+  :dsc:
+    Open, high, low, close and volume bars (see AresJsOhlc) to the NVD3 candlestickBarChart structure
+  """
+  alias = "NVD3"
+  chartTypes = ['candlestick']
+  params = ("seriesNames", "xAxis")
+  value = '''
+    var values = [];
+    data.forEach(function(rec) {
+      values.push({date: rec[xAxis], open: rec.open, high: rec.high, low: rec.low, close: rec.close, volume: rec.volume})});
+    result.push({values: values})
+    '''
+
+
 class JsNVD3Bar(object):
   """
   :category: RecordSet to NVD3 Object
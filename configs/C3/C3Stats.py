@@ -14,6 +14,7 @@ from ares.Lib import AresImports
 ares_scipy_stats = AresImports.requires(name='scipy.stats', reason='Missing Package', install='scipy', sourceScript=__file__)
 
 from ares.Lib.js import AresJs
+from ares.Lib.js import AresJsStats
 
 
 class C3KernelDensityEstimate(C3Base.C3):
@@ -49,3 +50,25 @@ class C3KernelDensityEstimate(C3Base.C3):
     data = AresJs.Js(self.aresObj, self.aresObj.df(newDff, htmlCode="%s_kde" % data._jqId), keys=['x'], values=seriesNames)
     return data.output('C3', self.chartCall, (seriesNames, 'x'))
 
+
+class C3Histogram(C3Base.C3):
+  """
+  :category: Chart
+  :rubric: JS
+  :type: Configuration
+  :dsc:
+    Histogram of the series. The Freedman–Diaconis bins and the counts are computed in Python (see AresJsStats).
+  """
+  name, chartCall, chartType = 'Histogram', 'histogram', 'bar'
+  # Please do not change this object, it will impact everything as dictionaries are mutable objects
+  _attrs = {
+    'grid': {'y': {'show': True}}, 'legend': {'show': True},
+    'bar': {'width': {'ratio': 0.95}}
+  }
+
+  def transformation(self, data):
+    seriesNames = list(data._schema['values'])
+    bins = AresJsStats.histogram(data._data, seriesNames)
+    data = AresJs.Js(self.aresObj, self.aresObj.df(bins, htmlCode="%s_histogram" % data._jqId), keys=['x'], values=seriesNames)
+    return data.output('C3', self.chartCall, (seriesNames, 'x'))
+
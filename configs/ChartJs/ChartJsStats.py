@@ -14,6 +14,7 @@ from ares.Lib import AresImports
 ares_scipy_stats = AresImports.requires(name='scipy.stats', reason='Missing Package', install='scipy', sourceScript=__file__)
 
 from ares.Lib.js import AresJs
+from ares.Lib.js import AresJsStats
 
 
 class ChartJsKernelDensityEstimate(ChartJsBase.ChartJs):
@@ -42,3 +43,15 @@ class ChartJsKernelDensityEstimate(ChartJsBase.ChartJs):
     data = AresJs.Js(self.aresObj, self.aresObj.df(newDff, htmlCode="%s_kde" % data._jqId), keys=['x'], values=seriesNames)
     return data.output('ChartJs', self.chartCall, (seriesNames, 'x'))
 
+
+class ChartJsHistogram(ChartJsBase.ChartJs):
+  name, chartCall, chartObj = 'Histogram', 'histogram', 'bar'
+  mocks = []
+
+  def transformation(self, data):
+    # The Freedman–Diaconis bins and the counts are computed in Python (see AresJsStats)
+    seriesNames = list(data._schema['values'])
+    bins = AresJsStats.histogram(data._data, seriesNames)
+    data = AresJs.Js(self.aresObj, self.aresObj.df(bins, htmlCode="%s_histogram" % data._jqId), keys=['x'], values=seriesNames)
+    return data.output('ChartJs', self.chartCall, (seriesNames, 'x'))
+
@@ -4,6 +4,8 @@
 
 
 from ares.configs.NVD3 import NVD3Base
+from ares.Lib.js import AresJs
+from ares.Lib.js import AresJsStats
 
 
 class NVD3PlotBox(NVD3Base.NVD3):
@@ -11,10 +13,14 @@ class NVD3PlotBox(NVD3Base.NVD3):
   :category: Chart
   :rubric: JS
   :type: Configuration
+  :dsc:
+    Box plot of the series. The quartiles, whiskers and outliers are computed in Python (see AresJsStats) and only
+    this summary is written to the page. When the records are changed in the browser (record functions or filters) the
+    statistics are computed in Javascript on the result.
   """
   name, chartObj, chartCall = 'Box Plot', 'boxPlotChart', 'box'
   # Please do not change this object, it will impact everything as dictionaries are mutable objects
-  _attrs = {'maxBoxWidth': 75, 'yDomain': [0, 500], 'staggerLabels': True}
+  _attrs = {'maxBoxWidth': 75, 'staggerLabels': True}
 
   mocks = [
     {
@@ -29,3 +35,19 @@ class NVD3PlotBox(NVD3Base.NVD3):
       },
     }
   ]
+
+  def transformation(self, data):
+    seriesNames = list(data._schema['out']['params'][0])
+    if not AresJs.isRawData(data):
+      self._yDomain = None
+      return data.output('NVD3', 'boxRecords', data._schema['out']['params'])
+
+    stats = [dict(AresJsStats.boxStats(data._data[series]), label=series) for series in seriesNames]
+    bounds = [val for rec in stats for val in [rec['lowerWhisker'], rec['upperWhisker']] + rec['outliers'] if val is not None]
+    self._yDomain = [min(bounds), max(bounds)] if bounds else [0, 1]
+    data = AresJs.Js(self.aresObj, self.aresObj.df(stats, htmlCode="%s_box" % data._jqId), keys=['label'], values=seriesNames)
+    return data.output('NVD3', self.chartCall, (seriesNames, 'label'))
+
+  def config(self):
+    if self._yDomain is not None:
+      self.addAttr('yDomain', self._yDomain)
@@ -14,6 +14,7 @@ from ares.Lib import AresImports
 ares_scipy_stats = AresImports.requires(name='scipy.stats', reason='Missing Package', install='scipy', sourceScript=__file__)
 
 from ares.Lib.js import AresJs
+from ares.Lib.js import AresJsStats
 
 
 class PlotlyKernelDensityEstimate(PlotlyBase.Plotly):
@@ -43,3 +44,23 @@ class PlotlyKernelDensityEstimate(PlotlyBase.Plotly):
     data = AresJs.Js(self.aresObj, self.aresObj.df(newDff, htmlCode="%s_kde" % data._jqId), keys=['x'], values=seriesNames)
     return data.output('Plotly', self.chartCall, (seriesNames, 'x'))
 
+
+class PlotlyHistogram(PlotlyBase.Plotly):
+  """
+  :category: Chart
+  :rubric: JS
+  :type: Configuration
+  :dsc:
+    Histogram of the series. The Freedman–Diaconis bins and the counts are computed in Python (see AresJsStats) and the
+    chart is a bar chart on those bins.
+  """
+  name, chartCall, chartObj = 'Histogram', 'histogram', 'bar'
+  # Please do not change this object, it will impact everything as dictionaries are mutable objects
+  _attrs = {'type': 'bar'}
+
+  def transformation(self, data):
+    seriesNames = list(data._schema['values'])
+    bins = AresJsStats.histogram(data._data, seriesNames)
+    data = AresJs.Js(self.aresObj, self.aresObj.df(bins, htmlCode="%s_histogram" % data._jqId), keys=['x'], values=seriesNames)
+    return data.output('Plotly', self.chartCall, (seriesNames, 'x'))
+
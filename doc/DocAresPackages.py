@@ -44,6 +44,7 @@ PY_PACKAGES = {
   'numpy': "http://www.numpy.org/",
   'scipy': "https://www.scipy.org/",
   'pywin32': 'https://pypi.org/project/pywin32/',
-  'zeep': 'https://python-zeep.readthedocs.io/en/master/'
+  'zeep': 'https://python-zeep.readthedocs.io/en/master/',
+  'pyarrow': 'https://arrow.apache.org/docs/python/'
 }
 